@@ -1,14 +1,23 @@
 from Piece import Piece
+from Board import CASTLE_SPOTS, DIAGONAL_STEPS
 
 class AdvisorPiece(Piece):
     """ Instantiates an Advisor Piece
     Advisor_positions is a class variable, a dictionary of initial positions keyed by player color
     Two Advisor pieces are created by a call to Player.__init__(), one for each of the two positions
     per side."""
+    piece_type = 'Ad'   # label for this Piece type
+    value = 200         # material value of this Piece type, for evaluation
     advisor_positions = {
         'red': ['d1', 'f1'],
         'black': ['d10', 'f10']
     }
+    # advisor_moves is a class variable keyed by player side, built once at import time. Each value is a list
+    # indexed by position of the set of castle spots one point diagonal from that position.
+    advisor_moves = {
+        side: [frozenset(dest for dest in steps if dest in CASTLE_SPOTS[side]) for steps in DIAGONAL_STEPS]
+        for side in ('red', 'black')
+    }
 
     def __init__(self, side, board, id_num):
         """ Initializes an advisor piece. The side ('red' or 'black'), the Board, and the id_num of this piece are
@@ -19,7 +28,8 @@ class AdvisorPiece(Piece):
 
         # Assign a position from Advisor Piece.
         self._id = id_num      # id_num is passed as argument, by Player, and will be 1 or 2
-        self._pos = AdvisorPiece.advisor_positions[side][id_num - 1] # keep track of positions used based on id number
+        # keep track of positions used based on id number
+        self._pos = board.get_pos_from_alg(AdvisorPiece.advisor_positions[side][id_num - 1])
 
     def __repr__(self):
         """Return an informative label for this Piece: ["r" or "b"] + "Ad" + [id_num for this specific piece].
@@ -27,12 +37,25 @@ class AdvisorPiece(Piece):
         return self._side[0] + "Ad" + str(self._id)
 
     def is_legal(self, to_pos):
-        """Returns True if it is legal for Advisor to move to to_pos. Checks Piece.is_legal() conditions,
-        with additional restriction that Advisors remain in the castle."""
+        """Returns True if it is legal for Advisor to move to to_pos. Advisors move one point diagonally, and
+        remain in the castle. Destinations are looked up in the table of advisor moves."""
+
+        if self._pos is None:           # do not allow captured pieces to move
+            return False
 
-        # to_pos must be a castle spot for this piece's side
-        if to_pos not in (self._board.get_castle_spots(self._side)):
+        # to_pos must be a castle spot for this piece's side, one point diagonal from the Advisor
+        if to_pos not in AdvisorPiece.advisor_moves[self._side][self._pos]:
             return False
 
-        # if it is a castle spot, check that all other legal conditions for Piece hold
-        return super().is_legal(to_pos)
\ No newline at end of file
+        # if it is, check that to_pos is not occupied by a friend
+        return self.can_occupy(to_pos)
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this Advisor, from the table of advisor
+        moves."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        for to_pos in AdvisorPiece.advisor_moves[self._side][from_pos]:
+            if self.can_occupy(to_pos):
+                yield from_pos, to_pos
@@ -0,0 +1,209 @@
+from Board import Board, NUM_FILES, NUM_RANKS
+
+
+def _build_line_table(length, scale):
+    """ Returns a table indexed by [index][occupancy] of (slides, first_blockers, second_blockers) tuples for a point
+    at index on a line of length points, where occupancy is the bitmask of occupied points on the line.
+    Slides are the empty points reachable before the first occupant in each direction, first_blockers are the
+    first occupants in each direction, and second_blockers are the next occupants beyond those (cannon targets).
+    Points along the line are stored multiplied by scale, so that adding the line's offset gives a position."""
+    table = []
+    for index in range(length):
+        entries = []
+        for occupancy in range(1 << length):
+            slides, first_blockers, second_blockers = [], [], []
+            for step in (1, -1):
+                blockers_found = 0
+                point = index + step
+                while 0 <= point < length:
+                    if not occupancy & (1 << point):
+                        if blockers_found == 0:
+                            slides.append(point * scale)
+                    elif blockers_found == 0:
+                        first_blockers.append(point * scale)
+                        blockers_found = 1
+                    else:
+                        second_blockers.append(point * scale)
+                        break
+                    point += step
+            entries.append((tuple(slides), tuple(first_blockers), tuple(second_blockers)))
+        table.append(entries)
+    return table
+
+
+def _build_between_masks(length):
+    """ Returns a table indexed by [from_index][to_index] of the line mask of the points strictly between the two
+    indices on a line of length points."""
+    return [[sum(1 << point for point in range(min(start, end) + 1, max(start, end)))
+             for end in range(length)] for start in range(length)]
+
+
+# rank lines are indexed by [file][rank occupancy], and hold file indices, to be offset by rank * 9
+RANK_LINES = _build_line_table(NUM_FILES, 1)
+# file lines are indexed by [rank][file occupancy], and hold rank indices * 9, to be offset by file
+FILE_LINES = _build_line_table(NUM_RANKS, NUM_FILES)
+# between masks are indexed by [from_index][to_index] along a rank (file indices) or along a file (rank indices)
+RANK_BETWEEN = _build_between_masks(NUM_FILES)
+FILE_BETWEEN = _build_between_masks(NUM_RANKS)
+
+
+class BitBoard(Board):
+    """ Creates a Board that also tracks occupancy as bitboards, for use by XiangqiGame, Players, and Pieces.
+    A bitboard is a 90-bit Python int where bit n is set if position n is occupied.
+    BitBoard keeps the Board's list of Pieces, so every Board method works unchanged. In addition it keeps
+    occupancy for all pieces, per side and per side and piece type, plus the occupancy of every rank and every file.
+    Chariot slides and cannon targets are looked up in precomputed rank and file tables indexed by that occupancy,
+    instead of walking rays point by point."""
+
+    def __init__(self):
+        """ Creates an empty BitBoard, receives no arguments."""
+        super().__init__()
+        self._occupancy = 0                                 # bitboard of all occupied positions
+        self._side_occupancy = {'red': 0, 'black': 0}       # bitboards keyed by side
+        self._type_occupancy = {'red': {}, 'black': {}}     # bitboards keyed by side, then by piece type
+        self._rank_occupancy = [0] * NUM_RANKS              # 9 bit occupancy of each rank, bit n is file n
+        self._file_occupancy = [0] * NUM_FILES              # 10 bit occupancy of each file, bit n is rank n
+
+    def _toggle_bits(self, piece, pos):
+        """ Flips the occupancy bits of piece at pos. Used both to set and to clear a piece's bits."""
+        bit = 1 << pos
+        rank, file = divmod(pos, NUM_FILES)
+        side = piece.get_side()
+        piece_type = piece.get_type()
+        self._occupancy ^= bit
+        self._side_occupancy[side] ^= bit
+        type_occupancy = self._type_occupancy[side]
+        type_occupancy[piece_type] = type_occupancy.get(piece_type, 0) ^ bit
+        self._rank_occupancy[rank] ^= 1 << file
+        self._file_occupancy[file] ^= 1 << rank
+
+    def place_piece(self, piece, to_pos):
+        """ Updates the Board so that to_pos is occupied by piece, and updates the occupancy bitboards.
+        If to_pos was occupied by a captive, its bits are cleared."""
+        occupant = self._board_state[to_pos]
+        if occupant is not None:
+            self._toggle_bits(occupant, to_pos)
+        self._toggle_bits(piece, to_pos)
+        return super().place_piece(piece, to_pos)
+
+    def clear_pos(self, pos):
+        """ Sets pos to None and clears the occupancy bits of the Piece that occupied it, if any."""
+        occupant = self._board_state[pos]
+        if occupant is not None:
+            self._toggle_bits(occupant, pos)
+        super().clear_pos(pos)
+
+    def get_occupancy(self, side=None, piece_type=None):
+        """ Returns the bitboard of positions occupied by all pieces, by side's pieces, or by side's pieces of
+        piece_type."""
+        if side is None:
+            return self._occupancy
+        if piece_type is None:
+            return self._side_occupancy[side]
+        return self._type_occupancy[side].get(piece_type, 0)
+
+    def count_ortho_jumps(self, from_pos, to_pos):
+        """ Returns the number of pieces on the points strictly between from_pos and to_pos, or None if to_pos is
+        not ortho to from_pos. Counts the bits of the rank or file occupancy between the two points."""
+        from_rank, from_file = divmod(from_pos, NUM_FILES)
+        to_rank, to_file = divmod(to_pos, NUM_FILES)
+        if from_pos == to_pos:
+            return None
+        if from_rank == to_rank:
+            between = self._rank_occupancy[from_rank] & RANK_BETWEEN[from_file][to_file]
+        elif from_file == to_file:
+            between = self._file_occupancy[from_file] & FILE_BETWEEN[from_rank][to_rank]
+        else:
+            return None
+        return bin(between).count('1')
+
+    def _is_line_attacked(self, pos, by_side):
+        """ Returns True if a chariot, cannon, or flying general of by_side attacks pos along an ortho ray.
+        Looks up the first and second blockers on pos's rank and file, and tests them against by_side's chariot,
+        general and cannon bitboards."""
+        rank, file = divmod(pos, NUM_FILES)
+        rank_start = pos - file
+        _, rank_blockers, rank_screened = RANK_LINES[file][self._rank_occupancy[rank]]
+        _, file_blockers, file_screened = FILE_LINES[rank][self._file_occupancy[file]]
+        type_occupancy = self._type_occupancy[by_side]
+        chariots = type_occupancy.get('Ch', 0)
+        cannons = type_occupancy.get('Ca', 0)
+        chariots_and_general = chariots | type_occupancy.get('Ge', 0)   # the general flies along files only
+
+        for point in rank_blockers:
+            if chariots >> (rank_start + point) & 1:
+                return True
+        for point in file_blockers:
+            if chariots_and_general >> (point + file) & 1:
+                return True
+        for point in rank_screened:
+            if cannons >> (rank_start + point) & 1:
+                return True
+        for point in file_screened:
+            if cannons >> (point + file) & 1:
+                return True
+        return False
+
+    def get_slide_targets(self, pos, side):
+        """ Returns a list of the positions a Piece of side sliding ortho from pos can reach, from the rank and file
+        occupancy tables. These are the moves of a Chariot."""
+        rank, file = divmod(pos, NUM_FILES)
+        rank_start = pos - file
+        rank_slides, rank_blockers, _ = RANK_LINES[file][self._rank_occupancy[rank]]
+        file_slides, file_blockers, _ = FILE_LINES[rank][self._file_occupancy[file]]
+        targets = [rank_start + point for point in rank_slides]
+        targets += [point + file for point in file_slides]
+
+        # the first blocker in each direction may be captured if it is a foe
+        friends = self._side_occupancy[side]
+        for blocker in [rank_start + point for point in rank_blockers] + [point + file for point in file_blockers]:
+            if not friends >> blocker & 1:
+                targets.append(blocker)
+        return targets
+
+    def get_slide_captures(self, pos, side):
+        """ Returns a list of the positions of side's foes that a Chariot of side at pos can capture: the first
+        blockers on pos's rank and file, if they are foes."""
+        rank, file = divmod(pos, NUM_FILES)
+        rank_start = pos - file
+        foes = self._occupancy ^ self._side_occupancy[side]
+        captures = []
+        for point in RANK_LINES[file][self._rank_occupancy[rank]][1]:
+            if foes >> (rank_start + point) & 1:
+                captures.append(rank_start + point)
+        for point in FILE_LINES[rank][self._file_occupancy[file]][1]:
+            if foes >> (point + file) & 1:
+                captures.append(point + file)
+        return captures
+
+    def get_cannon_captures(self, pos, side):
+        """ Returns a list of the positions of side's foes that a Cannon of side at pos can capture: the second
+        blockers on pos's rank and file, just beyond the screens, if they are foes."""
+        rank, file = divmod(pos, NUM_FILES)
+        rank_start = pos - file
+        foes = self._occupancy ^ self._side_occupancy[side]
+        captures = []
+        for point in RANK_LINES[file][self._rank_occupancy[rank]][2]:
+            if foes >> (rank_start + point) & 1:
+                captures.append(rank_start + point)
+        for point in FILE_LINES[rank][self._file_occupancy[file]][2]:
+            if foes >> (point + file) & 1:
+                captures.append(point + file)
+        return captures
+
+    def get_cannon_targets(self, pos, side):
+        """ Returns a list of the positions a Cannon of side at pos can reach, from the rank and file occupancy
+        tables: empty points before the screen, and foes just beyond the screen."""
+        rank, file = divmod(pos, NUM_FILES)
+        rank_start = pos - file
+        rank_slides, _, rank_captures = RANK_LINES[file][self._rank_occupancy[rank]]
+        file_slides, _, file_captures = FILE_LINES[rank][self._file_occupancy[file]]
+        targets = [rank_start + point for point in rank_slides]
+        targets += [point + file for point in file_slides]
+
+        # the occupant just beyond the screen in each direction may be captured if it is a foe
+        friends = self._side_occupancy[side]
+        for capture in [rank_start + point for point in rank_captures] + [point + file for point in file_captures]:
+            if not friends >> capture & 1:
+                targets.append(capture)
+        return targets
@@ -1,36 +1,178 @@
+import random
+
+# Board geometry shared by Board, Player and Pieces.
+# Points on the board are addressed by an integer position 0..89, computed as rank_index * 9 + file_index,
+# where rank_index 0 is rank '1' (red's back rank) and file_index 0 is file 'a'.
+FILES = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']                 # column letters, or files
+RANKS = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10']           # row numbers, or ranks
+NUM_FILES = len(FILES)
+NUM_RANKS = len(RANKS)
+NUM_POSITIONS = NUM_FILES * NUM_RANKS
+
+# translation tables between algebraic strings and integer positions, built once at import time
+ALG_TO_POS = {file + rank: rank_index * NUM_FILES + file_index
+              for rank_index, rank in enumerate(RANKS) for file_index, file in enumerate(FILES)}
+POS_TO_ALG = [file + rank for rank in RANKS for file in FILES]
+
+# castle spots for each side: d1-f3 for red, d8-f10 for black
+CASTLE_SPOTS = {
+    'red': frozenset(ALG_TO_POS[file + rank] for file in 'def' for rank in ('1', '2', '3')),
+    'black': frozenset(ALG_TO_POS[file + rank] for file in 'def' for rank in ('8', '9', '10'))
+}
+
+PIECE_TYPES = ('Ge', 'Ad', 'El', 'Ho', 'Ch', 'Ca', 'So')              # two letter labels of every Piece type
+
+
+def _on_board(rank, file):
+    """ Returns True if the (rank, file) location is within the limits of the board"""
+    return 0 <= rank < NUM_RANKS and 0 <= file < NUM_FILES
+
+
+def _build_ortho_rays():
+    """ Returns a list indexed by position of 4 tuples of positions, one per ortho direction (up the ranks, down the
+    ranks, up the files, down the files), ordered outward from the position."""
+    rays = []
+    for pos in range(NUM_POSITIONS):
+        rank, file = divmod(pos, NUM_FILES)
+        rays.append((
+            tuple(range(pos + NUM_FILES, NUM_POSITIONS, NUM_FILES)),           # toward rank 10
+            tuple(range(pos - NUM_FILES, -1, -NUM_FILES)),                      # toward rank 1
+            tuple(range(pos + 1, rank * NUM_FILES + NUM_FILES)),                # toward file i
+            tuple(range(pos - 1, rank * NUM_FILES - 1, -1))                     # toward file a
+        ))
+    return rays
+
+
+def _build_L_moves():
+    """ Returns a list indexed by position of {destination: leg} dictionaries for every L-shaped step from the
+    position. The leg is the point one unit ortho from the start that must be empty for the L-shaped step."""
+    moves = []
+    for pos in range(NUM_POSITIONS):
+        rank, file = divmod(pos, NUM_FILES)
+        dests = {}
+        for rank_diff, file_diff in [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (-1, 2), (1, -2), (-1, -2)]:
+            if not _on_board(rank + rank_diff, file + file_diff):
+                continue
+            if abs(rank_diff) == 2:     # the leg is one unit along the longer side of the L
+                leg_rank, leg_file = rank + rank_diff // 2, file
+            else:
+                leg_rank, leg_file = rank, file + file_diff // 2
+            dests[(rank + rank_diff) * NUM_FILES + file + file_diff] = leg_rank * NUM_FILES + leg_file
+        moves.append(dests)
+    return moves
+
+
+def _build_diagonal_moves(distance):
+    """ Returns a list indexed by position of {destination: midpoint} dictionaries for every diagonal step of
+    distance points from the position. For steps of 2 points the midpoint is the 'eye' that must be empty,
+    for steps of 1 point the midpoint is None."""
+    moves = []
+    for pos in range(NUM_POSITIONS):
+        rank, file = divmod(pos, NUM_FILES)
+        dests = {}
+        for rank_dir, file_dir in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
+            to_rank, to_file = rank + rank_dir * distance, file + file_dir * distance
+            if not _on_board(to_rank, to_file):
+                continue
+            midpoint = None
+            if distance == 2:
+                midpoint = (rank + rank_dir) * NUM_FILES + file + file_dir
+            dests[to_rank * NUM_FILES + to_file] = midpoint
+        moves.append(dests)
+    return moves
+
+
+# per-position move geometry, built once at import time and shared by Board and every Piece type
+ORTHO_RAYS = _build_ortho_rays()
+ORTHO_STEPS = [frozenset(ray[0] for ray in rays if ray) for rays in ORTHO_RAYS]   # ortho neighbours
+L_MOVES = _build_L_moves()
+DIAGONAL_STEPS = _build_diagonal_moves(1)
+DIAGONAL_JUMPS = _build_diagonal_moves(2)
+# for each position, the (horse_pos, leg) pairs of every horse that could step onto the position, and the leg that
+# horse must have empty. L-shaped steps are symmetric, but the leg is always next to the horse, not the position.
+HORSE_ATTACKERS = [tuple((horse_pos, L_MOVES[horse_pos][pos]) for horse_pos in L_MOVES[pos])
+                   for pos in range(NUM_POSITIONS)]
+
+
+def _build_zobrist_keys(seed=1162):
+    """ Returns a dictionary of random 64-bit keys keyed by side, then by piece type, where each value is a list of
+    keys indexed by position. The same seed always gives the same keys, so hashes are stable between runs."""
+    rng = random.Random(seed)
+    return {side: {piece_type: [rng.getrandbits(64) for pos in range(NUM_POSITIONS)] for piece_type in PIECE_TYPES}
+            for side in ('red', 'black')}
+
+
+# Zobrist keys: the hash of a position is the XOR of the key of every Piece on its position, XOR the side key
+# when black is to move. Keys are drawn once at import time from a fixed seed.
+ZOBRIST_KEYS = _build_zobrist_keys()
+ZOBRIST_BLACK_TO_MOVE = random.Random(2162).getrandbits(64)
+
+def encode_move(move):
+    """ Returns move, a (from_pos, to_pos) tuple, as a 16-bit integer: from_pos * 90 + to_pos."""
+    return move[0] * NUM_POSITIONS + move[1]
+
+
+def decode_move(code):
+    """ Returns the (from_pos, to_pos) tuple of a move encoded by encode_move."""
+    return divmod(code, NUM_POSITIONS)
+
+
+# Binary encoding of a position, written by Board.to_bytes: one 4-bit code per position, two positions per byte
+# with the even position in the low nibble, then a 16-bit little-endian word of flags. Code 0 is an empty point,
+# codes 1..7 are red Pieces in PIECE_TYPES order, and black Pieces are the red code plus 8.
+# Bit 0 of the flags is set when black is to move, and the next bits tell, one per soldier in position order,
+# whether that soldier has crossed the river.
+POSITION_BYTES = NUM_POSITIONS // 2 + 2
+PIECE_CODES = {'red': {piece_type: code for code, piece_type in enumerate(PIECE_TYPES, 1)},
+               'black': {piece_type: code + 8 for code, piece_type in enumerate(PIECE_TYPES, 1)}}
+CODE_PIECES = [None] + [('red', piece_type) for piece_type in PIECE_TYPES] + [None] + \
+              [('black', piece_type) for piece_type in PIECE_TYPES]    # (side, piece type) indexed by code
+
 
 class Board:
     """ Creates a Board object for use by XiangqiGame, Players, and Pieces
     Language notes:
-        'loc' refers to a [rank][file] location in memory of the 2D matrix that stores the board state
-        'pos' refers to a '<file><rank>' string used throughout the project as an alias for locations
+        'loc' refers to a (rank, file) tuple of indices, where rank 0 is rank '1' and file 0 is file 'a'
+        'pos' refers to an integer position 0..89 (rank * 9 + file) used throughout Board, Player and Pieces.
+        'alg' refers to a '<file><rank>' algebraic string such as 'e10'. Algebraic strings are only used at the
+        XiangqiGame interface, and are translated to positions once, when a move is received.
         'side' refers to a player side of interest, and is string that may be 'red' or 'black'.
         Elsewhere in the project, 'player' is used as a parameter name for Player objects."""
 
     def __init__(self):
         """ Creates a Board, receives no arguments. The Board tracks the state of Pieces with two instance variables:
-        self._board_state, which is keyed by location, and self._pieces, which is keyed by Piece.
-        self._board_state is a 2D array where indices are [rank][file] locations, and values are Piece objects, or None.
+        self._board_state, which is keyed by position, and self._pieces, which is keyed by Piece.
+        self._board_state is a flat list of 90 positions, where values are Piece objects, or None.
         self._pieces is a dictionary where each key is the unique string representation of a Piece on the Board,
         and values are that Piece's current position.
-        The two representations are intended to be equivalent before and after every call to Piece.move() and
-        Piece.reverse_move() """
+        The two representations are intended to be equivalent before and after every call to Piece.move(),
+        Piece.reverse_move(), make() and unmake().
+        self._undo_stack holds an undo record for every move made by make() that has not been unmade."""
 
-        self._files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']    # column letters, or ranks
-        self._ranks = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10']   # row numbers, or files
+        self._files = FILES    # column letters, or files
+        self._ranks = RANKS    # row numbers, or ranks
 
-        # store the set of all locations that comprise the castle spots for red
-        self._red_castle_spots = {'d1', 'd2', 'd3', 'e1', 'e2', 'e3', 'f1', 'f2', 'f3'}
-        # store the set of all locations that comprise the castle spots for black
-        self._black_castle_spots = {'d10', 'd9', 'd8', 'e10', 'e9', 'e8', 'f10', 'f9', 'f8'}
+        # store the set of all positions that comprise the castle spots for red
+        self._red_castle_spots = CASTLE_SPOTS['red']
+        # store the set of all positions that comprise the castle spots for black
+        self._black_castle_spots = CASTLE_SPOTS['black']
 
         # initialize empty board
-        self._board_state = [  # board state represented as a 2D array
-            [ None for file in self._files] for rank in self._ranks  # initialize all positions to None
-        ]
+        self._board_state = [None] * NUM_POSITIONS  # board state represented as a flat list of positions
 
         self._piece_state = {} # dictionary of piece: pos pairs. When pieces are captured, value is set to None
 
+        self._version = 0   # counts changes to the Board, so that callers can tell if a cached result is stale
+
+        self._hash = 0          # Zobrist hash of the Pieces on the Board, updated as positions are placed and cleared
+        self._square_values = None  # evaluation of each (side, piece type, position), set by set_square_values
+        self._score = 0             # sum of the square values of the Pieces on the Board, red minus black
+        self._undo_stack = []   # (from_pos, to_pos, captive, flags, hash) records of moves made by make(), in order
+
+    def get_version(self):
+        """ Returns a counter that changes every time a position on the Board is placed or cleared."""
+        return self._version
+
     def get_castle_spots(self, side):
         """Returns the set of all positions that comprise the castle positions for side."""
         if side == 'red':
@@ -41,7 +183,7 @@ class Board:
             return False
 
     def get_board_state(self):
-        """ returns pointer to the 2D array that tracks the occupants of locations on the Board."""
+        """ returns pointer to the flat list that tracks the occupants of positions on the Board."""
         return self._board_state
 
     def display_board(self, num_spaces = 2):
@@ -49,8 +191,9 @@ class Board:
         delim = ' ' * num_spaces        # number of spaces between each location in a rank
         print( (delim * 9), "BLACK")   # print black label, somewhat centered
         print(' ', delim, ("  " + delim).join(self._files))  # print letter files in order
-        for rank in reversed(self._ranks):                      # print black side first, from rank 10 to rank 1
-            rank_state = self._board_state[int(rank) - 1]
+        for rank_index in reversed(range(NUM_RANKS)):        # print black side first, from rank 10 to rank 1
+            rank = self._ranks[rank_index]
+            rank_state = self._board_state[rank_index * NUM_FILES:(rank_index + 1) * NUM_FILES]
             if rank == '10':
                 line = rank + ' ' * (num_spaces - 1)
             else:
@@ -69,9 +212,17 @@ class Board:
         """ Updates self._board_state and self._piece_state so that to_pos is occupied by piece.
         Note that Board has no access to Pieces.
         Piece is responsible for updating its own variable tracking its current position"""
-        rank,file = self.get_loc_from_pos(to_pos) # translate the to_pos string to a [rank][file] index
-        self._board_state[rank][file] = piece  # piece now occupies to_pos
+        occupant = self._board_state[to_pos]
+        if occupant is not None:           # a captive's key leaves the hash, and its value leaves the score
+            self._hash ^= ZOBRIST_KEYS[occupant._side][occupant.piece_type][to_pos]
+            if self._square_values is not None:
+                self._score -= self._square_values[occupant._side][occupant.piece_type][to_pos]
+        self._hash ^= ZOBRIST_KEYS[piece._side][piece.piece_type][to_pos]
+        if self._square_values is not None:
+            self._score += self._square_values[piece._side][piece.piece_type][to_pos]
+        self._board_state[to_pos] = piece  # piece now occupies to_pos
         self._piece_state[str(piece)] = to_pos # update piece's position in self._piece_state dictionary
+        self._version += 1
         return True
 
     def clear_piece(self, piece):
@@ -82,25 +233,165 @@ class Board:
 
     def clear_pos(self, pos):
         """ Sets pos to None. Used for clearing a pos when a piece moves away from pos"""
-        rank, file = self.get_loc_from_pos(pos)
-        self._board_state[rank][file] = None  # set pos to None
+        occupant = self._board_state[pos]
+        if occupant is not None:
+            self._hash ^= ZOBRIST_KEYS[occupant._side][occupant.piece_type][pos]
+            if self._square_values is not None:
+                self._score -= self._square_values[occupant._side][occupant.piece_type][pos]
+        self._board_state[pos] = None  # set pos to None
+        self._version += 1
+
+    def make(self, move):
+        """ Makes move, a (from_pos, to_pos) tuple, without checking that it is legal, and pushes an undo record so
+        that unmake() can restore the Board. The move must come from a move generator, or have been validated.
+        Returns the captured Piece, or None.
+        Side effects:
+            Moves the Piece on from_pos to to_pos and updates its position and flags.
+            If there is a captive, clears it from the Board and sets its position to None."""
+        from_pos, to_pos = move
+        self._undo_stack.append((from_pos, to_pos, self._board_state[to_pos], self._board_state[from_pos].get_flags(),
+                                 self._hash))
+        return self.play(move)
+
+    def play(self, move):
+        """ Makes move, a (from_pos, to_pos) tuple, without checking that it is legal and without an undo record,
+        for replaying moves known to be legal. make() pushes its undo record and then calls play().
+        Returns the captured Piece, or None. Side effects are as for make()."""
+        from_pos, to_pos = move
+        piece = self._board_state[from_pos]
+        captive = self._board_state[to_pos]
+        self.clear_pos(from_pos)
+        self.place_piece(piece, to_pos)
+        piece.set_pos(to_pos)
+        if captive is not None:
+            self.clear_piece(captive)
+            captive.set_pos(None)
+        piece.update_flags(to_pos)
+        return captive
+
+    def unmake(self):
+        """ Reverses the last move made by make(), restoring any captive, the moving Piece's flags, and the hash."""
+        from_pos, to_pos, captive, flags, prior_hash = self._undo_stack.pop()
+        piece = self._board_state[to_pos]
+
+        if captive is not None:     # restore the captive, or clear to_pos
+            self.place_piece(captive, to_pos)
+            captive.set_pos(to_pos)
+        else:
+            self.clear_pos(to_pos)
+        self.place_piece(piece, from_pos)
+        piece.set_pos(from_pos)
+        piece.set_flags(flags)
+        self._hash = prior_hash
+
+    def get_hash(self):
+        """ Returns the 64-bit Zobrist hash of the Pieces on the Board. The side to move is not included."""
+        return self._hash
+
+    def compute_hash(self):
+        """ Returns the Zobrist hash of the Pieces on the Board computed from scratch. Used to check the incremental
+        hash, and to resynchronize it after self._board_state is edited directly."""
+        board_hash = 0
+        for pos, piece in enumerate(self._board_state):
+            if piece is not None:
+                board_hash ^= ZOBRIST_KEYS[piece._side][piece.piece_type][pos]
+        return board_hash
+
+    def to_bytes(self, side='red'):
+        """ Returns the POSITION_BYTES long binary encoding of the Pieces on the Board, with side to move, and
+        whether each soldier has crossed the river. Read back by load_bytes."""
+        data = bytearray(POSITION_BYTES)
+        flags = 1 if side == 'black' else 0
+        soldier_bit = 2
+        for pos, piece in enumerate(self._board_state):
+            if piece is not None:
+                data[pos >> 1] |= PIECE_CODES[piece._side][piece.piece_type] << ((pos & 1) << 2)
+                if piece.piece_type == 'So':
+                    if piece.get_flags():
+                        flags |= soldier_bit
+                    soldier_bit <<= 1
+        data[-2] = flags & 0xFF
+        data[-1] = flags >> 8
+        return bytes(data)
+
+    def load_bytes(self, data, unplaced):
+        """ Places Pieces on this Board, which must have no Pieces on it, as encoded in data by to_bytes, and
+        returns the side to move. The Board cannot create Pieces, so they are taken from unplaced, a dictionary
+        keyed by side, then by piece type, of lists of Pieces off the Board. Each list is popped from its end, so the
+        Piece placed first is last. Raises ValueError if data is not a position encoding, or needs more Pieces of a
+        type than unplaced holds."""
+        if len(data) != POSITION_BYTES:
+            raise ValueError("a position is {} bytes, not {}".format(POSITION_BYTES, len(data)))
+        flags = data[-2] | data[-1] << 8
+        soldier_bit = 2
+        for pos in range(NUM_POSITIONS):
+            code = (data[pos >> 1] >> ((pos & 1) << 2)) & 0xF
+            if not code:
+                continue
+            if CODE_PIECES[code] is None:
+                raise ValueError("bad piece code {} at position {}".format(code, pos))
+            side, piece_type = CODE_PIECES[code]
+            pieces = unplaced[side][piece_type]
+            if not pieces:
+                raise ValueError("too many {} {} Pieces in position".format(side, piece_type))
+            piece = pieces.pop()
+            self.place_piece(piece, pos)
+            piece.set_pos(pos)
+            if piece_type == 'So':
+                piece.set_flags(bool(flags & soldier_bit))
+                soldier_bit <<= 1
+        if flags & 1:
+            return 'black'
+        return 'red'
+
+    def set_square_values(self, square_values):
+        """ Sets the values the Board sums into its score: a dictionary keyed by side, then by piece type, of lists
+        of values indexed by position, with black's values negative. Pass None to stop keeping a score.
+        The score is computed from scratch here, and kept up to date as positions are placed and cleared."""
+        self._square_values = square_values
+        self._score = self.compute_score()
+
+    def get_square_values(self):
+        """ Returns the square values set by set_square_values, or None."""
+        return self._square_values
+
+    def get_score(self):
+        """ Returns the sum of the square values of the Pieces on the Board, positive when red is ahead."""
+        return self._score
+
+    def compute_score(self):
+        """ Returns the score of the Pieces on the Board computed from scratch, or 0 if no square values are set."""
+        if self._square_values is None:
+            return 0
+        score = 0
+        for pos, piece in enumerate(self._board_state):
+            if piece is not None:
+                score += self._square_values[piece._side][piece.piece_type][pos]
+        return score
+
+    def get_ply(self):
+        """ Returns the number of moves made by make() that have not been unmade."""
+        return len(self._undo_stack)
+
+    def get_pos_from_alg(self, alg):
+        """ Translates an algebraic string such as 'e10' to a position. Returns None if alg is not on the Board."""
+        return ALG_TO_POS.get(alg)
+
+    def get_alg_from_pos(self, pos):
+        """ Translates a position to its algebraic string, such as 'e10'."""
+        return POS_TO_ALG[pos]
 
     def get_loc_from_pos(self, pos):
-        """ Helper method to translate pos strings to indices, in order to set and get occupants of the board state"""
-        rank_index = int(pos[1:]) - 1
-        file_index = self._files.index(pos[0])
-        return (rank_index, file_index) # return [rank][file] tuple corresponding to pos in self._board_state
+        """ Helper method to translate a position to a (rank, file) tuple of indices"""
+        return divmod(pos, NUM_FILES) # return (rank, file) tuple corresponding to pos
 
     def get_pos_from_loc(self, loc):
-        """ Helper method to translate a (rank, file) tuple index into a position string"""
-        rank_str = str(loc[0] + 1)
-        file_str = str(self._files[loc[1]])
-        return file_str + rank_str
+        """ Helper method to translate a (rank, file) tuple index into a position"""
+        return loc[0] * NUM_FILES + loc[1]
 
     def get_piece_from_pos(self, pos):
         """ Returns the piece at pos, or None if pos is not occupied"""
-        rank, file = self.get_loc_from_pos(pos)
-        return self._board_state[rank][file]
+        return self._board_state[pos]
 
     def get_general_pos(self, side):
         """Returns the position of the general on side. Side is a string passed as 'red' or 'black'."""
@@ -109,138 +400,259 @@ class Board:
     def get_L_path(self, from_pos, to_pos):
         """ Returns an ordered list of [(position, occupant) tuples] from from_pos to to_pos along L path.
         Do not include current location in the list. Last item is to_pos."""
-        to_rank, to_file = self.get_loc_from_pos(to_pos)
-        from_rank, from_file = self.get_loc_from_pos(from_pos)
-        path = []
-
-        # Generate the max 8 possible L-path destinations from the start location. L-paths consist of 3 points:
-        # a start_loc(not returned), an intermediate_loc one point orthogonal from start_loc, and a dest_loc
-        # one point diagonal to intermediate_loc
-
-        # Generate the 4 maximum intermediate locations are one unit in every ortho direction from start_loc
-        loc_diffs_int = [(0,-1), (0,1), (1,0), (-1,0)] # permute one unit difference in rank and file directions
-        # create a list of possible intermediate locations
-        int_locs = [(from_rank + rank_diff, from_file + file_diff) for rank_diff, file_diff in loc_diffs_int]
-        # filter any locs that are out of range
-        int_locs = [(rank, file) for rank,file in int_locs
-                    if 0 <= rank < len(self._ranks) and 0 <= file < len(self._files)]
-
-        # A valid L path will continue to dest_loc along the ortho trajectory set by intermediate location.
-        # That is, from start_loc to intermediate_loc, and from intermediate_loc to destination,
-        # both moves increase in either rank or file by exactly one unit.
-        # For any valid L-path, there is only one intermediate location that corresponds to destination.
-        # Find the intermediate location corresponding to destination.
-        int_pos = None
-        for int_rank, int_file in int_locs:
-            if from_rank - int_rank == int_rank - to_rank: # both ranks increase or decrease by 1 unit
-                int_pos = self.get_pos_from_loc((int_rank, int_file))
-            elif from_file - int_file == int_file - to_file: # both files increase or decrease by 1 unit
-                int_pos = self.get_pos_from_loc((int_rank, int_file))
-
-        if int_pos:
-            try_dest = self.get_diagonal_path(int_pos, to_pos) # find a diagonal, if any from int to dest
-
-        if int_pos and try_dest:           # valid diagonal found, append both to path
-            path.append( (int_pos, self.get_piece_from_pos(int_pos)) )
-            path += try_dest
-
-        return path # path will be a valid L path, or empty if no valid L path
+        # L-paths consist of 3 points: a start_loc(not returned), an intermediate_loc one point orthogonal from
+        # start_loc, and a dest_loc one point diagonal to intermediate_loc. The intermediate point is looked up
+        # in the precomputed table of L-shaped steps.
+        int_pos = L_MOVES[from_pos].get(to_pos)
+        if int_pos is None:
+            return [] # no valid L path
+
+        return [(int_pos, self._board_state[int_pos]), (to_pos, self._board_state[to_pos])]
 
     def get_diagonal_path(self, from_pos, to_pos):
-        """ Returns an ordered list of [ (location, occupant) tuples] from from_pos to to_pos along diagonal.
+        """ Returns an ordered list of [ (position, occupant) tuples] from from_pos to to_pos along diagonal.
         Do not include current location in the list. Last item is to_pos. """
-        to_rank, to_file = self.get_loc_from_pos(to_pos)
-        from_rank, from_file = self.get_loc_from_pos(from_pos)
-        path = []
-
-        if from_rank == to_rank or from_file == to_file: # return empty path if positions are ortho to each other
-            return path
+        to_rank, to_file = divmod(to_pos, NUM_FILES)
+        from_rank, from_file = divmod(from_pos, NUM_FILES)
 
         rank_diff = to_rank - from_rank
         file_diff = to_file - from_file
-        if abs(rank_diff) != abs(file_diff): # return empty path if horizontal distance does not equal vertical distance
-            return path
+        # return empty path if positions are ortho to each other, or if horizontal distance does not equal
+        # vertical distance
+        if rank_diff == 0 or abs(rank_diff) != abs(file_diff):
+            return []
 
-        # determine which direction we are iterating over the ranks and files
-        flip_file = file_diff < 0
-        flip_rank = rank_diff < 0
-
-        # get the ranges over the ranks and files in the correct order of iteration
-        if flip_rank:
-            rank_range = range(from_rank - 1, to_rank - 1, - 1)
-        else:
-            rank_range = range(from_rank + 1, to_rank + 1)
-
-        if flip_file:
-            file_range = range(from_file -1, to_file - 1, -1)
-        else:
-            file_range = range(from_file + 1, to_file + 1)
-
-        # generate the positions along diagonal by pairing rank range and file range
-        diag_positions = zip(rank_range, file_range) # zip([0,1,2] , [0,1,2]) will give (0,0), (1,1), (2,2)
-        for rank, file in diag_positions:
-            pos = self.get_pos_from_loc((rank,file))
-            path.append((pos, self.get_piece_from_pos(pos)))  # add the position and occupant at pos to the path
-        return path
+        # each step along the diagonal moves one rank and one file in the direction of to_pos
+        step = (NUM_FILES if rank_diff > 0 else -NUM_FILES) + (1 if file_diff > 0 else -1)
+        board_state = self._board_state
+        return [(pos, board_state[pos]) for pos in range(from_pos + step, to_pos + step, step)]
 
     def get_ortho_path(self, from_pos, to_pos):
-        """Returns ordered list of [ (location, occupant) tuples] from from_pos to to_pos along ortho.
+        """Returns ordered list of [ (position, occupant) tuples] from from_pos to to_pos along ortho.
         Do not include current location in the list. Last item is to_pos. """
 
-        to_rank, to_file = self.get_loc_from_pos(to_pos)
-        from_rank, from_file = self.get_loc_from_pos(from_pos)
-        path = []
-        flip_dir = False
-
-        if from_rank != to_rank and from_file != to_file: # return empty path if to_pos is not ortho to from_pos
-            return path
-
-        # determine which direction we are iterating over the ranks and files
-        if to_rank < from_rank:
-            flip_dir = True
-        if to_file < from_file:
-            flip_dir = True
-
-        # get the ranges over the ranks and files in the correct order of iteration
-        if from_rank == to_rank and not flip_dir:
-            file_range = range(from_file + 1, to_file + 1)
-        elif from_rank == to_rank and flip_dir:
-            file_range = range(from_file - 1, to_file - 1, -1)
-        elif from_file == to_file and not flip_dir:
-            rank_range = range(from_rank + 1, to_rank + 1)
-        elif from_file == to_file and flip_dir:
-            rank_range = range(from_rank - 1, to_rank - 1, -1)
-
-        if from_rank == to_rank:   # keep rank constant, add all file steps in range
-            for file in file_range: # get positions along rank from [from_file +1, to_file]
-                this_pos = self.get_pos_from_loc((to_rank, file))
-                occupant = self.get_piece_from_pos(this_pos)
-                path.append((this_pos, occupant)) # add position and occupant to path
-
-        elif from_file == to_file: # keep file constant, add all rank steps in range
-            for rank in rank_range: # get positions along file from [from_rank + 1, to_rank]
-                this_pos = self.get_pos_from_loc((rank, to_file))
-                occupant = self.get_piece_from_pos(this_pos)
-                path.append((this_pos, occupant)) # add position and occupant to path
-        return path
+        # pick the precomputed ray from from_pos toward to_pos, and the number of points along it to to_pos
+        up_ranks, down_ranks, up_files, down_files = ORTHO_RAYS[from_pos]
+        if from_pos // NUM_FILES == to_pos // NUM_FILES:    # same rank, step along files
+            if to_pos > from_pos:
+                ray, length = up_files, to_pos - from_pos
+            else:
+                ray, length = down_files, from_pos - to_pos
+        elif from_pos % NUM_FILES == to_pos % NUM_FILES:    # same file, step along ranks
+            if to_pos > from_pos:
+                ray, length = up_ranks, (to_pos - from_pos) // NUM_FILES
+            else:
+                ray, length = down_ranks, (from_pos - to_pos) // NUM_FILES
+        else:                               # return empty path if to_pos is not ortho to from_pos
+            return []
+
+        board_state = self._board_state
+        return [(pos, board_state[pos]) for pos in ray[:length]]
+
+    def count_ortho_jumps(self, from_pos, to_pos):
+        """ Returns the number of pieces on the points strictly between from_pos and to_pos, or None if to_pos is
+        not ortho to from_pos."""
+        path = self.get_ortho_path(from_pos, to_pos)
+        if not path:
+            return None
+        return sum(1 for pos, occupant in path[:-1] if occupant is not None)
+
+    def get_slide_targets(self, pos, side):
+        """ Returns a list of the positions a Piece of side sliding ortho from pos can reach: every empty point along
+        each ortho ray up to the first occupant, and that occupant's point if it is held by side's foe.
+        These are the moves of a Chariot."""
+        board_state = self._board_state
+        targets = []
+        for ray in ORTHO_RAYS[pos]:
+            for to_pos in ray:
+                occupant = board_state[to_pos]
+                if occupant is None:            # empty point, keep sliding
+                    targets.append(to_pos)
+                    continue
+                if occupant.get_side() != side: # first occupant along the ray may be captured if it is a foe
+                    targets.append(to_pos)
+                break
+        return targets
+
+    def get_cannon_targets(self, pos, side):
+        """ Returns a list of the positions a Cannon of side at pos can reach: every empty point along each ortho ray
+        before the first occupant (the screen), and the point of the next occupant beyond the screen if it is held
+        by side's foe."""
+        board_state = self._board_state
+        targets = []
+        for ray in ORTHO_RAYS[pos]:
+            screen_found = False
+            for to_pos in ray:
+                occupant = board_state[to_pos]
+                if not screen_found:
+                    if occupant is None:        # empty point before the screen, keep sliding
+                        targets.append(to_pos)
+                    else:                       # first occupant is the screen, friend or foe
+                        screen_found = True
+                elif occupant is not None:      # first occupant beyond the screen
+                    if occupant.get_side() != side:
+                        targets.append(to_pos)
+                    break
+        return targets
+
+    def get_slide_captures(self, pos, side):
+        """ Returns a list of the positions of side's foes that a Piece sliding ortho from pos can capture: the first
+        occupant along each ortho ray, if it is a foe. These are the captures of a Chariot."""
+        board_state = self._board_state
+        captures = []
+        for ray in ORTHO_RAYS[pos]:
+            for to_pos in ray:
+                occupant = board_state[to_pos]
+                if occupant is not None:
+                    if occupant.get_side() != side:
+                        captures.append(to_pos)
+                    break
+        return captures
+
+    def get_cannon_captures(self, pos, side):
+        """ Returns a list of the positions of side's foes that a Cannon of side at pos can capture: the occupant
+        just beyond the first occupant (the screen) along each ortho ray, if it is a foe."""
+        board_state = self._board_state
+        captures = []
+        for ray in ORTHO_RAYS[pos]:
+            screen_found = False
+            for to_pos in ray:
+                occupant = board_state[to_pos]
+                if occupant is None:
+                    continue
+                if not screen_found:            # first occupant is the screen, friend or foe
+                    screen_found = True
+                else:                           # first occupant beyond the screen
+                    if occupant.get_side() != side:
+                        captures.append(to_pos)
+                    break
+        return captures
+
+    def is_square_attacked(self, pos, by_side):
+        """ Returns True if a Piece of by_side could capture on pos on its next move. Works outward from pos:
+        along the ortho rays for chariots, cannons and the flying general, then over the points a horse, soldier,
+        advisor or elephant would have to step from.
+        A general is treated as attacking every point along its file up to the first occupant, since the flying
+        general rule only matters when the opposing general is on pos."""
+        return self._is_line_attacked(pos, by_side) or self._is_step_attacked(pos, by_side)
+
+    def _is_line_attacked(self, pos, by_side):
+        """ Returns True if a chariot, cannon, or flying general of by_side attacks pos along an ortho ray."""
+        board_state = self._board_state
+        for ray_index, ray in enumerate(ORTHO_RAYS[pos]):
+            screen_found = False
+            for ray_pos in ray:
+                occupant = board_state[ray_pos]
+                if occupant is None:
+                    continue
+                if not screen_found:        # first occupant along the ray: a chariot, or a general along the file
+                    if occupant.get_side() == by_side:
+                        piece_type = occupant.piece_type
+                        if piece_type == 'Ch' or (piece_type == 'Ge' and ray_index < 2):
+                            return True
+                    screen_found = True
+                else:                       # second occupant along the ray: a cannon, over the screen
+                    if occupant.piece_type == 'Ca' and occupant.get_side() == by_side:
+                        return True
+                    break
+        return False
+
+    def _is_step_attacked(self, pos, by_side):
+        """ Returns True if a horse, soldier, general, advisor, or elephant of by_side could step onto pos."""
+        board_state = self._board_state
+
+        # horses, checking the leg next to each horse
+        for horse_pos, leg in HORSE_ATTACKERS[pos]:
+            occupant = board_state[horse_pos]
+            if occupant is not None and occupant.piece_type == 'Ho' and occupant.get_side() == by_side \
+                    and board_state[leg] is None:
+                return True
+
+        # soldiers, one point behind pos from by_side's point of view, or beside pos once across the river
+        behind = pos - NUM_FILES if by_side == 'red' else pos + NUM_FILES
+        for step_pos in ORTHO_STEPS[pos]:
+            occupant = board_state[step_pos]
+            if occupant is None or occupant.get_side() != by_side:
+                continue
+            piece_type = occupant.piece_type
+            if piece_type == 'So':
+                if step_pos == behind or (step_pos // NUM_FILES == pos // NUM_FILES and occupant.has_crossed_river()):
+                    return True
+            elif piece_type == 'Ge' and pos in CASTLE_SPOTS[by_side]:   # general steps within its castle
+                return True
+
+        # advisors stay within their castle, elephants stay on their side of the river
+        if pos in CASTLE_SPOTS[by_side]:
+            for step_pos in DIAGONAL_STEPS[pos]:
+                occupant = board_state[step_pos]
+                if occupant is not None and occupant.piece_type == 'Ad' and occupant.get_side() == by_side:
+                    return True
+        if (pos // NUM_FILES < NUM_RANKS // 2) == (by_side == 'red'):
+            for elephant_pos, eye in DIAGONAL_JUMPS[pos].items():
+                occupant = board_state[elephant_pos]
+                if occupant is not None and occupant.piece_type == 'El' and occupant.get_side() == by_side \
+                        and board_state[eye] is None:
+                    return True
+        return False
+
+    def get_pins(self, pos, by_side):
+        """ Returns a tuple (pinned, screened) of sets of positions that constrain the moves of the side defending
+        pos against by_side, assuming pos is not attacked now. Pos is usually the defending general's position.
+        pinned holds the positions of defending pieces that may expose pos if they move away: pieces between pos and
+        a chariot or the flying general, either of the two screens between pos and a cannon, and pieces on the leg
+        of a horse that would otherwise attack pos.
+        screened holds the empty positions between pos and a cannon with no screen. Any piece moved there would
+        become the screen, so such moves always expose pos."""
+        board_state = self._board_state
+        pinned = set()
+        screened = set()
+        for ray_index, ray in enumerate(ORTHO_RAYS[pos]):
+            # find the first three occupants along the ray
+            occupant_positions = []
+            for ray_pos in ray:
+                if board_state[ray_pos] is not None:
+                    occupant_positions.append(ray_pos)
+                    if len(occupant_positions) == 3:
+                        break
+            if not occupant_positions:
+                continue
+
+            occupants = [board_state[occupant_pos] for occupant_pos in occupant_positions]
+            first = occupants[0]
+            if first.get_side() == by_side and first.piece_type == 'Ca':
+                # an unscreened cannon makes every empty point before it unsafe
+                screened.update(ray[:ray.index(occupant_positions[0])])
+
+            if len(occupants) > 1 and first.get_side() != by_side:
+                # a defender between pos and a chariot, or between pos and the general along a file, is pinned
+                second = occupants[1]
+                if second.get_side() == by_side and \
+                        (second.piece_type == 'Ch' or (second.piece_type == 'Ge' and ray_index < 2)):
+                    pinned.add(occupant_positions[0])
+            if len(occupants) > 2 and occupants[2].piece_type == 'Ca' and occupants[2].get_side() == by_side:
+                # two screens before a cannon: either screen that is a defender is pinned
+                for screen_pos, screen in zip(occupant_positions[:2], occupants[:2]):
+                    if screen.get_side() != by_side:
+                        pinned.add(screen_pos)
+
+        # defenders on the leg of an attacking horse
+        for horse_pos, leg in HORSE_ATTACKERS[pos]:
+            horse = board_state[horse_pos]
+            if horse is not None and horse.piece_type == 'Ho' and horse.get_side() == by_side and \
+                    board_state[leg] is not None:
+                pinned.add(leg)
+        return pinned, screened
 
     def get_ranks(self):
-        """Returns an ordered array of the Board's rank letters, 'a' through 'i'."""
+        """Returns an ordered array of the Board's rank numbers, '1' through '10'."""
         return self._ranks
 
     def get_files(self):
-        """Returns an ordered array of the Board's file numbers, '1' through '10'."""
+        """Returns an ordered array of the Board's file letters, 'a' through 'i'."""
         return self._files
 
     def get_available_positions(self, side):
         """ Returns a list of all positions that are unoccupied, or occupied by side's foe. Includes (at least)
         all possible locations that a Piece on side could occupy to on next move. Side is passed as 'red' or 'black'. """
-        return_pos = []
-        for file_str in self._files:
-            for rank_str in self._ranks:
-                occupant = self.get_piece_from_pos(file_str + rank_str)
-                if occupant is None or occupant.get_side() != side:
-                    return_pos.append(file_str + rank_str)
-        return return_pos
-
-
+        return [pos for pos, occupant in enumerate(self._board_state)
+                if occupant is None or occupant.get_side() != side]
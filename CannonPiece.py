@@ -4,6 +4,8 @@ class CannonPiece(Piece):
     """ Instantiates a Cannon Piece
         cannon_positions is a class variable, a dictionary of initial positions keyed by player color
         Two Cannon pieces are created by a call to Player.__init__()."""
+    piece_type = 'Ca'   # label for this Piece type
+    value = 450         # material value of this Piece type, for evaluation
     cannon_postions = {
         'red': ['b3', 'h3'],
         'black': ['b8', 'h8']
@@ -17,7 +19,8 @@ class CannonPiece(Piece):
 
         # Assign a position from CannonPiece
         self._id =  id_num  # id_num is passed as argument, by Player, and will be 1 or 2
-        self._pos = CannonPiece.cannon_postions[side][id_num - 1]  # keep track of positions used based on id number
+        # keep track of positions used based on id number
+        self._pos = board.get_pos_from_alg(CannonPiece.cannon_postions[side][id_num - 1])
 
     def __repr__(self):
         """Return an informative label for this Piece: ["r" or "b"] + "Ca" + [id_num for this specific piece].
@@ -25,14 +28,38 @@ class CannonPiece(Piece):
         return self._side[0] + "Ca" + str(self._id)
 
     def is_legal(self, to_pos):
-        """Returns True if it is legal for Cannon to move to to_pos. Checks Piece.is_legal() conditions,
-        with additional support for exactly 1 jump if move to to_pos would result in a capture."""
+        """Returns True if it is legal for Cannon to move to to_pos. Cannons move ortho without jumping, and
+        capture by jumping exactly 1 piece. The Board counts the pieces jumped between the two points."""
+
+        if self._pos is None or self._pos == to_pos:   # captured pieces cannot move, and a move must change the board
+            return False
 
         # cannon requires screen piece for capture, friend or foe
-        # if this move would result in a capture, temporarily set jumps to 1
+        # if this move would result in a capture, it must jump exactly 1 piece. Otherwise it must not jump.
         occupant = self._board.get_piece_from_pos(to_pos)  # get the potential capture
-        if occupant and occupant.get_side() != self._side: # if the potential capture is a foe, must have exactly 1 jump
-            self._jumps = 1
-        result = super().is_legal(to_pos)           # call super with jumps updated if necessary
-        self._jumps = 0                             # reset jumps to 0
-        return result
+        if occupant is None:
+            jumps = 0
+        elif occupant.get_side() != self._side:        # if the potential capture is a foe, must have exactly 1 jump
+            jumps = 1
+        else:                                           # to_pos is occupied by a friend
+            return False
+        return self._board.count_ortho_jumps(self._pos, to_pos) == jumps
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this Cannon. The Board slides outward
+        along each ortho ray: empty points before the first occupant are moves, the first occupant is the screen,
+        and the next occupant beyond the screen may be captured if it is a foe."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        for to_pos in self._board.get_cannon_targets(from_pos, self._side):
+            yield from_pos, to_pos
+
+    def generate_captures(self):
+        """ Yields the (from_pos, to_pos) captures legal at the Piece level for this Cannon: the occupant just beyond
+        the screen along each ortho ray, if it is a foe. Empty points are not visited."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        for to_pos in self._board.get_cannon_captures(from_pos, self._side):
+            yield from_pos, to_pos
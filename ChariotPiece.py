@@ -4,6 +4,8 @@ class ChariotPiece(Piece):
     """Creates ChariotPieces
         chariot_positions is a class variable, a dictionary of initial positions keyed by player color
         Two ChariotPositions are created by a call to Player.__init__()."""
+    piece_type = 'Ch'   # label for this Piece type
+    value = 900         # material value of this Piece type, for evaluation
     chariot_postions = {
         'red': ['a1', 'i1'],
         'black': ['a10', 'i10']
@@ -17,9 +19,35 @@ class ChariotPiece(Piece):
 
         # assign a position from ChariotPiece
         self._id =  id_num # id_num is passed as argument, by Player, and will be 1 or 2
-        self._pos = ChariotPiece.chariot_postions[side][id_num - 1] # keep track of positions used based on id number
+        # keep track of positions used based on id number
+        self._pos = board.get_pos_from_alg(ChariotPiece.chariot_postions[side][id_num - 1])
 
     def __repr__(self):
         """Return an informative label for this Piece: ["r" or "b"] + "Ch" + [id_num for this specific piece].
         This is intended to be unique for every piece in a Game """
-        return self._side[0] + "Ch" + str(self._id)
\ No newline at end of file
+        return self._side[0] + "Ch" + str(self._id)
+
+    def is_legal(self, to_pos):
+        """Returns True if it is legal for Chariot to move to to_pos: to_pos must be ortho to the Chariot with no
+        pieces between, and must not be occupied by a friend. The Board counts the pieces between the two points."""
+        if self._pos is None:           # do not allow captured pieces to move
+            return False
+        return self._board.count_ortho_jumps(self._pos, to_pos) == 0 and self.can_occupy(to_pos)
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this Chariot. The Board slides outward
+        along each ortho ray, up to and including the first occupied point if it is held by a foe."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        for to_pos in self._board.get_slide_targets(from_pos, self._side):
+            yield from_pos, to_pos
+
+    def generate_captures(self):
+        """ Yields the (from_pos, to_pos) captures legal at the Piece level for this Chariot: the first occupant
+        along each ortho ray, if it is a foe."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        for to_pos in self._board.get_slide_captures(from_pos, self._side):
+            yield from_pos, to_pos
@@ -1,18 +1,36 @@
 from Piece import Piece
+from Board import DIAGONAL_JUMPS, NUM_FILES
+
+
+def _build_elephant_moves(legal_ranks):
+    """ Returns a list indexed by position of {destination: eye} dictionaries for the 2 point diagonal steps
+    from each position that stay within legal_ranks."""
+    return [{dest: eye for dest, eye in DIAGONAL_JUMPS[pos].items() if dest // NUM_FILES in legal_ranks}
+            for pos in range(len(DIAGONAL_JUMPS))]
+
 
 class ElephantPiece(Piece):
     """Creates ElephantPieces
                 elephant_positions is a class variable, a dictionary of initial positions keyed by player color
                 Two ElephantPieces are created by a call to Player.__init__()."""
+    piece_type = 'El'   # label for this Piece type
+    value = 200         # material value of this Piece type, for evaluation
     elephant_positions = {
         'red': ['c1', 'g1'],
         'black': ['c10', 'g10']
     }
-    # legal_ranks is a class variable, a set of ranks that elephants may occupy keyed by player side
-    # Elephants cannot cross the river.
+    # legal_ranks is a class variable, a set of rank indices that elephants may occupy keyed by player side
+    # Elephants cannot cross the river: red stays on ranks 1-5, black on ranks 6-10.
     legal_ranks = {
-        'red': {'1','2','3','4','5'},
-        'black': {'10','9','8','7','6'}
+        'red': {0, 1, 2, 3, 4},
+        'black': {9, 8, 7, 6, 5}
+    }
+    # elephant_moves is a class variable keyed by player side, built once at import time. Each value is a list
+    # indexed by position of {destination: eye} dictionaries. The eye, the point between the elephant and its
+    # destination, must be empty for the elephant to move.
+    elephant_moves = {
+        'red': _build_elephant_moves(legal_ranks['red']),
+        'black': _build_elephant_moves(legal_ranks['black'])
     }
 
     def __init__(self, side, board, id_num):
@@ -24,14 +42,40 @@ class ElephantPiece(Piece):
 
         # assign a position from ElephantPiece
         self._id = id_num # id_num is passed as argument, by Player, and will be 1 or 2
-        self._pos = ElephantPiece.elephant_positions[side][id_num - 1] # keep track of positions used based on id number
+        # keep track of positions used based on id number
+        self._pos = board.get_pos_from_alg(ElephantPiece.elephant_positions[side][id_num - 1])
 
     def __repr__(self):
         """Return an informative label for this Piece: ["r" or "b"] + "El" + [id_num for this specific piece].
                         This is intended to be unique for every piece in a Game """
         return self._side[0] + "El" + str(self._id)
 
+    def get_path(self, to_pos):
+        """ Returns the diagonal path [(eye, occupant), (to_pos, occupant)] looked up in the table of elephant moves,
+        or False if to_pos is not a 2 point diagonal step on this Elephant's side of the river."""
+        eye = ElephantPiece.elephant_moves[self._side][self._pos].get(to_pos)
+        if eye is None:
+            return False
+        return [(eye, self._board.get_piece_from_pos(eye)), (to_pos, self._board.get_piece_from_pos(to_pos))]
+
     def is_legal(self, to_pos):
-        """ call Piece.is_legal() with additional restriction that Elephants stay within their legal ranks,
-        i.e. they don't cross the river."""
-        return super().is_legal(to_pos) and to_pos[1:] in ElephantPiece.legal_ranks[self._side]
\ No newline at end of file
+        """ Returns True if it is legal for Elephant to move to to_pos: to_pos must be exactly 2 points diagonal
+        from the Elephant with an empty eye, Elephants stay within their legal ranks, i.e. they don't cross the
+        river, and to_pos must not be occupied by a friend."""
+        if self._pos is None:           # do not allow captured pieces to move
+            return False
+        eye = ElephantPiece.elephant_moves[self._side][self._pos].get(to_pos)
+        if eye is None or self._board.get_piece_from_pos(eye) is not None:  # no such step, or the eye is blocked
+            return False
+        return self.can_occupy(to_pos)
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this Elephant, from the table of
+        elephant moves."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        board_state = self._board.get_board_state()
+        for to_pos, eye in ElephantPiece.elephant_moves[self._side][from_pos].items():
+            if board_state[eye] is None and self.can_occupy(to_pos):  # eye is empty and to_pos not held by a friend
+                yield from_pos, to_pos
@@ -0,0 +1,173 @@
+import json
+
+from Board import NUM_FILES, NUM_RANKS, NUM_POSITIONS
+from GeneralPiece import GeneralPiece
+from AdvisorPiece import AdvisorPiece
+from ElephantPiece import ElephantPiece
+from HorsePiece import HorsePiece
+from ChariotPiece import ChariotPiece
+from CannonPiece import CannonPiece
+from SoldierPiece import SoldierPiece
+
+# material values keyed by piece type, from the Piece classes
+DEFAULT_MATERIAL = {piece_class.piece_type: piece_class.value
+                    for piece_class in (GeneralPiece, AdvisorPiece, ElephantPiece, HorsePiece, ChariotPiece,
+                                        CannonPiece, SoldierPiece)}
+
+
+def _centrality(file):
+    """ Returns 4 for the central file 'e', down to 0 for the edge files 'a' and 'i'."""
+    return 4 - abs(file - 4)
+
+
+def _build_soldier_table():
+    """ Returns the soldier table: nothing before the river, growing with every rank advanced beyond it and toward
+    the central files, with a bonus in front of and inside the opposing castle. A soldier on the last rank can only
+    move sideways, so it is worth little more than one that has just crossed."""
+    table = []
+    for rank in range(NUM_RANKS):
+        for file in range(NUM_FILES):
+            if rank < 5:                        # not yet across the river
+                value = 0
+            elif rank == NUM_RANKS - 1:         # the last rank
+                value = 20
+            else:
+                value = 20 * (rank - 4) + 5 * _centrality(file)
+                if rank in (7, 8) and 3 <= file <= 5:
+                    value += 20
+            table.append(value)
+    return table
+
+
+def _build_horse_table():
+    """ Returns the horse table: horses are stronger near the centre, where they reach the most points, and when
+    advanced. The edge files, where half of the horse's moves are off the board, are penalised."""
+    table = []
+    for rank in range(NUM_RANKS):
+        for file in range(NUM_FILES):
+            value = 6 * _centrality(file) + 4 * min(rank, 7)
+            if file in (0, NUM_FILES - 1):
+                value -= 20
+            table.append(value)
+    return table
+
+
+def _build_cannon_table():
+    """ Returns the cannon table: cannons are stronger on the central file, where they bear on the opposing castle,
+    and on the files next to it."""
+    file_control = [0, 0, 4, 8, 20, 8, 4, 0, 0]
+    table = []
+    for rank in range(NUM_RANKS):
+        for file in range(NUM_FILES):
+            value = file_control[file]
+            if rank == 2:                       # the cannon's home rank guards the castle
+                value += 6
+            table.append(value)
+    return table
+
+
+def _build_chariot_table():
+    """ Returns the chariot table: chariots are stronger off the back rank, advanced, and away from the edges."""
+    table = []
+    for rank in range(NUM_RANKS):
+        for file in range(NUM_FILES):
+            value = 3 * _centrality(file) + 3 * rank
+            if rank == 0:                       # not yet developed
+                value -= 10
+            table.append(value)
+    return table
+
+
+def _build_default_tables():
+    """ Returns the default piece-square tables, keyed by piece type. Each table is a list of values indexed by
+    position, from red's side of the board. Generals, advisors and elephants stay in their own half, and their
+    tables are zero."""
+    tables = {piece_type: [0] * NUM_POSITIONS for piece_type in DEFAULT_MATERIAL}
+    tables['So'] = _build_soldier_table()
+    tables['Ho'] = _build_horse_table()
+    tables['Ca'] = _build_cannon_table()
+    tables['Ch'] = _build_chariot_table()
+    return tables
+
+
+def mirror_pos(pos):
+    """ Returns the position on the same file and the mirrored rank, so that black's positions can be looked up in
+    tables written from red's side of the board."""
+    rank, file = divmod(pos, NUM_FILES)
+    return (NUM_RANKS - 1 - rank) * NUM_FILES + file
+
+
+class Evaluator:
+    """ Creates Evaluators, which score positions by material plus piece-square tables.
+    A piece-square table gives a bonus for a piece type on each position, written from red's side of the board.
+    Black's values are read from the mirrored rank.
+    The Evaluator does not scan the Board to score a position. Instead, attach() gives the Board the value of every
+    (side, piece type, position) combination, and the Board keeps the sum up to date as positions are placed and
+    cleared, so every move, make() and unmake() updates the score in constant time.
+    Tables can be saved to and loaded from a JSON file, with a table's rows listed from rank 10 down to rank 1, as
+    the board is displayed, and material values keyed by piece type."""
+
+    def __init__(self, material=None, tables=None):
+        """ Creates an Evaluator with the default material values and tables, replaced by any given in material
+        or in tables, dictionaries keyed by piece type. Tables are lists of values indexed by position."""
+        self._material = dict(DEFAULT_MATERIAL)
+        if material is not None:
+            self._material.update(material)
+        self._tables = _build_default_tables()
+        if tables is not None:
+            self._tables.update(tables)
+        self._square_values = None      # built by get_square_values
+
+    @classmethod
+    def load(cls, path):
+        """ Returns an Evaluator with the material values and tables read from the JSON file at path. Piece types
+        left out of the file keep their defaults."""
+        with open(path) as infile:
+            data = json.load(infile)
+        tables = {}
+        for piece_type, rows in data.get('tables', {}).items():
+            tables[piece_type] = [value for row in reversed(rows) for value in row]
+        return cls(data.get('material'), tables)
+
+    def save(self, path):
+        """ Writes this Evaluator's material values and tables to a JSON file at path."""
+        tables = {}
+        for piece_type, table in self._tables.items():
+            rows = [table[rank * NUM_FILES:(rank + 1) * NUM_FILES] for rank in range(NUM_RANKS)]
+            tables[piece_type] = list(reversed(rows))
+        with open(path, 'w') as outfile:
+            json.dump({'material': self._material, 'tables': tables}, outfile, indent=1)
+
+    def get_material(self, piece_type):
+        """ Returns the material value of piece_type"""
+        return self._material[piece_type]
+
+    def get_table(self, piece_type):
+        """ Returns the piece-square table of piece_type, indexed by position from red's side of the board."""
+        return self._tables[piece_type]
+
+    def get_square_values(self):
+        """ Returns a dictionary keyed by side, then by piece type, of lists indexed by position of the material
+        plus table value of a Piece on each position. Black's values are negative, so that the Board's sum is
+        positive when red is ahead."""
+        if self._square_values is None:
+            square_values = {'red': {}, 'black': {}}
+            for piece_type, table in self._tables.items():
+                material = self._material[piece_type]
+                square_values['red'][piece_type] = [material + table[pos] for pos in range(NUM_POSITIONS)]
+                square_values['black'][piece_type] = [-(material + table[mirror_pos(pos)])
+                                                      for pos in range(NUM_POSITIONS)]
+            self._square_values = square_values
+        return self._square_values
+
+    def attach(self, board):
+        """ Has board keep its score with this Evaluator's values, unless it already does."""
+        square_values = self.get_square_values()
+        if board.get_square_values() is not square_values:
+            board.set_square_values(square_values)
+
+    def evaluate(self, board, side):
+        """ Returns the score of board for side, positive when side is ahead. The board must be attached."""
+        if side == 'red':
+            return board.get_score()
+        return -board.get_score()
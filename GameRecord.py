@@ -0,0 +1,100 @@
+import struct
+import sys
+from array import array
+
+from Board import Board, POSITION_BYTES, encode_move, decode_move
+from XiangqiGame_single_module import XiangqiGame
+
+RECORD_MAGIC = b'XQG1'          # first bytes of every record, and the format version
+RESULTS = ('UNFINISHED', 'RED_WON', 'BLACK_WON')    # game states, indexed by their code in a record header
+# record header: magic, result code, a reserved byte, the starting position as written by XiangqiGame.to_bytes(),
+# and the number of moves. Little-endian, without padding
+RECORD_HEADER = struct.Struct('<4sBx{}sI'.format(POSITION_BYTES))
+START_POSITION = XiangqiGame().to_bytes()           # encoding of the starting position
+
+
+class GameRecord:
+    """ Creates GameRecords, which store a game compactly: its starting position, its result, and its moves.
+    Each move is a 16-bit integer, from_pos * 90 + to_pos, kept in an array('H'), so a move takes two bytes.
+    A record is written as a RECORD_HEADER followed by its moves, little-endian. A file of games is the records
+    written one after another, by write_record, and read back one at a time by read_records."""
+
+    def __init__(self, position=START_POSITION, moves=(), result='UNFINISHED'):
+        """ Creates a GameRecord of a game starting from position, encoded by XiangqiGame.to_bytes(), with moves,
+        an iterable of moves encoded by encode_move, and result, a game state such as 'RED_WON'."""
+        self._position = position
+        self._moves = array('H', moves)
+        self._result = result
+
+    def get_position(self):
+        """ Returns the encoding of the starting position"""
+        return self._position
+
+    def get_moves(self):
+        """ Returns the array('H') of encoded moves"""
+        return self._moves
+
+    def get_num_moves(self):
+        """ Returns the number of moves in the record"""
+        return len(self._moves)
+
+    def get_result(self):
+        """ Returns the result of the game: 'UNFINISHED', 'RED_WON', or 'BLACK_WON'"""
+        return self._result
+
+    def set_result(self, result):
+        """ Sets the result of the game, a game state such as 'RED_WON'"""
+        self._result = result
+
+    def add_move(self, move):
+        """ Appends move, a (from_pos, to_pos) tuple, to the record."""
+        self._moves.append(encode_move(move))
+
+    def iter_moves(self):
+        """ Yields the moves of the record as (from_pos, to_pos) tuples"""
+        for code in self._moves:
+            yield decode_move(code)
+
+    def replay(self, verify='full', board_class=Board):
+        """ Returns (game, refused) for the record's moves played from its starting position, where game is a
+        XiangqiGame using board_class, and refused is the index of the first move refused, or None. verify is
+        'full', 'legal-only' or 'trusted', as for XiangqiGame.replay()."""
+        game = XiangqiGame.from_bytes(self._position, board_class)
+        return game, game.replay(self.iter_moves(), verify)
+
+    def to_bytes(self):
+        """ Returns the record as written to a file: its header followed by its moves."""
+        moves = self._moves
+        if sys.byteorder == 'big':
+            moves = array('H', moves)
+            moves.byteswap()
+        return RECORD_HEADER.pack(RECORD_MAGIC, RESULTS.index(self._result), self._position,
+                                  len(moves)) + moves.tobytes()
+
+
+def write_record(outfile, record):
+    """ Writes record to outfile, a binary file object, after any records already written."""
+    outfile.write(record.to_bytes())
+
+
+def read_records(infile):
+    """ Yields the GameRecords in infile, a binary file object, one at a time. Only the record being read is held in
+    memory, so files of any size can be read. Raises ValueError if the file holds something other than records, or
+    ends in the middle of one."""
+    while True:
+        header = infile.read(RECORD_HEADER.size)
+        if not header:
+            return
+        if len(header) < RECORD_HEADER.size:
+            raise ValueError("game record file ends inside a record header")
+        magic, result, position, num_moves = RECORD_HEADER.unpack(header)
+        if magic != RECORD_MAGIC or result >= len(RESULTS):
+            raise ValueError("not a game record: {!r}".format(header[:4]))
+        moves = array('H')
+        data = infile.read(num_moves * moves.itemsize)
+        if len(data) < num_moves * moves.itemsize:
+            raise ValueError("game record file ends inside the moves of a record")
+        moves.frombytes(data)
+        if sys.byteorder == 'big':
+            moves.byteswap()
+        yield GameRecord(position, moves, RESULTS[result])
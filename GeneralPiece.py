@@ -1,9 +1,17 @@
 from Piece import Piece
+from Board import CASTLE_SPOTS, ORTHO_STEPS
 
 class GeneralPiece(Piece):
     """ Creates GeneralPieces
         general_positions is a class variable, a dictionary of initial positions keyed by player color """
+    piece_type = 'Ge'   # label for this Piece type
+    value = 0           # the general is never captured, so it carries no material value
     general_positions = {'red':'e1', 'black':'e10'}
+    # general_moves is a class variable keyed by player side, built once at import time. Each value is a list
+    # indexed by position of the set of castle spots one point ortho from that position.
+    general_moves = {
+        side: [steps & CASTLE_SPOTS[side] for steps in ORTHO_STEPS] for side in ('red', 'black')
+    }
 
     def __init__(self, side, board):
         """ Initializes an advisor piece. The side ('red' or 'black'), the Board, and the id_num of this piece are
@@ -11,7 +19,7 @@ class GeneralPiece(Piece):
         super().__init__(side, board)
         self._movement = 'ortho'  # generals move ortho
         self._path_length = 1  # generals move one point
-        self._pos = GeneralPiece.general_positions[side] # assign a position based on side
+        self._pos = board.get_pos_from_alg(GeneralPiece.general_positions[side]) # assign a position based on side
 
     def __repr__(self):
         """Return an informative label for this Piece: ["r" or "b"] + "Ge".
@@ -19,37 +27,38 @@ class GeneralPiece(Piece):
         return self._side[0] + "Ge"
 
     def is_legal(self, to_pos):
-        """ Calls super().is_legal and then checks the additional parameters of the general's movement:
-        the general must stay in the palace, flying general move may be executed """
+        """ Returns True if it is legal for the General to move to to_pos. The general moves one point ortho and
+        must stay in the palace, or may capture the enemy general by a flying general move."""
 
-        # check if this general could capture enemy general at to_pos via flying general
-        flying_general_flag = self.is_flying_general(to_pos)
-
-        if flying_general_flag:     # if flying general is possible, temporarily lift path length restriction
-            self._path_length = None
-
-        # check Piece.is_legal (with max path length restriction lifted if flying general is possible)
-        # if it's not legal for a Piece.is_legal() reason, reset path length and return False
-        if not super().is_legal(to_pos):
-            self._path_length = 1    # reset path length
+        if self._pos is None:           # do not allow captured pieces to move
             return False
 
-        # If we get to this point, all Piece.is_legal() conditions are met.
-        # In the case that flying general isn't possible, check also that the general remains in the castle.
-        # If not, reset the path length and return False
-        if not flying_general_flag and to_pos not in (self._board.get_castle_spots(self._side)):
-            self._path_length = 1
-            return False
+        # a step to a castle spot one point ortho away is looked up in the table of general moves
+        if to_pos in GeneralPiece.general_moves[self._side][self._pos]:
+            return self.can_occupy(to_pos)
 
-        # Move is legal. Reset path length and return True
-        self._path_length = 1
-        return True
+        # otherwise, the move is only legal if this general could capture enemy general at to_pos via flying general
+        return self.is_flying_general(to_pos) is True
 
     def is_flying_general(self, to_pos):
         """ Helper method to self.is_legal.
         Returns True if this general could capture enemy general at to_pos via flying general"""
         other_gen_pos = self._board.get_general_pos(self._opp)  # get the other general's position
-        if other_gen_pos == to_pos and other_gen_pos[0] == self._pos[0]:  # if both generals on the same file
-            path_to_gen = self.get_path(other_gen_pos)            # get ortho path to general
-            if self.num_jumps(path_to_gen) == 0:        # if no intervening pieces, flying general is possible
+        if other_gen_pos == to_pos and other_gen_pos % 9 == self._pos % 9:  # if both generals on the same file
+            # if no intervening pieces, flying general is possible
+            if self._board.count_ortho_jumps(self._pos, other_gen_pos) == 0:
                 return True
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this General: steps from the table of
+        general moves, plus the capture of the enemy general if a flying general move is possible."""
+        from_pos = self._pos
+        if from_pos is None:
+            return
+        for to_pos in GeneralPiece.general_moves[self._side][from_pos]:
+            if self.can_occupy(to_pos):
+                yield from_pos, to_pos
+
+        other_gen_pos = self._board.get_general_pos(self._opp)
+        if other_gen_pos is not None and self.is_flying_general(other_gen_pos):
+            yield from_pos, other_gen_pos
@@ -1,13 +1,19 @@
 from Piece import Piece
+from Board import L_MOVES
 
 class HorsePiece(Piece):
     """Creates HorsePieces
             horse_positions is a class variable, a dictionary of initial positions keyed by player color
             Two HorsePieces are created by a call to Player.__init__()."""
+    piece_type = 'Ho'   # label for this Piece type
+    value = 400         # material value of this Piece type, for evaluation
     horse_positions = {
         'red': ['b1', 'h1'],
         'black': ['b10', 'h10']
     }
+    # horse_moves is a class variable, a list indexed by position of {destination: leg} dictionaries, built once
+    # at import time. The horse may step to a destination only if the leg, one point ortho from the horse, is empty.
+    horse_moves = L_MOVES
 
     def __init__(self, side, board, id_num):
         super().__init__(side, board)
@@ -16,9 +22,39 @@ class HorsePiece(Piece):
 
         # assign a position from HorsePiece
         self._id = id_num # id_num is passed as argument, by Player, and will be 1 or 2
-        self._pos = HorsePiece.horse_positions[side][id_num - 1] # keep track of positions used based on id number
+        # keep track of positions used based on id number
+        self._pos = board.get_pos_from_alg(HorsePiece.horse_positions[side][id_num - 1])
 
     def __repr__(self):
         """Return an informative label for this Piece: ["r" or "b"] + "Ho" + [id_num for this specific piece].
                 This is intended to be unique for every piece in a Game """
-        return self._side[0] + "Ho" + str(self._id)
\ No newline at end of file
+        return self._side[0] + "Ho" + str(self._id)
+
+    def get_path(self, to_pos):
+        """ Returns the L path [(leg, occupant), (to_pos, occupant)] looked up in the table of horse moves,
+        or False if to_pos is not an L-shaped step from the Horse's position."""
+        leg = HorsePiece.horse_moves[self._pos].get(to_pos)
+        if leg is None:
+            return False
+        return [(leg, self._board.get_piece_from_pos(leg)), (to_pos, self._board.get_piece_from_pos(to_pos))]
+
+    def is_legal(self, to_pos):
+        """ Returns True if it is legal for Horse to move to to_pos: to_pos must be an L-shaped step from the Horse's
+        position with an empty leg, and must not be occupied by a friend."""
+        if self._pos is None:           # do not allow captured pieces to move
+            return False
+        leg = HorsePiece.horse_moves[self._pos].get(to_pos)
+        if leg is None or self._board.get_piece_from_pos(leg) is not None:   # no such step, or horse is blocked
+            return False
+        return self.can_occupy(to_pos)
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this Horse, from the table of horse
+        moves."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        board_state = self._board.get_board_state()
+        for to_pos, leg in HorsePiece.horse_moves[from_pos].items():
+            if board_state[leg] is None and self.can_occupy(to_pos):  # leg is empty and to_pos not held by a friend
+                yield from_pos, to_pos
@@ -0,0 +1,95 @@
+from Board import NUM_POSITIONS
+
+MAX_PLY = 128           # deepest ply that keeps killer moves
+NUM_KILLERS = 2         # killer moves kept per ply
+
+
+def mvv_lva_key(board_state, move):
+    """ Returns the sort key of move, a (from_pos, to_pos) tuple, on board_state, the Board's list of occupants:
+    captures sort most valuable victim first, then least valuable attacker, and before every quiet move.
+    Piece values are below 1000."""
+    victim = board_state[move[1]]
+    if victim is None:
+        return 0
+    return board_state[move[0]].value - victim.value * 1000
+
+
+class MoveOrdering:
+    """ Creates MoveOrderings, which order a position's legal moves so that alpha-beta search tries the moves most
+    likely to cause a cutoff first. Moves are picked in stages:
+        1. the hash move, the best move remembered for the position by the transposition table or the last PV
+        2. captures, most valuable victim first, and for equal victims least valuable attacker first (MVV-LVA)
+        3. killer moves, quiet moves that caused a cutoff at the same ply elsewhere in the tree
+        4. the remaining quiet moves, by history score, which grows each time a move causes a cutoff
+    A MoveOrdering keeps the killer moves and history scores learned during a search, and is shared by every node
+    of the search."""
+
+    def __init__(self):
+        """ Creates a MoveOrdering with no killer moves and no history, receives no arguments."""
+        self._killers = [[None] * NUM_KILLERS for ply in range(MAX_PLY)]    # killer moves indexed by ply
+        self._history = [0] * (NUM_POSITIONS * NUM_POSITIONS)               # indexed by from_pos * 90 + to_pos
+
+    def new_search(self):
+        """ Forgets the killer moves, and halves the history scores, so that a new search favours what it learns
+        itself."""
+        for killers in self._killers:
+            for index in range(NUM_KILLERS):
+                killers[index] = None
+        history = self._history
+        for index in range(len(history)):
+            history[index] >>= 1
+
+    def get_killers(self, ply):
+        """ Returns the list of killer moves at ply, most recent first. Empty slots are None."""
+        return self._killers[ply]
+
+    def get_history(self, move):
+        """ Returns the history score of move, a (from_pos, to_pos) tuple"""
+        return self._history[move[0] * NUM_POSITIONS + move[1]]
+
+    def add_cutoff(self, move, depth, ply):
+        """ Records that move, a quiet (from_pos, to_pos) move, caused a cutoff depth plies from the horizon and ply
+        plies from the root. The move becomes the newest killer at ply, and its history score grows with the
+        square of depth, since cutoffs near the root save the most work."""
+        if ply < MAX_PLY:
+            killers = self._killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+        self._history[move[0] * NUM_POSITIONS + move[1]] += depth * depth
+
+    def pick_moves(self, board, moves, hash_move=None, ply=0):
+        """ Yields the (from_pos, to_pos) moves in moves, a list of legal moves on board, in picking order. Each
+        stage is only ordered once the stages before it are exhausted, so a cutoff on the hash move or an early
+        capture saves the work of ordering the rest."""
+        if hash_move is not None and hash_move in moves:
+            yield hash_move
+
+        # split the remaining moves into captures and quiet moves
+        board_state = board.get_board_state()
+        captures = []
+        quiets = []
+        for move in moves:
+            if move == hash_move:
+                continue
+            if board_state[move[1]] is None:
+                quiets.append(move)
+            else:
+                captures.append(move)
+
+        captures.sort(key=lambda move: mvv_lva_key(board_state, move))
+        for move in captures:
+            yield move
+
+        killers = []
+        if ply < MAX_PLY:
+            for killer in self._killers[ply]:
+                if killer is not None and killer in quiets:
+                    killers.append(killer)
+                    yield killer
+
+        history = self._history
+        quiets.sort(key=lambda move: -history[move[0] * NUM_POSITIONS + move[1]])
+        for move in quiets:
+            if move not in killers:
+                yield move
@@ -1,5 +1,7 @@
 class Piece:
     """Creates Pieces. Superclass to all Piece types."""
+    piece_type = None   # two letter label for the Piece type, such as 'Ch'. Set by children classes.
+    value = 0           # material value of the Piece type, in hundredths of a soldier. Set by children classes.
 
     def __init__(self, side, board):
         self._board = board        # a Board object, passed by the Piece's Player
@@ -18,18 +20,19 @@ class Piece:
         """ Returns an ordered list of [ (location, occupant) tuples] from current pos to to_pos along
         self._movement pattern. Do not include current location in the list. Last item is to_pos.
         False if no such path to to_pos via self._movement pattern."""
-        try_ortho = self._board.get_ortho_path(self._pos, to_pos)
-        try_diag = self._board.get_diagonal_path(self._pos, to_pos)
-        try_L_shaped = self._board.get_L_path(self._pos, to_pos)
-
-        if self._movement == 'L-shaped' and try_L_shaped:
-            return try_L_shaped
-        if self._movement == 'ortho' and try_ortho:
-            return try_ortho
-        elif self._movement == 'diagonal' and try_diag:
-            return try_diag
+        # only build the path for this Piece's movement pattern
+        if self._movement == 'ortho':
+            try_path = self._board.get_ortho_path(self._pos, to_pos)
+        elif self._movement == 'diagonal':
+            try_path = self._board.get_diagonal_path(self._pos, to_pos)
+        elif self._movement == 'L-shaped':
+            try_path = self._board.get_L_path(self._pos, to_pos)
         else:
-            return False
+            try_path = None
+
+        if try_path:
+            return try_path
+        return False
 
     def num_jumps(self, path):
         """Returns number of pieces that would be jumped along path"""
@@ -76,6 +79,11 @@ class Piece:
 
         return True
 
+    def can_occupy(self, to_pos):
+        """ Returns True if to_pos is unoccupied, or occupied by a foe that this Piece would capture."""
+        occupant = self._board.get_piece_from_pos(to_pos)
+        return occupant is None or occupant._side != self._side
+
     def move(self, to_pos):
         """ Moves a piece to to_pos if move is legal for this piece.
         Returns:
@@ -131,22 +139,56 @@ class Piece:
         self._board.place_piece(self, from_pos) # place this Piece on from_pos
         self._pos = from_pos # update this Piece's pos
 
+    def get_flags(self):
+        """ Returns this Piece's state, other than its position, that a move may change. Board.make() saves it in
+        its undo record, and Board.unmake() restores it. Pieces without such state return None."""
+        return None
+
+    def set_flags(self, flags):
+        """ Restores state returned by get_flags(). Pieces without such state do nothing."""
+        pass
+
+    def update_flags(self, to_pos):
+        """ Updates this Piece's state, other than its position, after a move to to_pos. Pieces without such state
+        do nothing."""
+        pass
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level.
+        Does not filter for moves that would result in check for this side.
+        This default searches every position that is empty or occupied by the opponent. Piece types override it to
+        enumerate only the destinations their movement pattern can reach."""
+        if self._pos is None:  # if this Piece has been captured, it has no moves
+            return
+        for pos in self._board.get_available_positions(self._side):  # search through possible moves
+            if self.is_legal(pos):  # if piece can legally move to pos, yield the move
+                yield self._pos, pos
+
+    def generate_captures(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level that capture a foe. This default filters
+        generate_moves(). Chariots and Cannons override it to look only at the points they could capture."""
+        board_state = self._board.get_board_state()
+        for from_pos, to_pos in self.generate_moves():
+            if board_state[to_pos] is not None:    # generate_moves never yields a point held by a friend
+                yield from_pos, to_pos
+
     def get_possible_moves(self):
         """ Returns the set of all possible moves available to Piece.
         Includes moves legal at the Piece level. Does not filter for moves that would result in check for this side.
         Player is responsible for filtering moves that would result in check. """
 
-        # get all positions that are empty or occupied by opponent
-        possible_pos = self._board.get_available_positions(self._side)
-        moves = set()
-        if self._pos is not None:  # if this Piece has not been captured
-            for pos in possible_pos:  # search through possible moves
-                if self.is_legal(pos):  # if piece can legally move to pos, add move to possible moves
-                    moves.add((self._pos, pos))
         # return the set of possible moves legal at the Piece level.
         # if no such moves, will return the empty set.
-        return moves
+        return set(self.generate_moves())
+
+
+    def get_type(self):
+        """ Returns this Piece's two letter type label, such as 'Ch' for chariots."""
+        return self.piece_type
 
+    def get_value(self):
+        """ Returns this Piece's material value, in hundredths of a soldier."""
+        return self.value
 
     def get_side(self):
         """ Returns this Piece's side: 'red', or 'black'. """
@@ -9,9 +9,14 @@ from Piece import Piece
 
 class Player():
     """Creates Players"""
-    def __init__(self, side, board):
+    # move_order is a class variable, the order in which piece types are searched for legal moves, keyed by piece type.
+    # General steps and soldier pushes are cheap and usually available, so they come first.
+    move_order = {'Ge': 0, 'So': 1, 'Ad': 2, 'El': 3, 'Ho': 4, 'Ca': 5, 'Ch': 6}
+
+    def __init__(self, side, board, place_pieces=True):
         """ Initializes a Player with side = 'red' or 'black', and a Board object. Side and Board are passed
-        by Game objects. """
+        by Game objects. If place_pieces is False, the Pieces are created off the Board, with no position, for the
+        Game to place them itself."""
         self._side = side       # 'black' or 'red'
         self._board = board     # the Board passed by the Game object
         self._pieces = set()    # a set of this Player's Pieces
@@ -53,7 +58,10 @@ class Player():
 
         # place all pieces on Board at their in initialized positions
         for piece in self._pieces:
-            self._board.place_piece(piece, piece.get_pos())
+            if place_pieces:
+                self._board.place_piece(piece, piece.get_pos())
+            else:
+                piece.set_pos(None)
 
     def get_defense_moves(self, attack_piece, path, opp):
         """Returns a set of {(from_pos, to_pos)} moves that would defend Player's general from attack_piece along path.
@@ -63,16 +71,14 @@ class Player():
 
         defense_moves = set()
 
-        # See if one of Player's pieces, including general, can capture attack_piece at its current location
-        for piece in self._pieces:
-            if piece.is_legal(attack_piece.get_pos()):
-                defense_moves.add((piece.get_pos(), attack_piece.get_pos()))
-
-        # See if one of Player's pieces, can block this attack by occupying any position along path
+        # See if one of Player's pieces, including general, can capture attack_piece at its current location,
+        # or can block this attack by occupying any position along path
+        targets = {pos for pos, occupant in path}
+        targets.add(attack_piece.get_pos())
         for piece in self._pieces:
-            for pos, occupant in path:
-                if piece.is_legal(pos):             # this piece can block or capture
-                    defense_moves.add((piece.get_pos(), pos))  # add the move to the set of defense moves
+            for move in piece.generate_moves():
+                if move[1] in targets:              # this piece can block or capture
+                    defense_moves.add(move)         # add the move to the set of defense moves
 
         # Only Cannons have occupants along their attack path, and they have exactly one occupant along the path,
         # called the 'screen'. If the screen piece belongs to Player, Player can defend against Cannon by
@@ -82,7 +88,7 @@ class Player():
             if occupant in self._pieces:
                 # fix this later: need to add all possible legal moves for screen piece away from path
                 # for now, save a tuple with from_position, 'screen piece' flag
-                defense_moves = defense_moves.union(occupant.get_possible_moves())
+                defense_moves.update(occupant.generate_moves())
 
         # filter defense moves and remove any that leave general in check
         remove_moves = set()
@@ -116,25 +122,33 @@ class Player():
 
 
     def puts_self_in_check(self, piece, to_pos ,opp):
-        """ Returns True of a move of piece to to_pos would put self in check"""
+        """ Returns True of a move of piece to to_pos would put self in check.
+        A move that is legal at the Piece level is tried with Board.make() and reversed with Board.unmake()."""
 
-        from_pos = piece.get_pos()  # save piece's previous position
-        try_move = piece.move(to_pos) #ask the piece to try the move
+        board = self._board
+        legal = piece.is_legal(to_pos)
+        if legal:                   # try the move. Illegal moves leave the Board as it is
+            board.make((piece.get_pos(), to_pos))
 
-        # ask the opponent to examine results of move for attacks on this Player's general
-        resulting_checks = opp.get_attacks(self.get_general_pos())
+        # ask the Board whether the opponent attacks this Player's general after the move
+        resulting_checks = board.is_square_attacked(self.get_general_pos(), opp.get_side())
 
-        # now tell the piece to reverse the move. try_move will be assigned the captive, if any
-        if isinstance(try_move, Piece): # pass the captive if there was one
-            piece.reverse_move(from_pos, to_pos, try_move)
-        elif try_move: # if not, don't pass the captive. Reverse_move() will use a default argument of None for captive.
-            piece.reverse_move(from_pos, to_pos)
+        if legal:                   # reverse the move, restoring any captive
+            board.unmake()
 
         if resulting_checks: # if there were any checks resulting from the move, return True
             return True
 
         return False
 
+    def get_side(self):
+        """ Return this Player's side: 'red' or 'black'"""
+        return self._side
+
+    def get_pieces(self):
+        """ Return the set of this Player's Pieces, including captured Pieces"""
+        return self._pieces
+
     def get_general_pos(self):
         """ Return the position of this player's general"""
         return self._general._pos
@@ -172,17 +186,79 @@ class Player():
     def has_available_move(self, opponent):
         """ Returns a set of this Player's available moves against opponent, or False if there are no such moves.
         Available moves are any legal moves that would not result in placing this Player in check."""
-        possible_moves = set()
-        remove_moves = set()
-        for piece in self._pieces:      # get all possible moves for all pieces
-            piece_moves = piece.get_possible_moves()
-            possible_moves = possible_moves.union(piece_moves)
-            for from_pos, to_pos in piece_moves:   # find any move that would place self in check
-                if self.puts_self_in_check(piece, to_pos, opponent):
-                    remove_moves.add((from_pos, to_pos))
-        possible_moves = possible_moves - remove_moves # remove the moves that would result in self check
+        possible_moves = set(self.generate_legal_moves(opponent))
         if possible_moves:
             return possible_moves
         return False
 
+    def has_legal_move(self, opponent):
+        """ Returns True if this Player has at least one legal move against opponent. Stops at the first legal move
+        found, searching pieces in move_order."""
+        for move in self.generate_legal_moves(opponent):
+            return True
+        return False
 
+    def get_ordered_pieces(self):
+        """ Returns a list of this Player's Pieces that have not been captured, sorted by move_order."""
+        return sorted((piece for piece in self._pieces if piece.get_pos() is not None),
+                      key=lambda piece: Player.move_order[piece.get_type()])
+
+    def generate_legal_moves(self, opponent, captures_only=False):
+        """ Yields this Player's legal (from_pos, to_pos) moves against opponent: the Piece-level moves that do not
+        leave this Player's general attacked. If captures_only is True, only legal captures are yielded, from each
+        Piece's generate_captures().
+        Pins and check evasions are computed up front, so most moves are yielded without trying them on the Board.
+        Only general moves, moves of pinned pieces, and candidate evasions when in check are tried.
+        Pieces are searched in move_order, so that callers that stop early find a legal move quickly."""
+        board = self._board
+        opp_side = opponent.get_side()
+        general_pos = self.get_general_pos()
+
+        if board.is_square_attacked(general_pos, opp_side):
+            # in check: only general moves, captures of a checker, blocks along a check path, and moves of a
+            # cannon's screen can be evasions. Each candidate is tried on the Board.
+            targets = set()
+            screens = set()
+            for attacker, path in opponent.get_attacks(general_pos):
+                targets.add(attacker.get_pos())
+                for pos, occupant in path:
+                    targets.add(pos)
+                    if occupant in self._pieces:
+                        screens.add(pos)
+            for piece in self.get_ordered_pieces():
+                for from_pos, to_pos in list(self._generate_piece_moves(piece, captures_only)):
+                    if piece is self._general or to_pos in targets or from_pos in screens:
+                        if self._is_safe_move(piece, to_pos, opp_side):
+                            yield from_pos, to_pos
+            return
+
+        pinned, screened = board.get_pins(general_pos, opp_side)
+        for piece in self.get_ordered_pieces():
+            if piece is self._general:          # the general's destinations must be tried on the Board
+                for from_pos, to_pos in list(self._generate_piece_moves(piece, captures_only)):
+                    if self._is_safe_move(piece, to_pos, opp_side):
+                        yield from_pos, to_pos
+                continue
+
+            try_moves = piece.get_pos() in pinned   # a pinned piece's new position must be tried on the Board
+            for from_pos, to_pos in list(self._generate_piece_moves(piece, captures_only)):
+                if to_pos in screened:          # the piece would become the screen for an opposing cannon
+                    continue
+                if not try_moves or self._is_safe_move(piece, to_pos, opp_side):
+                    yield from_pos, to_pos
+
+    def _generate_piece_moves(self, piece, captures_only):
+        """ Returns piece's Piece-level captures if captures_only is True, or else all of its Piece-level moves."""
+        if captures_only:
+            return piece.generate_captures()
+        return piece.generate_moves()
+
+    def _is_safe_move(self, piece, to_pos, opp_side):
+        """ Returns True if moving piece to to_pos would not leave this Player's general attacked by opp_side.
+        The move must already be legal at the Piece level. It is made with Board.make() without validation,
+        and then reversed."""
+        board = self._board
+        board.make((piece.get_pos(), to_pos))
+        safe = not board.is_square_attacked(self.get_general_pos(), opp_side)
+        board.unmake()
+        return safe
@@ -0,0 +1,430 @@
+import sys
+import threading
+import time
+
+from Board import POS_TO_ALG, ZOBRIST_BLACK_TO_MOVE
+from TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from MoveOrdering import MoveOrdering, mvv_lva_key
+from Evaluator import Evaluator
+
+# scores are in hundredths of a soldier, from the point of view of the side to move
+MATE_SCORE = 100000     # score for checkmating at the root. Mates found deeper in the tree score less
+INFINITY = 1000000      # bound larger than any score
+MAX_DEPTH = 64          # deepest iteration searched when only a movetime is given
+DEFAULT_DEPTH = 4       # depth searched when neither a depth nor a movetime is given
+CHECK_INTERVAL = 256    # number of nodes searched between checks of the deadline and the stop signal
+DEFAULT_MOVES_TO_GO = 30    # moves assumed left to the next time control when moves to go is not given
+MOVE_OVERHEAD = 0.05        # seconds kept back from the remaining time for communication and bookkeeping
+INCREMENT_FRACTION = 0.75   # part of the increment spent on every move
+HARD_LIMIT_FACTOR = 4       # the hard limit may run to this many times the soft limit
+SOFT_LIMIT_FRACTION = 0.5   # a new iteration is not started once this part of the soft limit has passed
+DELTA_MARGIN = 200      # a capture is skipped in quiescence if winning its victim plus this cannot raise alpha
+MAX_PLY = 128           # quiescence stops extending beyond this many plies from the root
+NULL_MOVE_REDUCTION = 2     # the null move is searched this many plies shallower than a real move
+NULL_MOVE_MIN_DEPTH = 3     # null moves are only tried this many plies or more from the horizon
+NULL_MOVE_MATERIAL = 800    # null moves are only tried with at least this much chariot, horse and cannon material
+LMR_MOVES = 3               # moves searched at full depth before quiet moves are reduced
+LMR_MIN_DEPTH = 3           # late moves are only reduced this many plies or more from the horizon
+
+
+class Search:
+    """ Creates Searches, which choose a move for the side to move in a XiangqiGame.
+    The search is a negamax alpha-beta search with iterative deepening. Each iteration searches one ply deeper
+    than the last, and tries the principal variation (PV) of the last iteration first.
+    Results are stored in a TranspositionTable keyed by position hash. The table's best move is tried first, and
+    its score ends the search of a position when it was searched deep enough before.
+    The remaining moves are ordered by a MoveOrdering: captures by MVV-LVA, then killer moves, then quiet moves by
+    history score.
+    At the horizon, a quiescence search keeps searching captures, and every evasion when in check, until the
+    position is quiet, so that a capture just beyond the horizon is not missed.
+    Three selective techniques spend the search's nodes where they matter, and each can be switched off:
+        null-move pruning: the side to move passes, and if a shallower search still fails high, so would a real
+            move. Not tried in check, or with little attacking material, where passing may be the best move
+        late move reductions: quiet moves ordered late are searched a ply shallower with a null window, and only
+            searched again at full depth if they beat alpha
+        check extensions: a position in check is searched a ply deeper, since checks are tactically sharp
+    Moves are generated with Player.generate_legal_moves(), and are made and reversed on the game's Board with
+    Board.make() and Board.unmake(), so the game's state and turn are never changed.
+    Language note: inside the search, moves are (from_pos, to_pos) tuples of Board positions."""
+
+    def __init__(self, game, table=None, move_ordering=True, quiescence=True, evaluator=None, null_move=True,
+                 late_move_reductions=True, check_extensions=True, stop_signal=None):
+        """ Creates a Search of game's current position. game is a XiangqiGame. table is a TranspositionTable to
+        share between searches. If not given, the Search creates its own.
+        If move_ordering is False, only the hash move is tried first, and the other moves are searched in the order
+        they are generated. This is for measuring the benefit of move ordering.
+        If quiescence is False, positions at the horizon are evaluated as they stand.
+        evaluator is the Evaluator that scores positions. If not given, one with the default tables is used.
+        null_move, late_move_reductions and check_extensions switch each selective technique on or off.
+        stop_signal is an event shared with other searches, such as a multiprocessing.Event, that stops this search
+        when set. search() does not clear a shared signal: its owner does. If not given, the Search creates its own,
+        which stop() sets and search() clears when it returns."""
+        self._game = game
+        self._board = game.get_board()
+        if table is None:
+            table = TranspositionTable()
+        self._table = table
+        if move_ordering:
+            self._ordering = MoveOrdering()
+        else:
+            self._ordering = None
+        self._quiescence = quiescence
+        if evaluator is None:
+            evaluator = Evaluator()
+        self._evaluator = evaluator
+        self._null_move = null_move
+        self._late_move_reductions = late_move_reductions
+        self._check_extensions = check_extensions
+        self._root_depth = 0        # depth of the iteration in progress
+        self._nodes = 0             # nodes searched by the last call to search()
+        self._seconds = 0.0         # time taken by the last call to search()
+        self._deadline = None       # perf_counter() time at which to stop searching, or None to search to depth
+        self._stopped = False       # set when the search stops early. Scores of a stopped iteration are discarded
+        if stop_signal is None:
+            self._stop_signal = threading.Event()   # set by stop(), from any thread
+            self._owns_stop_signal = True
+        else:
+            self._stop_signal = stop_signal
+            self._owns_stop_signal = False
+        self._pv = []               # PV of the last completed iteration
+        self._depth = 0             # depth of the last completed iteration
+
+    def stop(self):
+        """ Stops the search in progress as soon as possible. Safe to call from another thread: the searching thread
+        notices within CHECK_INTERVAL nodes, and search() returns the deepest completed iteration. A stop() that comes
+        before search() is called stops that search at once."""
+        self._stop_signal.set()
+
+    def get_nodes(self):
+        """ Returns the number of nodes searched by the last call to search()"""
+        return self._nodes
+
+    def get_depth(self):
+        """ Returns the depth of the deepest iteration completed by the last call to search()"""
+        return self._depth
+
+    def get_seconds(self):
+        """ Returns the time taken by the last call to search(), in seconds"""
+        return self._seconds
+
+    def get_table(self):
+        """ Returns this Search's TranspositionTable"""
+        return self._table
+
+    def get_nps(self):
+        """ Returns the nodes searched per second by the last call to search()"""
+        if self._seconds == 0:
+            return 0
+        return self._nodes / self._seconds
+
+    def evaluate(self, player, opponent):
+        """ Returns the score of the position for player against opponent, from the score the Board keeps with
+        this Search's Evaluator."""
+        return self._evaluator.evaluate(self._board, player.get_side())
+
+    def search(self, depth=None, movetime=None, report=None, remaining=None, increment=0, moves_to_go=None):
+        """ Searches the position, and returns (move, score, pv) from the deepest completed iteration, where move is
+        the best (from_pos, to_pos) move or None if the side to move has no legal move, score is the score for the
+        side to move, and pv is the list of moves expected to follow.
+        depth is the deepest iteration to search. With neither a depth nor a time limit, DEFAULT_DEPTH is searched.
+        The time to spend is given either as movetime, in seconds, or as a clock: remaining seconds, the increment
+        in seconds added after each move, and the number of moves to go to the next time control, from which
+        allocate_time() sets a soft and a hard limit. No new iteration starts once half of the soft limit has
+        passed, and the iteration in progress is abandoned at the hard limit, even the first one. A search stopped
+        before its first iteration completes returns the best root move found so far, or the first legal move.
+        report, if given, is called as report(depth, score, nodes, seconds, pv) after every completed iteration."""
+        if movetime is not None:
+            soft_limit = hard_limit = movetime
+        elif remaining is not None:
+            soft_limit, hard_limit = allocate_time(remaining, increment, moves_to_go)
+        else:
+            soft_limit = hard_limit = None
+        if depth is None:
+            if hard_limit is None:
+                depth = DEFAULT_DEPTH
+            else:
+                depth = MAX_DEPTH
+        side = self._game.get_turn()
+        player = self._game.get_player(side)
+        opponent = self._game.get_opponent(side)
+
+        start = time.perf_counter()
+        self._nodes = 0
+        self._stopped = False
+        self._depth = 0
+        if hard_limit is None:
+            self._deadline = None
+        else:
+            self._deadline = start + hard_limit
+        self._pv = []
+        self._table.new_search()
+        self._evaluator.attach(self._board)
+        if self._ordering is not None:
+            self._ordering.new_search()
+        result = (None, 0, [])
+
+        for iteration_depth in range(1, depth + 1):
+            pv = []
+            self._root_depth = iteration_depth
+            self._check_stop()      # a stop() or deadline that came before this iteration starts ends the search
+            score = self._negamax(player, opponent, iteration_depth, -INFINITY, INFINITY, 0, pv)
+            if self._stopped:       # the iteration did not complete, so keep the last one
+                if result[0] is None:
+                    result = self._fallback_result(player, opponent, pv)
+                break
+            self._pv = pv
+            self._depth = iteration_depth
+            result = (pv[0] if pv else None, score, pv)
+            self._seconds = time.perf_counter() - start
+            if report is not None:
+                report(iteration_depth, score, self._nodes, self._seconds, pv)
+            if abs(score) >= MATE_SCORE - MAX_DEPTH:    # a forced mate was found, searching deeper cannot improve it
+                break
+            if hard_limit is not None and self._seconds >= soft_limit * SOFT_LIMIT_FRACTION:
+                break                   # the next iteration would not finish
+
+        if self._owns_stop_signal:      # cleared as the search ends, so that a stop() before the next one is kept
+            self._stop_signal.clear()
+        self._seconds = time.perf_counter() - start
+        return result
+
+    def _fallback_result(self, player, opponent, pv):
+        """ Returns (move, score, pv) when the search is stopped before its first iteration completes: the best root
+        move found so far, or else the first legal move."""
+        if pv:
+            return pv[0], 0, pv[:1]
+        for move in player.generate_legal_moves(opponent):
+            return move, 0, [move]
+        return None, 0, []
+
+    def _check_stop(self):
+        """ Sets self._stopped if stop() was called or the deadline has passed. Called every CHECK_INTERVAL nodes."""
+        if self._stop_signal.is_set() or (self._deadline is not None and time.perf_counter() >= self._deadline):
+            self._stopped = True
+
+    def _negamax(self, player, opponent, depth, alpha, beta, ply, pv, allow_null=True):
+        """ Returns the score of the position for player to move against opponent, searched depth plies deep
+        within the window (alpha, beta), ply plies from the root. Fills pv with the best line found from here.
+        allow_null is False right after a null move, so that two null moves are never made in a row."""
+        self._nodes += 1
+        if self._nodes % CHECK_INTERVAL == 0:
+            self._check_stop()
+        if self._stopped:
+            return 0
+
+        board = self._board
+        in_check = board.is_square_attacked(player.get_general_pos(), opponent.get_side())
+        if in_check and self._check_extensions and ply < 2 * self._root_depth:
+            depth += 1
+
+        if depth <= 0:
+            if self._quiescence:
+                return self._quiescence_search(player, opponent, alpha, beta, ply)
+            return self.evaluate(player, opponent)
+
+        key = board.get_hash()
+        if player.get_side() == 'black':
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        hash_move = None
+        entry = self._table.probe(key)
+        if entry is not None:
+            table_depth, bound, score, hash_move = entry
+            if ply > 0 and table_depth >= depth:
+                score = score_from_table(score, ply)
+                # an exact score inside the window would be part of the PV, so it is searched to fill in the PV
+                if (bound == LOWER_BOUND and score >= beta) or (bound == UPPER_BOUND and score <= alpha) or \
+                        (bound == EXACT and (score <= alpha or score >= beta)):
+                    return score
+
+        if (self._null_move and allow_null and not in_check and ply > 0 and depth >= NULL_MOVE_MIN_DEPTH
+                and beta < MATE_SCORE - MAX_DEPTH and self._has_null_move_material(player)):
+            # pass the move to the opponent. If player still fails high, a real move would too
+            score = -self._negamax(opponent, player, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1, ply + 1,
+                                   [], False)
+            if self._stopped:
+                return 0
+            if score >= beta:
+                return beta
+
+        moves = list(player.generate_legal_moves(opponent))
+        if not moves:               # with no legal move, player loses, whether in checkmate or in stalemate
+            return -MATE_SCORE + ply
+
+        # try the table's best move first, or else the move from the last iteration's PV
+        if hash_move is not None and hash_move in moves:
+            first_move = hash_move
+        elif ply < len(self._pv) and self._pv[ply] in moves:
+            first_move = self._pv[ply]
+        else:
+            first_move = None
+        if self._ordering is not None:
+            moves = self._ordering.pick_moves(board, moves, first_move, ply)
+        elif first_move is not None:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best = None
+        move_number = 0
+        for move in moves:
+            move_number += 1
+            child_pv = []
+            captive = board.make(move)
+            if (self._late_move_reductions and move_number > LMR_MOVES and depth >= LMR_MIN_DEPTH
+                    and captive is None and not in_check
+                    and not board.is_square_attacked(opponent.get_general_pos(), player.get_side())):
+                # a late quiet move that does not give check is searched shallower with a null window first
+                score = -self._negamax(opponent, player, depth - 2, -alpha - 1, -alpha, ply + 1, child_pv)
+                if score > alpha and not self._stopped:
+                    child_pv = []
+                    score = -self._negamax(opponent, player, depth - 1, -beta, -alpha, ply + 1, child_pv)
+            else:
+                score = -self._negamax(opponent, player, depth - 1, -beta, -alpha, ply + 1, child_pv)
+            board.unmake()
+            if self._stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                best = move
+                if score > alpha:
+                    alpha = score
+                    pv[:] = [move] + child_pv
+                    if alpha >= beta:   # the opponent will avoid this position, so stop searching it
+                        if captive is None and self._ordering is not None:
+                            self._ordering.add_cutoff(move, depth, ply)
+                        break
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score <= original_alpha:
+            bound = UPPER_BOUND
+        else:
+            bound = EXACT
+        self._table.store(key, depth, bound, score_to_table(best_score, ply), best)
+        return best_score
+
+    def _has_null_move_material(self, player):
+        """ Returns True if player has enough chariot, horse and cannon material on the Board that passing is
+        unlikely to be its best move. With less, zugzwang is common and null moves are not tried."""
+        material = 0
+        for piece in player.get_pieces():
+            if piece.get_pos() is not None and piece.get_type() in ('Ch', 'Ho', 'Ca'):
+                material += piece.get_value()
+        return material >= NULL_MOVE_MATERIAL
+
+    def _quiescence_search(self, player, opponent, alpha, beta, ply):
+        """ Returns the score of the position for player to move against opponent within the window (alpha, beta),
+        searching only captures until the position is quiet.
+        Out of check, player may stand pat: decline every capture and take the static evaluation, which cuts off
+        at once if it is at least beta. A capture is skipped (delta pruning) if even winning its victim outright,
+        plus DELTA_MARGIN, would not raise alpha. In check there is no standing pat, and every evasion is searched."""
+        self._nodes += 1
+        if self._nodes % CHECK_INTERVAL == 0:
+            self._check_stop()
+        if self._stopped:
+            return 0
+
+        board = self._board
+        if board.is_square_attacked(player.get_general_pos(), opponent.get_side()):
+            moves = list(player.generate_legal_moves(opponent))
+            if not moves:           # checkmated
+                return -MATE_SCORE + ply
+            stand_pat = None
+            best_score = -INFINITY
+        else:
+            stand_pat = self.evaluate(player, opponent)
+            if stand_pat >= beta or ply >= MAX_PLY:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            best_score = stand_pat
+            moves = list(player.generate_legal_moves(opponent, captures_only=True))
+
+        board_state = board.get_board_state()
+        moves.sort(key=lambda move: mvv_lva_key(board_state, move))
+        for move in moves:
+            # captures come most valuable victim first, so once one fails the delta test, all that follow do too
+            if stand_pat is not None and stand_pat + board_state[move[1]].value + DELTA_MARGIN <= alpha:
+                break
+            board.make(move)
+            score = -self._quiescence_search(opponent, player, -beta, -alpha, ply + 1)
+            board.unmake()
+            if self._stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+
+def allocate_time(remaining, increment=0, moves_to_go=None):
+    """ Returns (soft_limit, hard_limit), in seconds, for a move with remaining seconds on the clock, increment
+    seconds added after the move, and moves_to_go moves to the next time control (DEFAULT_MOVES_TO_GO if not given).
+    The soft limit is an even share of the remaining time plus most of the increment. The hard limit lets a
+    difficult iteration run on to a few times the soft limit, but never past the time remaining."""
+    if moves_to_go is None or moves_to_go <= 0:
+        moves_to_go = DEFAULT_MOVES_TO_GO
+    available = max(remaining - MOVE_OVERHEAD, 0.0)
+    soft_limit = min(available / moves_to_go + increment * INCREMENT_FRACTION, available)
+    hard_limit = min(soft_limit * HARD_LIMIT_FACTOR, available)
+    return soft_limit, hard_limit
+
+
+def score_to_table(score, ply):
+    """ Returns score as stored in a TranspositionTable. Mate scores count plies from the root, so they are stored
+    counting plies from the position instead."""
+    if score >= MATE_SCORE - MAX_DEPTH:
+        return score + ply
+    if score <= -MATE_SCORE + MAX_DEPTH:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """ Returns a score read from a TranspositionTable as a score counting mate plies from the root."""
+    if score >= MATE_SCORE - MAX_DEPTH:
+        return score - ply
+    if score <= -MATE_SCORE + MAX_DEPTH:
+        return score + ply
+    return score
+
+
+def best_move(game, depth=None, movetime=None, report=None, table=None, remaining=None, increment=0,
+              moves_to_go=None):
+    """ Returns (move, score, pv) for the side to move in game, where move is a (from_alg, to_alg) tuple that can be
+    passed to game.make_move(), score is in hundredths of a soldier for the side to move, and pv is a list of
+    (from_alg, to_alg) tuples starting with move. move is None if the game is over.
+    depth, movetime, report, remaining, increment and moves_to_go are as for Search.search(). table is a
+    TranspositionTable to keep between calls."""
+    if game.get_game_state() != 'UNFINISHED':
+        return None, 0, []
+    board = game.get_board()
+    move, score, pv = Search(game, table).search(depth, movetime, report, remaining, increment, moves_to_go)
+    pv = [(board.get_alg_from_pos(from_pos), board.get_alg_from_pos(to_pos)) for from_pos, to_pos in pv]
+    if move is None:
+        return None, score, pv
+    return pv[0], score, pv
+
+
+def print_report(depth, score, nodes, seconds, pv):
+    """ Prints one line for a completed iteration, with the nodes searched, nodes per second, and the PV.
+    Pass as the report argument of best_move() or Search.search()."""
+    nps = nodes / seconds if seconds else 0
+    line = " ".join(POS_TO_ALG[from_pos] + POS_TO_ALG[to_pos] for from_pos, to_pos in pv)
+    print("depth {:>2} score {:>7} nodes {:>10,} nps {:>9,.0f} time {:>7.3f} pv {}".format(
+        depth, score, nodes, nps, seconds, line))
+
+
+if __name__ == "__main__":
+    # search the starting position from the command line with
+    #   python3 Search.py [depth]
+    from XiangqiGame_single_module import XiangqiGame
+    if len(sys.argv) > 1:
+        search_depth = int(sys.argv[1])
+    else:
+        search_depth = DEFAULT_DEPTH
+    print(best_move(XiangqiGame(), search_depth, report=print_report))
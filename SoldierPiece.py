@@ -1,14 +1,39 @@
 from Piece import Piece
+from Board import NUM_FILES, NUM_POSITIONS
+
+
+def _build_soldier_moves(rank_step):
+    """ Returns a list indexed by position of (forward, sideways) tuples for a soldier advancing by rank_step ranks.
+    Forward is the position one point ahead, or None at the far edge of the board. Sideways is a tuple of the
+    positions one point to either side along the same rank."""
+    moves = []
+    for pos in range(NUM_POSITIONS):
+        forward = pos + rank_step * NUM_FILES
+        if not 0 <= forward < NUM_POSITIONS:
+            forward = None
+        sideways = tuple(side_pos for side_pos in (pos - 1, pos + 1)
+                         if 0 <= side_pos < NUM_POSITIONS and side_pos // NUM_FILES == pos // NUM_FILES)
+        moves.append((forward, sideways))
+    return moves
+
 
 class SoldierPiece(Piece):
     """Creates SoliderPieces
     soldier_positions is a class variable, a dictionary of initial positions keyed by player color
     Two SoldierPieces are created by a call to Player.__init__()."""
 
+    piece_type = 'So'   # label for this Piece type
+    value = 100         # material value of this Piece type, for evaluation
     soldier_positions = {
         'red': ['a4', 'c4', 'e4', 'g4', 'i4'],
         'black': ['a7', 'c7', 'e7', 'g7', 'i7']
     }
+    # soldier_moves is a class variable keyed by player side, built once at import time. Each value is a list
+    # indexed by position of (forward, sideways) steps. Red soldiers advance up the ranks, black soldiers down.
+    soldier_moves = {
+        'red': _build_soldier_moves(1),
+        'black': _build_soldier_moves(-1)
+    }
 
     def __init__(self, side, board, id_num):
         """ Initializes an soldier piece. The side ('red' or 'black'), the Board, and the id_num of this piece are
@@ -20,7 +45,8 @@ class SoldierPiece(Piece):
 
         # assign a position from SoldierPiece
         self._id = id_num # id_num is passed as argument, by Player, and will be 1 or 2
-        self._pos = SoldierPiece.soldier_positions[side][id_num - 1] # keep track of positions used based on id number
+        # keep track of positions used based on id number
+        self._pos = board.get_pos_from_alg(SoldierPiece.soldier_positions[side][id_num - 1])
 
 
     def __repr__(self):
@@ -29,45 +55,63 @@ class SoldierPiece(Piece):
         return self._side[0] + "So" + str(self._id)
 
     def is_legal(self, to_pos):
-        """Returns True if it is legal for Soldier to move to to_pos. Checks Piece.is_legal() conditions,
-        with additional restrictions on the soldier's movement:
-        Soldier cannot retreat, solider cannot move horizontally until it has crossed river."""
+        """Returns True if it is legal for Soldier to move to to_pos, with restrictions on the soldier's movement:
+        Soldier cannot retreat, solider cannot move horizontally until it has crossed river.
+        Forward and sideways steps are looked up in the table of soldier moves."""
 
-        # Check Piece.is_legal() conditions
-        try_path = super().is_legal(to_pos)
-        if not try_path:
+        if self._pos is None:           # do not allow captured pieces to move
             return False
 
-        to_rank, to_file = self._board.get_loc_from_pos(to_pos)
-        from_rank, from_file = self._board.get_loc_from_pos(self._pos)
+        forward, sideways = SoldierPiece.soldier_moves[self._side][self._pos]
 
-        # If the move is a retreat, return False
-        # red retreats along the same file from a higher rank to a lower rank
-        if from_file == to_file and self._side == 'red' and to_rank < from_rank:
+        # the soldier may always advance one point, and may step sideways once it has crossed the river.
+        # Any other move, including a retreat, is not legal
+        if to_pos != forward and not (self._crossed_river and to_pos in sideways):
             return False
-        # black retreats along the same file from a lower rank to a higher rank
-        if from_file == to_file and self._side == 'black' and to_rank > from_rank:
-            return False
-
-        # if the move is horizontal and the Soldier has not yet crossed the river, return false
-        # if the rank is the same, the move is horizontal
-        if to_pos[1:] == self._pos[1:] and not self._crossed_river:
-            return False
-
-        # if we made it this far, move is legal for the Soldier. Return True
-        return True
 
+        # if we made it this far, check that to_pos is not occupied by a friend
+        return self.can_occupy(to_pos)
+
+
+    def generate_moves(self):
+        """ Yields the (from_pos, to_pos) moves legal at the Piece level for this Soldier, from the table of
+        soldier moves. Sideways steps are only generated once the soldier has crossed the river."""
+        from_pos = self._pos
+        if from_pos is None:  # if this Piece has been captured, it has no moves
+            return
+        forward, sideways = SoldierPiece.soldier_moves[self._side][from_pos]
+        if forward is not None and self.can_occupy(forward):
+            yield from_pos, forward
+        if self._crossed_river:
+            for to_pos in sideways:
+                if self.can_occupy(to_pos):
+                    yield from_pos, to_pos
+
+    def has_crossed_river(self):
+        """ Returns True if this Soldier has crossed the river, and may move sideways."""
+        return self._crossed_river
+
+    def get_flags(self):
+        """ Returns whether this Soldier has crossed the river, for Board.make() to save."""
+        return self._crossed_river
+
+    def set_flags(self, flags):
+        """ Restores whether this Soldier has crossed the river, for Board.unmake()."""
+        self._crossed_river = flags
+
+    def update_flags(self, to_pos):
+        """ Tags on a check for whether the soldier has crossed the river after a move to to_pos."""
+        # if red makes it to 6 (rank index 5), or black makes it to 5 (rank index 4), river was crossed.
+        # Set self._crossed_river to True
+        if self._side == 'red' and to_pos // 9 == 5:
+            self._crossed_river = True
 
+        if self._side == 'black' and to_pos // 9 == 4:
+            self._crossed_river = True
 
     def move(self, to_pos):
         """ Calls Piece.move(), then tags on a check for whether the soldier has crossed the river."""
         move_result = super().move(to_pos)        # move as usual
-
-        # if red makes it to 6, or black makes it to 5, river was crossed. Set self._crossed_river to True
-        if self._side == 'red' and to_pos[1:] == '6':
-            self._crossed_river = True
-
-        if self._side == 'black' and to_pos[1:] == '5':
-            self._crossed_river = True
-
+        if move_result:
+            self.update_flags(to_pos)
         return move_result
\ No newline at end of file
@@ -0,0 +1,149 @@
+from array import array
+
+from Board import encode_move, decode_move
+
+DEFAULT_MEGABYTES = 16      # size of a table when no budget is given
+
+# bound types, describing how a stored score relates to the true score of the position
+EXACT = 1                   # the score is exact
+LOWER_BOUND = 2             # the search failed high: the true score is at least the stored score
+UPPER_BOUND = 3             # the search failed low: the true score is at most the stored score
+
+NO_MOVE = 0x3FFF            # move field of an entry with no best move
+ENTRY_BYTES = 16            # two 64-bit words per entry: the checked key, and the packed data
+BUCKET_SIZE = 2             # entries per bucket: a depth-preferred slot, then an always-replace slot
+
+# layout of the data word, from the lowest bits: move (14 bits, packed by encode_move), score (22 bits, offset so
+# that it is never negative), depth (8 bits), bound (2 bits), generation (8 bits)
+SCORE_SHIFT = 14
+SCORE_OFFSET = 1 << 21
+DEPTH_SHIFT = 36
+BOUND_SHIFT = 44
+GENERATION_SHIFT = 46
+GENERATIONS = 256
+
+
+def get_num_buckets(megabytes):
+    """ Returns the number of buckets of a table using at most megabytes of memory: the largest power of two that
+    fits, and at least one."""
+    num_buckets = 1
+    while num_buckets * 2 * BUCKET_SIZE * ENTRY_BYTES <= megabytes * 1024 * 1024:
+        num_buckets *= 2
+    return num_buckets
+
+
+def get_table_bytes(megabytes):
+    """ Returns the number of bytes of the entries of a table using at most megabytes of memory. A buffer passed
+    to TranspositionTable must hold at least this many bytes."""
+    return get_num_buckets(megabytes) * BUCKET_SIZE * ENTRY_BYTES
+
+
+class TranspositionTable:
+    """ Creates fixed size TranspositionTables, which remember search results keyed by position hash.
+    Entries live in a flat array('Q') of 64-bit words rather than in Python objects, so the table's memory is fixed
+    when it is created and never grows. Each entry is two words: a data word packing the depth, bound type, score,
+    best move and generation of the entry, and a key word holding the position hash XOR the data word. An entry
+    only matches a hash if the two words agree, so a torn or overwritten entry is never mistaken for a match.
+    Entries are grouped in buckets of two, indexed by the low bits of the hash. The first slot of a bucket keeps
+    the deepest result, and the second slot takes every result that the first slot turns away.
+    Every search starts a new generation, and entries from older generations are replaced first.
+    The words may also live in a buffer shared between processes, such as a multiprocessing.shared_memory block, so
+    that several searches share one table. The key check makes this safe without locks."""
+
+    def __init__(self, megabytes=DEFAULT_MEGABYTES, buffer=None):
+        """ Creates a table using at most megabytes of memory. The number of buckets is rounded down to a power of
+        two. If buffer is given, the table's words are kept in its first get_table_bytes(megabytes) bytes instead
+        of in a new array, and the entries already there are kept. Call release() before the buffer is closed."""
+        num_buckets = get_num_buckets(megabytes)
+        self._mask = num_buckets - 1                         # selects a bucket from the low bits of a hash
+        self._views = []                                     # memoryviews on buffer, released by release()
+        if buffer is None:
+            self._words = array('Q', [0]) * (num_buckets * BUCKET_SIZE * 2)
+        else:
+            view = memoryview(buffer)[:get_table_bytes(megabytes)]
+            self._words = view.cast('Q')
+            self._views = [self._words, view]
+        self._generation = 0
+
+    def release(self):
+        """ Releases the table's views on a shared buffer, so that the buffer can be closed. The table must not be
+        used afterwards."""
+        for view in self._views:
+            view.release()
+        self._views = []
+
+    def get_megabytes(self):
+        """ Returns the memory used by the table's entries, in megabytes."""
+        return len(self._words) * self._words.itemsize / (1024 * 1024)
+
+    def get_num_entries(self):
+        """ Returns the number of entries the table can hold."""
+        return len(self._words) // 2
+
+    def get_generation(self):
+        """ Returns the current generation."""
+        return self._generation
+
+    def new_search(self):
+        """ Starts a new generation. Call once before each search, so that entries left by earlier searches are
+        replaced before entries of the current search."""
+        self._generation = (self._generation + 1) % GENERATIONS
+
+    def clear(self):
+        """ Empties the table."""
+        for index in range(len(self._words)):
+            self._words[index] = 0
+        self._generation = 0
+
+    def probe(self, key):
+        """ Returns (depth, bound, score, move) stored for the position with hash key, or None if there is no entry
+        for it. move is a (from_pos, to_pos) tuple, or None."""
+        words = self._words
+        index = (key & self._mask) * BUCKET_SIZE * 2
+        for slot in range(index, index + BUCKET_SIZE * 2, 2):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                move = data & NO_MOVE
+                if move == NO_MOVE:
+                    move = None
+                else:
+                    move = decode_move(move)
+                return ((data >> DEPTH_SHIFT) & 0xFF, (data >> BOUND_SHIFT) & 0x3,
+                        ((data >> SCORE_SHIFT) & 0x3FFFFF) - SCORE_OFFSET, move)
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """ Stores a search result for the position with hash key: the depth searched, the bound type of score, and
+        the best (from_pos, to_pos) move found, or None.
+        The depth-preferred slot takes the entry if it holds the same position, or an older generation, or a
+        shallower result. Otherwise the entry goes to the always-replace slot."""
+        words = self._words
+        index = (key & self._mask) * BUCKET_SIZE * 2
+        if move is None:
+            packed_move = NO_MOVE
+        else:
+            packed_move = encode_move(move)
+        data = (packed_move | (score + SCORE_OFFSET) << SCORE_SHIFT | min(depth, 0xFF) << DEPTH_SHIFT |
+                bound << BOUND_SHIFT | self._generation << GENERATION_SHIFT)
+
+        stored_data = words[index + 1]
+        if (not stored_data or words[index] ^ stored_data == key
+                or stored_data >> GENERATION_SHIFT != self._generation
+                or (stored_data >> DEPTH_SHIFT) & 0xFF <= depth):
+            slot = index
+        else:
+            slot = index + 2
+        words[slot] = key ^ data
+        words[slot + 1] = data
+
+    def get_hashfull(self):
+        """ Returns the number of entries per thousand, in a sample of the table, written by the current
+        generation."""
+        words = self._words
+        sample = min(1000, len(words) // 2)
+        used = 0
+        for slot in range(0, sample * 2, 2):
+            data = words[slot + 1]
+            if data and data >> GENERATION_SHIFT == self._generation:
+                used += 1
+        return used * 1000 // sample
@@ -1,17 +1,139 @@
-from Board import Board
+from Board import Board, NUM_FILES, NUM_RANKS, NUM_POSITIONS, ZOBRIST_BLACK_TO_MOVE
 from Player import Player
 
+# FEN letters of red Pieces keyed by piece type. Black's letters are the same in lower case.
+FEN_LETTERS = {'Ge': 'K', 'Ad': 'A', 'El': 'B', 'Ho': 'N', 'Ch': 'R', 'Ca': 'C', 'So': 'P'}
+# piece types keyed by FEN letter, also accepting the alternative letters E for elephants and H for horses
+FEN_PIECE_TYPES = dict({letter: piece_type for piece_type, letter in FEN_LETTERS.items()}, E='El', H='Ho')
+START_FEN = 'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1'
+
 class XiangqiGame():
     """ Creates Xiangqi Games
     Language note:  'side' refers to a player side of interest, and is string that may be 'red' or 'black'.
     'player' is used to refer to Player objects."""
 
-    def __init__(self):
-        self._board = Board()                               # initialize board
-        self._red_player = Player('red', self._board)       # initialize red player, with this game's board
-        self._black_player = Player('black', self._board)   # initialize black player, with this game's board
+    def __init__(self, board_class=Board, place_pieces=True):
+        """ Initializes a game in the starting position. board_class selects the Board backend: Board, or a
+        subclass with the same interface such as BitBoard. If place_pieces is False, the Board is left empty, and
+        every Piece is off it, for from_fen and from_bytes to place."""
+        self._board = board_class()                         # initialize board
+        self._red_player = Player('red', self._board, place_pieces)      # initialize red player, with this board
+        self._black_player = Player('black', self._board, place_pieces)  # initialize black player, with this board
         self._turn = 'red'         # red goes first
         self._game_state = 'UNFINISHED'
+        # legal moves of the side to move, cached by update_game_state for validating the next move.
+        # self._legal_moves_key is the (side, Board version) the cache was computed for.
+        self._legal_moves = set()
+        self._legal_moves_key = None
+
+    @classmethod
+    def from_fen(cls, fen, board_class=Board):
+        """ Returns a XiangqiGame in the position given by fen, a Xiangqi FEN string such as START_FEN: the ranks
+        from rank 10 down to rank 1 separated by '/', then the side to move, 'w' or 'r' for red and 'b' for black.
+        The fields after the side to move are ignored, and red moves if the side is left out.
+        Red Pieces are upper case and black Pieces lower case: K general, A advisor, B or E elephant, N or H horse,
+        R chariot, C cannon, P soldier. Digits count empty points.
+        The Pieces are placed straight onto a new Board. Pieces of a type are labelled in the order they are read,
+        so the starting position gets the same labels as XiangqiGame(). Soldiers beyond the river may move sideways.
+        The game state is not checked, so a position with no legal move for the side to move stays 'UNFINISHED'.
+        Raises ValueError if fen is malformed, lacks a general, or has more Pieces of a type than a side owns."""
+        game = cls(board_class, False)
+        game._load_fen(fen)
+        return game
+
+    @classmethod
+    def from_bytes(cls, data, board_class=Board):
+        """ Returns a XiangqiGame in the position encoded in data by to_bytes. Pieces of a type are labelled in
+        position order, and the game state is not checked, as for from_fen. Raises ValueError if data is not a
+        position encoding, lacks a general, or has more Pieces of a type than a side owns."""
+        game = cls(board_class, False)
+        unplaced = game._get_unplaced_pieces()
+        game._turn = game._board.load_bytes(data, unplaced)
+        if unplaced['red']['Ge'] or unplaced['black']['Ge']:
+            raise ValueError("position must have both generals")
+        return game
+
+    def to_bytes(self):
+        """ Returns the compact binary encoding of the current position, with the side to move and the state of
+        every soldier, as written by Board.to_bytes. Cheaper to send between processes or store than the game."""
+        return self._board.to_bytes(self._turn)
+
+    def _get_unplaced_pieces(self):
+        """ Returns each side's Pieces that are off the Board, in a dictionary keyed by side, then by piece type, of
+        lists of Pieces with the highest label first, so that pop() gives the lowest."""
+        unplaced = {}
+        for side in ('red', 'black'):
+            unplaced[side] = {}
+            for piece in sorted(self.get_player(side).get_pieces(), key=str, reverse=True):
+                if piece.get_pos() is None:
+                    unplaced[side].setdefault(piece.get_type(), []).append(piece)
+        return unplaced
+
+    def _load_fen(self, fen):
+        """ Places the Pieces and sets the side to move from fen, on a Board with no Pieces placed."""
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(rows) != NUM_RANKS:
+            raise ValueError("FEN must have {} ranks: {!r}".format(NUM_RANKS, fen))
+
+        unplaced = self._get_unplaced_pieces()
+        board = self._board
+        for row_num, row in enumerate(rows):
+            rank_index = NUM_RANKS - 1 - row_num
+            file = 0
+            for char in row:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                piece_type = FEN_PIECE_TYPES.get(char.upper())
+                if piece_type is None or file >= NUM_FILES:
+                    raise ValueError("bad FEN rank {!r}: {!r}".format(row, fen))
+                side = 'red' if char.isupper() else 'black'
+                pieces = unplaced[side][piece_type]
+                if not pieces:
+                    raise ValueError("too many {} {} Pieces in FEN: {!r}".format(side, piece_type, fen))
+                piece = pieces.pop()
+                pos = rank_index * NUM_FILES + file
+                board.place_piece(piece, pos)
+                piece.set_pos(pos)
+                if piece_type == 'So':      # a soldier beyond the river has crossed it
+                    piece.set_flags(rank_index >= 5 if side == 'red' else rank_index <= 4)
+                file += 1
+            if file != NUM_FILES:
+                raise ValueError("FEN rank {!r} does not have {} files: {!r}".format(row, NUM_FILES, fen))
+
+        if unplaced['red']['Ge'] or unplaced['black']['Ge']:
+            raise ValueError("FEN must have both generals: {!r}".format(fen))
+        if len(fields) > 1:
+            if fields[1] in ('w', 'r'):
+                self._turn = 'red'
+            elif fields[1] == 'b':
+                self._turn = 'black'
+            else:
+                raise ValueError("bad FEN side to move {!r}: {!r}".format(fields[1], fen))
+
+    def to_fen(self):
+        """ Returns the FEN string of the current position and side to move, as read by from_fen. Move counters are
+        not kept by the game, and are written as '- - 0 1'."""
+        board_state = self._board.get_board_state()
+        rows = []
+        for rank_index in reversed(range(NUM_RANKS)):
+            row = ''
+            empty = 0
+            for piece in board_state[rank_index * NUM_FILES:(rank_index + 1) * NUM_FILES]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[piece.piece_type]
+                row += letter if piece.get_side() == 'red' else letter.lower()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        side = 'w' if self._turn == 'red' else 'b'
+        return '/'.join(rows) + ' ' + side + ' - - 0 1'
 
     def get_game_state(self):
         """ Returns 'UNFINISHED', 'RED_WON', or 'BLACK_WON" """
@@ -24,43 +146,62 @@ class XiangqiGame():
         if side == 'black':
             return self._black_player
 
+    def get_board(self):
+        """ Return this game's Board"""
+        return self._board
+
     def get_turn(self):
         """ Return the current turn: 'red' or 'black' """
         return self._turn
 
+    def get_position_hash(self):
+        """ Returns the 64-bit Zobrist hash of the current position: the Pieces on the Board and the side to move.
+        Equal positions have equal hashes."""
+        if self._turn == 'black':
+            return self._board.get_hash() ^ ZOBRIST_BLACK_TO_MOVE
+        return self._board.get_hash()
+
     def is_in_check(self, side):
         """ True if that side is in check, False otherwise """
 
         # get the position of this player's general
         player = self.get_player(side)
         general_pos = player.get_general_pos()
-        # ask the opponent if they can attack the general's position
+        # ask the Board if the opponent can attack the general's position
         opponent = self.get_opponent(side)
-        if opponent.get_attacks(general_pos):
-            return True
-        return False
+        return self._board.is_square_attacked(general_pos, opponent.get_side())
+
+    def get_legal_moves(self, side):
+        """ Returns a list of side's legal (from_pos, to_pos) moves, as Board positions. Legal moves are moves legal
+        at the Piece level that do not leave side's general attacked.
+        If the moves were cached by the last update_game_state and the Board has not changed since, they are not
+        generated again."""
+        legal_moves = self.get_cached_legal_moves(side)
+        if legal_moves is not None:
+            return list(legal_moves)
+        return list(self.get_player(side).generate_legal_moves(self.get_opponent(side)))
+
+    def get_cached_legal_moves(self, side):
+        """ Returns the set of side's legal moves cached by the last update_game_state, or None if nothing is cached
+        for side, or the Board has changed since."""
+        if self._legal_moves_key != (side, self._board.get_version()):
+            return None
+        return self._legal_moves
 
     def is_in_stalemate(self, side):
         """Return True if side is in stalemate"""
         player = self.get_player(side)
         opponent = self.get_opponent(side)
-        if player.has_available_move(opponent):  # if side has an available move against opponent, return False
+        if player.has_legal_move(opponent):  # if side has a legal move against opponent, return False
             return False
         return True
 
     def is_in_checkmate(self, side):
-        """ returns True if this side's Player is in checkmate. Player is in checkmate if there is no one move that can
-        defend against all current checks"""
-
-        defender = self.get_player(side)
-        attacker = self.get_opponent(side)
-        defending_general = defender.get_general_pos()
-        attack_list = attacker.get_attacks(defending_general) # get all attacks against defending geenral
-
-        if attack_list:  # ask defender if it can defend all checks with one move. If so, return True.
-            if not defender.defend_all_checks(attack_list, attacker):
-                return True
-        return False
+        """ returns True if this side's Player is in checkmate. Player is in checkmate if it is in check, and
+        no legal move defends against all current checks"""
+        player = self.get_player(side)
+        opponent = self.get_opponent(side)
+        return self.is_in_check(side) and not player.has_legal_move(opponent)
 
     def make_move(self, from_pos, to_pos):
         """
@@ -84,18 +225,86 @@ class XiangqiGame():
         if self.out_of_range(from_pos) or self.out_of_range(to_pos):    # validate that positions are within range
             return False
 
+        # translate the algebraic strings to Board positions. Everything below the game works on positions.
+        return self._make_move(self._board.get_pos_from_alg(from_pos), self._board.get_pos_from_alg(to_pos))
+
+    def _make_move(self, from_pos, to_pos):
+        """ Makes the move from from_pos to to_pos, Board positions, for make_move, once the game is known to be
+        unfinished. Returns True if the move was legal and made, and False otherwise."""
         # allow the turn to proceed
-        turn_player = self.get_player(self._turn)
-        opp = self.get_opponent(self._turn)
-        try_move = turn_player.move(from_pos, to_pos, opp)     # ask this turn's Player to attempt the move
-        if not try_move:                            # if not successful, return False
-            return False
+        legal_moves = self.get_cached_legal_moves(self._turn)
+        if legal_moves is not None:
+            # the legal moves were generated when the last move was made, so validate against them
+            if (from_pos, to_pos) not in legal_moves:
+                return False
+            self._board.get_piece_from_pos(from_pos).move(to_pos)
+        else:
+            turn_player = self.get_player(self._turn)
+            opp = self.get_opponent(self._turn)
+            try_move = turn_player.move(from_pos, to_pos, opp)     # ask this turn's Player to attempt the move
+            if not try_move:                            # if not successful, return False
+                return False
 
         # If we got to this point, move succeeded. Update the game state, flip the turn, and return True
         self.update_game_state()
         self.update_turn()
         return True
 
+    def replay(self, moves, verify='full'):
+        """ Plays moves, an iterable of (from_pos, to_pos) tuples of Board positions, from the current position, and
+        returns the index of the first move refused, or None if every move was played. Play stops at a refused move,
+        leaving the game after the moves before it.
+        verify chooses how much is checked:
+            'full': every move is checked as by make_move(), and the game state is updated after every move.
+            'legal-only': every move is checked to be legal for the side to move, but the game state is only
+                updated once, after the last move played. A move after checkmate or stalemate is still refused,
+                since the side to move has no legal move.
+            'trusted': nothing is checked. The moves are played with make_trusted_move(), and the game state is not
+                updated. For moves that were verified before, such as stored games.
+        Raises ValueError for any other verify."""
+        if verify == 'trusted':
+            for from_pos, to_pos in moves:
+                self.make_trusted_move(from_pos, to_pos)
+            return None
+        if verify not in ('full', 'legal-only'):
+            raise ValueError("verify must be 'full', 'legal-only' or 'trusted', not {!r}".format(verify))
+
+        refused = None
+        played = False
+        side = self._turn
+        player = self.get_player(side)
+        opponent = self.get_opponent(side)
+        for index, (from_pos, to_pos) in enumerate(moves):
+            if self._game_state != 'UNFINISHED' or \
+                    not (0 <= from_pos < NUM_POSITIONS and 0 <= to_pos < NUM_POSITIONS):
+                refused = index
+                break
+            if verify == 'full':
+                if not self._make_move(from_pos, to_pos):
+                    refused = index
+                    break
+                continue
+            # one move is checked without generating every legal move: Player.move() tests the Piece's rules, and
+            # whether the general would be left attacked
+            if not player.move(from_pos, to_pos, opponent):
+                refused = index
+                break
+            played = True
+            player, opponent = opponent, player
+
+        if played:              # update the game state as make_move() would have after the last move
+            self._turn = opponent.get_side()
+            self.update_game_state()
+            self.update_turn()
+        return refused
+
+    def make_trusted_move(self, from_pos, to_pos):
+        """ Makes the move from from_pos to to_pos, Board positions, and flips the turn, without checking that the
+        move is legal or whether it ends the game. For replaying moves known to be legal, such as the moves of a
+        stored game. The move must be legal, or the game is left in an invalid state."""
+        self._board.play((from_pos, to_pos))
+        self.update_turn()
+
     def get_opponent(self, side):
         """ Returns the opponent of player"""
         if side == 'red':
@@ -105,7 +314,9 @@ class XiangqiGame():
 
     def update_game_state(self):
         """ Checks if there is a checkmate or stalemate and updates game state if so. Otherwise,
-         does nothing. Returns True """
+         does nothing. Returns True
+         Check status and the legal moves of the next player are computed in a single pass. The legal moves are
+         cached, so that the next call to make_move validates against them instead of generating them again."""
 
         # Endgame result depends on who would move next
         if self._turn == 'red':
@@ -113,22 +324,23 @@ class XiangqiGame():
         else:
             next_turn = 'red'
 
+        # generate the next player's legal moves once, and cache them for the next move
+        in_check = self.is_in_check(next_turn)
+        next_player = self.get_player(next_turn)
+        self._legal_moves = set(next_player.generate_legal_moves(self.get_opponent(next_turn)))
+        self._legal_moves_key = (next_turn, self._board.get_version())
+
         # check if most recent move has put the next player in checkmate or stalemate
-        if self.is_in_checkmate(next_turn): # if next player is in checkmate, this player won
+        if not self._legal_moves:
+            # if next player has no legal move, this player won, whether or not the next player is in check
             if self._turn == 'red':
                 self._game_state = 'RED_WON'
             else:
                 self._game_state = 'BLACK_WON'
-            print("CHECKMATE", self._game_state)
-            return
-
-        if self.is_in_stalemate(next_turn): # if next player is in checkmate, this player won
-            # update endgame conditions
-            if self._turn == 'red':
-                self._game_state = 'RED_WON'
+            if in_check:
+                print("CHECKMATE", self._game_state)
             else:
-                self._game_state = 'BLACK_WON'
-            print("STALEMATE", self._game_state)
+                print("STALEMATE", self._game_state)
             return
 
     def update_turn(self):
@@ -139,7 +351,6 @@ class XiangqiGame():
             self._turn = 'red'
 
     def out_of_range(self, pos):
-        """Returns True if pos is beyond the limits of the board"""
-        rank, file = pos[1:], pos[0]
-        return rank not in self._board.get_ranks() or file not in self._board.get_files()
+        """Returns True if pos, an algebraic string such as 'e10', is beyond the limits of the board"""
+        return self._board.get_pos_from_alg(pos) is None
 
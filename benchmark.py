@@ -0,0 +1,193 @@
+# Benchmarks for the Board backends and the search.
+# Run from the command line with
+#   python3 benchmark.py
+# Compares the list-backed Board with the BitBoard on Piece move generation and check detection, over positions
+# sampled from random games. Then compares the nodes searched to a fixed depth with and without move ordering, and
+# with each of the search's selective techniques switched off in turn. Last, times Lazy SMP searches of the same
+# positions with one worker and with more, and prints the speedup over one worker, and times replaying random games
+# with each level of verification.
+
+import os
+import random
+import time
+
+from XiangqiGame_single_module import XiangqiGame
+from Board import Board
+from BitBoard import BitBoard
+from Search import Search
+from lazy_smp import parallel_search
+from Board import ALG_TO_POS
+
+
+def sample_games(num_games=20, num_plies=40, seed=162):
+    """ Returns a list of move lists, each a list of (from_alg, to_alg) tuples from a random game of at most
+    num_plies plies. The same seed always gives the same games."""
+    rng = random.Random(seed)
+    games = []
+    for game_num in range(num_games):
+        game = XiangqiGame()
+        board = game.get_board()
+        moves = []
+        for ply in range(num_plies):
+            side = game.get_turn()
+            available = game.get_player(side).has_available_move(game.get_opponent(side))
+            if not available or game.get_game_state() != 'UNFINISHED':
+                break
+            from_pos, to_pos = rng.choice(sorted(available))
+            move = (board.get_alg_from_pos(from_pos), board.get_alg_from_pos(to_pos))
+            game.make_move(*move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def load_positions(board_class, games, every=5):
+    """ Returns a list of XiangqiGames using board_class, one for every few plies of each game in games."""
+    positions = []
+    for moves in games:
+        for end in range(0, len(moves) + 1, every):
+            game = XiangqiGame(board_class)
+            for from_alg, to_alg in moves[:end]:
+                game.make_move(from_alg, to_alg)
+            positions.append(game)
+    return positions
+
+
+def time_move_generation(positions, repeat=5):
+    """ Returns (seconds, moves) for generating the Piece-level moves of every piece in every position.
+    Seconds is the fastest of repeat passes."""
+    best = None
+    for iteration in range(repeat):
+        num_moves = 0
+        start = time.perf_counter()
+        for game in positions:
+            for side in ('red', 'black'):
+                for piece in game.get_player(side).get_pieces():
+                    for move in piece.generate_moves():
+                        num_moves += 1
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, num_moves
+
+
+def time_check_detection(positions, repeat=5):
+    """ Returns (seconds, checks) for asking whether each side is in check in every position.
+    Seconds is the fastest of repeat passes."""
+    best = None
+    for iteration in range(repeat):
+        num_checks = 0
+        start = time.perf_counter()
+        for game in positions:
+            for side in ('red', 'black'):
+                game.is_in_check(side)
+                num_checks += 1
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, num_checks
+
+
+def compare_backends(board_classes=(Board, BitBoard), repeat=5):
+    """ Prints the move generation and check detection rates of each Board backend over the same positions."""
+    games = sample_games()
+    print("{:<10} {:>16} {:>16}".format("backend", "moves/sec", "checks/sec"))
+    for board_class in board_classes:
+        positions = load_positions(board_class, games)
+        gen_time, num_moves = time_move_generation(positions, repeat)
+        check_time, num_checks = time_check_detection(positions, repeat)
+        print("{:<10} {:>16,.0f} {:>16,.0f}".format(board_class.__name__, num_moves / gen_time,
+                                                    num_checks / check_time))
+
+
+def compare_move_ordering(depth=4, every=10, num_games=3):
+    """ Prints the nodes and time to search positions sampled from random games to depth, with only the hash move
+    tried first, and with full move ordering (hash move, MVV-LVA captures, killers and history). Every search starts
+    with an empty transposition table."""
+    positions = load_positions(Board, sample_games(num_games), every)
+    print("{:<16} {:>12} {:>9} {:>12}".format("move ordering", "nodes", "seconds", "nodes/sec"))
+    totals = {}
+    for move_ordering in (False, True):
+        nodes = 0
+        seconds = 0.0
+        for game in positions:
+            search = Search(game, move_ordering=move_ordering)
+            search.search(depth)
+            nodes += search.get_nodes()
+            seconds += search.get_seconds()
+        totals[move_ordering] = nodes
+        print("{:<16} {:>12,} {:>9.3f} {:>12,.0f}".format("on" if move_ordering else "hash move only", nodes, seconds,
+                                                          nodes / seconds))
+    print("{} positions at depth {}: {:.1f}x fewer nodes with move ordering".format(
+        len(positions), depth, totals[False] / totals[True]))
+
+
+def compare_search_features(depth=5, every=10, num_games=1):
+    """ Prints the nodes and time to search a fixed set of positions to depth with every selective technique on,
+    with each of null-move pruning, late move reductions and check extensions switched off in turn, and with all
+    three off. The positions are the starting position and positions sampled from random games."""
+    positions = load_positions(Board, sample_games(num_games), every)
+    configurations = [
+        ('all on', {}),
+        ('no null move', {'null_move': False}),
+        ('no LMR', {'late_move_reductions': False}),
+        ('no check ext.', {'check_extensions': False}),
+        ('all off', {'null_move': False, 'late_move_reductions': False, 'check_extensions': False}),
+    ]
+    print("{} positions at depth {}".format(len(positions), depth))
+    print("{:<16} {:>12} {:>9} {:>12}".format("search", "nodes", "seconds", "nodes/sec"))
+    for name, options in configurations:
+        nodes = 0
+        seconds = 0.0
+        for game in positions:
+            search = Search(game, **options)
+            search.search(depth)
+            nodes += search.get_nodes()
+            seconds += search.get_seconds()
+        print("{:<16} {:>12,} {:>9.3f} {:>12,.0f}".format(name, nodes, seconds, nodes / seconds))
+
+
+def compare_lazy_smp(worker_counts=(1, 2, 4), depth=5, every=10, num_games=1):
+    """ Prints the time to search a fixed set of positions to depth with parallel_search() for each number of
+    workers in worker_counts, with the nodes searched by all workers, and the speedup in time to depth over the
+    first count. Every search starts with an empty shared table, and the time includes starting the workers.
+    Workers beyond the number of cores only share its time, so expect no speedup from them."""
+    positions = load_positions(Board, sample_games(num_games), every)
+    print("{} positions at depth {}, {} cores".format(len(positions), depth, os.cpu_count()))
+    print("{:<16} {:>12} {:>9} {:>12} {:>8}".format("workers", "nodes", "seconds", "nodes/sec", "speedup"))
+    base_seconds = None
+    for workers in worker_counts:
+        nodes = 0
+        start = time.perf_counter()
+        for game in positions:
+            move, score, pv, worker_stats = parallel_search(game, depth, workers=workers)
+            nodes += sum(stats[1] for stats in worker_stats)
+        seconds = time.perf_counter() - start
+        if base_seconds is None:
+            base_seconds = seconds
+        print("{:<16} {:>12,} {:>9.3f} {:>12,.0f} {:>7.2f}x".format(workers, nodes, seconds, nodes / seconds,
+                                                                    base_seconds / seconds))
+
+
+def compare_replay(num_games=20, num_plies=150):
+    """ Prints the time per move to replay random games with XiangqiGame.replay() at each level of verification:
+    'full', as make_move() checks, 'legal-only', and 'trusted'. The time includes creating each game."""
+    games = [[(ALG_TO_POS[from_alg], ALG_TO_POS[to_alg]) for from_alg, to_alg in moves]
+             for moves in sample_games(num_games, num_plies)]
+    num_moves = sum(len(moves) for moves in games)
+    print("{} games, {} moves".format(len(games), num_moves))
+    print("{:<16} {:>9} {:>12}".format("verify", "seconds", "us/move"))
+    for verify in ('full', 'legal-only', 'trusted'):
+        start = time.perf_counter()
+        for moves in games:
+            XiangqiGame().replay(moves, verify)
+        seconds = time.perf_counter() - start
+        print("{:<16} {:>9.3f} {:>12.1f}".format(verify, seconds, seconds / num_moves * 1000000))
+
+
+if __name__ == "__main__":
+    compare_backends()
+    compare_move_ordering()
+    compare_search_features()
+    compare_lazy_smp()
+    compare_replay()
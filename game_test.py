@@ -1,107 +1,32 @@
 # Author: Elaine Laguerta
 
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
-from XiangqiGame_single_module import XiangqiGame
+from XiangqiGame_single_module import XiangqiGame, START_FEN
 from Board import Board
-from Player import Player
-from GeneralPiece import GeneralPiece
-from ElephantPiece import ElephantPiece
-from ChariotPiece import ChariotPiece
-from SoldierPiece import SoldierPiece
-from AdvisorPiece import AdvisorPiece
-from HorsePiece import HorsePiece
-from CannonPiece import CannonPiece
+from BitBoard import BitBoard
+import perft
+import Search
+import TranspositionTable
+import MoveOrdering
+import Evaluator
+import lazy_smp
+import GameRecord
+import notation
+import io
 
 class TestGame(unittest.TestCase):
     def setUp(self):
-        game = XiangqiGame()
-        board = Board()
-        red_player = Player('red', board)
-        black_player = Player('black', board)
-        red_player._pieces = set()
-        black_player._pieces = set()
-
-        for player in [red_player, black_player]:
-            side = player._side
-            player._general = (GeneralPiece(side, board))
-            player._pieces.add(player._general)
-
-            # initialize 2 Advisor Pieces
-            player._pieces.add(AdvisorPiece(side, board, 1))
-            player._pieces.add(AdvisorPiece(side, board, 2))
-
-            # initialize 2 Elephant pieces
-            player._pieces.add(ElephantPiece(side, board, 1))
-            player._pieces.add(ElephantPiece(side, board, 2))
-
-            # initialize 2 Horse pieces
-            player._pieces.add(HorsePiece(side, board, 1))
-            player._pieces.add(HorsePiece(side, board, 2))
-
-            # initialize 2 chariot pieces
-            player._pieces.add(ChariotPiece(side, board, 1))
-            player._pieces.add(ChariotPiece(side, board, 2))
-
-            # initialize 2 cannon pieces
-            player._pieces.add(CannonPiece(side, board, 1))
-            player._pieces.add(CannonPiece(side, board, 2))
-
-            # initialize 5 soldiers
-            player._pieces.add(SoldierPiece(side, board, 1))
-            player._pieces.add(SoldierPiece(side, board, 2))
-            player._pieces.add(SoldierPiece(side, board, 3))
-            player._pieces.add(SoldierPiece(side, board, 4))
-            player._pieces.add(SoldierPiece(side, board, 5))
-
-            # place all pieces in initial positions
-            for piece in player._pieces:
-                board.place_piece(piece, piece.get_pos())
-
-        game._board = board
-        game._red_player = red_player
-        game._black_player = black_player
-        return game
+        return XiangqiGame.from_fen(START_FEN)
 
     def test_cannon_win(self):
-        game = self.setUp()
-        board = game._board
-        red_pieces = game.get_player("red")._pieces
-        black_pieces = game.get_player("black")._pieces
-
-        # initialize empty board
-        board._board_state = [  # board state represented as a 2D array
-            [None for file in board._files] for rank in board._ranks  # initialize all positions to None
-        ]
-
-        board._piece_state = {}  # dictionary of piece: pos pairs. When pieces are captured, value is set to None
-
-        for piece in black_pieces:
-            piece.set_pos(None)
-
-        for piece in red_pieces:
-            piece.set_pos(None)
-
-        for piece in black_pieces:
-            if str(piece) == "bGe":
-                piece.set_pos('d10')
-                board.place_piece(piece, 'd10')
-            elif str(piece) == "bAd1":
-                piece.set_pos('d8')
-                board.place_piece(piece, 'd8')
-            elif str(piece) == "bAd2":
-                piece.set_pos('e9')
-                board.place_piece(piece, 'e9')
-
-        for piece in red_pieces:
-            if isinstance(piece, GeneralPiece):
-                piece.set_pos('f3')
-                board.place_piece(piece, 'f3')
-            if str(piece) == "rAd1":
-                piece.set_pos('d3')
-                board.place_piece(piece, 'd3')
-            if str(piece) == "rCa1":
-                piece.set_pos('d1')
-                board.place_piece(piece, 'd1')
+        # black general on d10, advisors on e9 and d8. Red general on f3, advisor on d3, cannon on d1
+        game = XiangqiGame.from_fen('3k5/4a4/3a5/9/9/9/9/3A1K3/9/3C5 w')
+        board = game.get_board()
 
         self.assertEqual(game.make_move('f3', 'e3'), True)  # red general
         self.assertEqual(game.make_move('d10', 'e10'), True)  # black general
@@ -111,40 +36,8 @@ class TestGame(unittest.TestCase):
         board.display_board()
 
     def test_stalemate_2(self):
-        game = self.setUp()
-        board = game._board
-        red_pieces = game.get_player("red")._pieces
-        black_pieces = game.get_player("black")._pieces
-
-        # initialize empty board
-        board._board_state = [  # board state represented as a 2D array
-            [None for file in board._files] for rank in board._ranks  # initialize all positions to None
-        ]
-
-        board._piece_state = {}  # dictionary of piece: pos pairs. When pieces are captured, value is set to None
-
-        for piece in black_pieces:
-            piece.set_pos(None)
-
-        for piece in red_pieces:
-            piece.set_pos(None)
-
-        for piece in black_pieces:
-            if str(piece) == "bGe":
-                piece.set_pos('d10')
-                board.place_piece(piece, 'd10')
-            elif str(piece) == "bEl1":
-                piece.set_pos('c6')
-                board.place_piece(piece, 'c6')
-
-        for piece in red_pieces:
-            if isinstance(piece, GeneralPiece):
-                piece.set_pos('e2')
-                board.place_piece(piece, 'e2')
-            elif str(piece) == "rHo1":
-                piece.set_pos('f8')
-                board.place_piece(piece, 'f8')
-                horse = piece
+        # black general on d10 and elephant on c6, red general on e2 and horse on f8
+        game = XiangqiGame.from_fen('3k5/9/5N3/9/2b6/9/9/9/4K4/9 w')
         self.assertEqual(game.make_move('f8', 'd7'), True) # red horse
         self.assertEqual(game.make_move('d10', 'd9'), True) # black general
         self.assertEqual(game.make_move('d7', 'b8'), True)  # red horse forks black general
@@ -156,45 +49,8 @@ class TestGame(unittest.TestCase):
 
     def test_fork(self):
         # test a state from which red stalemates black
-        game = self.setUp()
-        board = game._board
-        red_pieces = game.get_player("red")._pieces
-        black_pieces = game.get_player("black")._pieces
-
-        # initialize empty board
-        board._board_state = [  # board state represented as a 2D array
-            [None for file in board._files] for rank in board._ranks  # initialize all positions to None
-        ]
-
-        board._piece_state = {}  # dictionary of piece: pos pairs. When pieces are captured, value is set to None
-
-        for piece in black_pieces:
-            piece.set_pos(None)
-
-        for piece in red_pieces:
-            piece.set_pos(None)
-
-        for piece in black_pieces:
-            if str(piece) == "bGe":
-                piece.set_pos('d9')
-                board.place_piece(piece, 'd9')  # black general on d9
-            elif str(piece) == "bAd1":
-                piece.set_pos('d10')
-                board.place_piece(piece, 'd10')  # black advisor on d10
-            elif str(piece) == "bAd2":
-                piece.set_pos('d8')
-                board.place_piece(piece, 'd8') # black advisor on d8
-
-        cannon_found = False
-        for piece in red_pieces:
-            if isinstance(piece, GeneralPiece):
-                piece.set_pos('e1')
-                board.place_piece(piece, 'e1')
-            if str(piece) == 'rCa1':
-                piece.set_pos('h3')
-                board.place_piece(piece, 'h3')
-                cannon_found = True
-
+        # black general on d9 between advisors on d10 and d8, red general on e1 and cannon on h3
+        game = XiangqiGame.from_fen('3a5/3k5/3a5/9/9/9/9/7C1/9/4K4 w')
         self.assertEqual(game.make_move('h3', 'h9'), True) #red stalemates black
         self.assertEqual(game.is_in_stalemate('red'), False)
         self.assertEqual(game.is_in_stalemate('black'), True)
@@ -203,60 +59,9 @@ class TestGame(unittest.TestCase):
     def test_draw (self):
         # I thought this would end in stalemate, but maybe it's just perpetual check
         # hard code to an intermediate state
-        game = self.setUp()
-        board = game._board
-        red_pieces = game.get_player("red")._pieces
-        black_pieces = game.get_player("black")._pieces
-        for piece in black_pieces:
-            if str(piece) == "bEl1":
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('c10')
-                board.place_piece(piece, 'c10')  # 1 black elephant on c10
-            elif str(piece) == "bGe":
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('d9')
-                board.place_piece(piece, 'd9')  # black general on d9
-            elif str(piece) == "bEl2":
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('e8')
-                board.place_piece(piece, 'e8')  # other black elephant on e8
-            else:  # remove all other pieces from board
-                board.clear_pos(piece.get_pos())
-                board.clear_piece(piece)
-                piece.set_pos(None)
-
-        for piece in red_pieces:
-            if str(piece) == "rHo1":
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('g7')
-                board.place_piece(piece, 'g7')  # 1 red horse on g7
-            elif str(piece) == "rCa1":
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('e6')
-                board.place_piece(piece, 'e6')  # 1 red cannon on e6
-            elif str(piece) == "rEl1":
-                piece.set_pos('a3')
-                board.place_piece(piece, 'a3')  # 1 red elephant on a2
-            elif str(piece) == 'rAd1':
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('d3')
-                board.place_piece(piece, 'd3')  # 1 red advisor on d2
-            elif str(piece) == 'rEl2':
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('c1')
-                board.place_piece(piece, 'c1')  # other red elephant on c1
-            elif str(piece) == 'rGe':
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('e1')
-                board.place_piece(piece, 'e1')  # red general on e1
-            elif str(piece) == 'rAd2':  # other advisor on f1
-                board.clear_pos(piece.get_pos())
-                piece.set_pos('f1')
-                board.place_piece(piece, 'f1')
-            else:  # remove all other pieces from board
-                board.clear_pos(piece.get_pos())
-                board.clear_piece(piece)
-                piece.set_pos(None)
+        # black general on d9, elephants on c10 and e8. Red general on e1, advisors on d3 and f1, elephants on a3 and
+        # c1, cannon on e6, horse on g7
+        game = XiangqiGame.from_fen('2b6/3k5/4b4/6N2/4C4/9/9/B2A5/9/2B1KA3 w')
 
         self.assertEqual(game.make_move('g7', 'e8'), True) # red horse takes black elephant
         self.assertEqual(game.make_move('d9', 'd8'), True) # black moves general
@@ -283,7 +88,7 @@ class TestGame(unittest.TestCase):
 
         # make legal capture with screen
         game.update_turn()  # red turn
-        captive =  game._board.get_piece_from_pos('i1')
+        captive =  game._board.get_piece_from_pos(game._board.get_pos_from_alg('i1'))
         self.assertEqual(game.make_move('i5', 'i1'), True) # black cannon captures red chariot with 1 jump
         self.assertEqual(captive.get_pos(), None)       # confirm capture
         self.assertEqual(game._board._piece_state[str(captive)], None)
@@ -323,18 +128,18 @@ class TestGame(unittest.TestCase):
         # put player in check using flying general
         game = XiangqiGame()
         board = game._board
-        e7 = board.get_piece_from_pos('e7')  # remove black soldier on e7
-        board.clear_pos('e7')
+        e7 = board.get_piece_from_pos(board.get_pos_from_alg('e7'))  # remove black soldier on e7
+        board.clear_pos(board.get_pos_from_alg('e7'))
         board.clear_piece(e7)
-        e4 = board.get_piece_from_pos('e4')  # remove red soldier on e4
-        board.clear_pos('e4')
+        e4 = board.get_piece_from_pos(board.get_pos_from_alg('e4'))  # remove red soldier on e4
+        board.clear_pos(board.get_pos_from_alg('e4'))
         board.clear_piece(e4)
 
         # now both sides should be in check from flying general
         self.assertEqual(game.is_in_check('black'), True)
         self.assertEqual(game.is_in_check('red'), True)
-        red_gen = board.get_piece_from_pos('e1')
-        self.assertEqual(red_gen.is_flying_general('e10'), True)
+        red_gen = board.get_piece_from_pos(board.get_pos_from_alg('e1'))
+        self.assertEqual(red_gen.is_flying_general(board.get_pos_from_alg('e10')), True)
 
     def test_advisor(self):
         """ test advisor movement pattern"""
@@ -444,7 +249,7 @@ class TestGame(unittest.TestCase):
         self.assertEqual(game.make_move('e7', 'e6'), True) # black moves
 
         #capture by advancing one point
-        captive = board.get_piece_from_pos('e6')  # get black soldier
+        captive = board.get_piece_from_pos(board.get_pos_from_alg('e6'))  # get black soldier
         self.assertEqual(game.make_move('e5', 'e6'), True) # red captures black
         # confirm capture
         self.assertEqual(captive.get_pos(), None)
@@ -485,5 +290,561 @@ class TestGame(unittest.TestCase):
         self.assertEqual(game.make_move('e7', 'e6'), True)
         self.assertEqual(game.get_game_state(), 'UNFINISHED')
 
+    def test_bitboard(self):
+        """ A game on the BitBoard backend generates the same moves and checks as the list Board"""
+        list_game = XiangqiGame()
+        bit_game = XiangqiGame(BitBoard)
+        moves = [('b3', 'e3'), ('h8', 'e8'), ('h3', 'h6'), ('b8', 'b4'), ('e3', 'e7'), ('e8', 'e4'), ('h6', 'e6')]
+        for from_pos, to_pos in moves:
+            self.assertEqual(list_game.make_move(from_pos, to_pos), bit_game.make_move(from_pos, to_pos))
+            for side in ['red', 'black']:
+                list_moves = set()
+                bit_moves = set()
+                for piece in list_game.get_player(side).get_pieces():
+                    list_moves.update(piece.generate_moves())
+                for piece in bit_game.get_player(side).get_pieces():
+                    bit_moves.update(piece.generate_moves())
+                self.assertEqual(list_moves, bit_moves)
+                self.assertEqual(list_game.is_in_check(side), bit_game.is_in_check(side))
+        self.assertEqual(bit_game.get_game_state(), 'RED_WON')
+
+    def test_is_square_attacked(self):
+        """ tests the reverse attack lookup on both Board backends"""
+        for board_class in [Board, BitBoard]:
+            game = XiangqiGame(board_class)
+            board = game.get_board()
+            self.assertEqual(board.is_square_attacked(board.get_pos_from_alg('h10'), 'red'), True)  # cannon screen
+            self.assertEqual(board.is_square_attacked(board.get_pos_from_alg('c3'), 'red'), True)   # horse
+            self.assertEqual(board.is_square_attacked(board.get_pos_from_alg('d2'), 'red'), False)  # horse leg blocked
+            self.assertEqual(board.is_square_attacked(board.get_pos_from_alg('e10'), 'red'), False)
+
+            # remove both center soldiers, so the generals face each other
+            for alg in ['e4', 'e7']:
+                soldier = board.get_piece_from_pos(board.get_pos_from_alg(alg))
+                board.clear_pos(board.get_pos_from_alg(alg))
+                board.clear_piece(soldier)
+                soldier.set_pos(None)
+            self.assertEqual(board.is_square_attacked(board.get_pos_from_alg('e10'), 'red'), True)  # flying general
+            self.assertEqual(game.is_in_check('red'), True)
+
+    def test_legal_moves(self):
+        """ tests the legal move generator with pins and screens"""
+        game = self.setUp()
+        self.assertEqual(len(game.get_legal_moves('red')), 44)  # published count for the opening position
+
+        # red chariot on e5 pinned by the black chariot on e9, red horse on c3, black cannon on a1
+        game = XiangqiGame.from_fen('3k5/4r4/9/9/9/4R4/9/2N6/9/c3K4 w')
+        board = game.get_board()
+
+        legal_moves = {(board.get_alg_from_pos(from_pos), board.get_alg_from_pos(to_pos))
+                       for from_pos, to_pos in game.get_legal_moves('red')}
+        # red chariot is pinned to its general by the black chariot, and may only move along the file
+        chariot_moves = {to_pos for from_pos, to_pos in legal_moves if from_pos == 'e5'}
+        self.assertEqual(chariot_moves, {'e2', 'e3', 'e4', 'e6', 'e7', 'e8', 'e9'})
+        # red horse would become the screen for the black cannon on a1 if it moved to b1 or d1
+        horse_moves = {to_pos for from_pos, to_pos in legal_moves if from_pos == 'c3'}
+        self.assertEqual(horse_moves, {'a2', 'a4', 'b5', 'd5', 'e2', 'e4'})
+        self.assertEqual(game.is_in_checkmate('red'), False)
+
+    def test_has_legal_move(self):
+        """ tests the early exit legal move query against the full legal move list"""
+        game = self.setUp()
+        red = game.get_player('red')
+        black = game.get_player('black')
+        self.assertEqual(red.has_legal_move(black), True)
+        self.assertEqual(red.get_ordered_pieces()[0], red._general)  # general steps are tried first
+        self.assertEqual([piece.get_type() for piece in red.get_ordered_pieces()[1:6]], ['So'] * 5)
+
+        game.make_move('c4', 'c5')
+        game.make_move('c7', 'c6')
+        game.make_move('c5', 'c6')
+        for side in ('red', 'black'):
+            player = game.get_player(side)
+            opponent = game.get_opponent(side)
+            self.assertEqual(player.has_legal_move(opponent), bool(game.get_legal_moves(side)))
+
+    def test_legal_move_cache(self):
+        """ tests that make_move caches the next player's legal moves, and validates against them"""
+        game = self.setUp()
+        board = game.get_board()
+        self.assertEqual(game.get_cached_legal_moves('red'), None)  # nothing is cached before the first move
+        self.assertEqual(game.make_move('h3', 'e3'), True)  # red cannon to the center
+        cached = game.get_cached_legal_moves('black')
+        self.assertEqual(cached, set(game.get_player('black').generate_legal_moves(game.get_player('red'))))
+        self.assertEqual(game.make_move('e7', 'e6'), True)  # a cached move is made
+        self.assertEqual(game.make_move('e6', 'e5'), False)  # not red's piece
+        self.assertEqual(game.make_move('e3', 'e7'), False)  # cannon may not capture without a screen
+
+        # the cache is stale once the Board changes outside of make_move
+        board.clear_pos(board.get_pos_from_alg('e4'))
+        self.assertEqual(game.get_cached_legal_moves('red'), None)
+
+    def test_make_unmake(self):
+        """ tests that Board.unmake restores every change made by Board.make"""
+        game = self.setUp()
+        board = game.get_board()
+        soldier = board.get_piece_from_pos(board.get_pos_from_alg('c4'))
+        game.make_move('c4', 'c5')
+        game.make_move('c7', 'c6')
+        board_state = list(board.get_board_state())
+        piece_state = dict(board._piece_state)
+
+        # red soldier captures black soldier and crosses the river
+        captive = board.make((board.get_pos_from_alg('c5'), board.get_pos_from_alg('c6')))
+        self.assertEqual(str(captive), 'bSo2')
+        self.assertEqual(captive.get_pos(), None)
+        self.assertEqual(soldier.has_crossed_river(), True)
+        board.make((board.get_pos_from_alg('b10'), board.get_pos_from_alg('c8')))  # black horse
+        self.assertEqual(board.get_ply(), 2)
+
+        board.unmake()
+        board.unmake()
+        self.assertEqual(board.get_ply(), 0)
+        self.assertEqual(board.get_board_state(), board_state)
+        self.assertEqual(board._piece_state, piece_state)
+        self.assertEqual(captive.get_pos(), board.get_pos_from_alg('c6'))
+        self.assertEqual(soldier.get_pos(), board.get_pos_from_alg('c5'))
+        self.assertEqual(soldier.has_crossed_river(), False)
+
+    def test_position_hash(self):
+        """ tests that the position hash is updated incrementally, and identifies transposed positions"""
+        game = self.setUp()
+        other = XiangqiGame()
+        start_hash = game.get_position_hash()
+        self.assertEqual(start_hash, other.get_position_hash())
+
+        for from_alg, to_alg in [('b1', 'c3'), ('b10', 'c8'), ('h1', 'g3'), ('h10', 'g8')]:
+            game.make_move(from_alg, to_alg)
+        for from_alg, to_alg in [('h1', 'g3'), ('h10', 'g8'), ('b1', 'c3'), ('b10', 'c8')]:
+            other.make_move(from_alg, to_alg)
+        self.assertEqual(game.get_position_hash(), other.get_position_hash())    # same position, different order
+        self.assertNotEqual(game.get_position_hash(), start_hash)
+        self.assertEqual(game.get_board().get_hash(), game.get_board().compute_hash())
+
+        self.assertEqual(game.make_move('e4', 'e5'), True)
+        self.assertEqual(game.get_board().get_hash(), game.get_board().compute_hash())
+        other.make_move('e4', 'e5')
+        self.assertEqual(game.get_position_hash(), other.get_position_hash())
+        self.assertNotEqual(game.get_position_hash(), game.get_board().get_hash())  # black is to move
+
+    def test_perft(self):
+        """ tests leaf node counts of the legal move tree against the perft suite"""
+        for name, game, side, counts in perft.get_suite():
+            position_hash = game.get_position_hash()
+            for depth in range(1, 4):
+                self.assertEqual(perft.perft(game, depth, side), counts[depth], name)
+            self.assertEqual(game.get_position_hash(), position_hash, name)    # make and unmake left no trace
+
+        name, game, side, counts = perft.get_suite()[5]     # river crossings, red to move
+        self.assertIn(('e7', 'd7'), perft.divide(game, 1, side))    # a soldier two ranks past the river moves sideways
+        game = XiangqiGame.from_fen('3k5/9/9/4P4/p1P4p1/P1p3P2/8P/4p3p/9/4K4 w')   # the same position
+        self.assertEqual([perft.perft(game, depth) for depth in range(4)], counts[:4])
+
+        game = self.setUp()
+        counts = perft.divide(game, 2)
+        self.assertEqual(len(counts), 44)
+        self.assertEqual(sum(counts.values()), 1920)
+        self.assertEqual(counts[('h3', 'h10')], 41)   # red cannon captures black horse
+
+    def test_parallel_perft(self):
+        """ tests that divide across worker processes agrees with divide in one process"""
+        name, game, side, counts = perft.get_suite()[2]     # flying general, black to move
+        parallel_counts, worker_stats = perft.parallel_divide(game, 3, side, workers=2)
+        self.assertEqual(parallel_counts, perft.divide(game, 3, side))
+        self.assertEqual(sum(nodes for nodes, seconds in worker_stats.values()), counts[3])
+        name, game, side, counts = perft.get_suite()[5]     # river crossings: soldiers have crossed
+        parallel_counts, worker_stats = perft.parallel_divide(game, 3, side, workers=2)
+        self.assertEqual(parallel_counts, perft.divide(game, 3, side))
+        self.assertEqual(sum(parallel_counts.values()), counts[3])
+        self.assertEqual(perft.parallel_perft(XiangqiGame(), 2, workers=2), 1920)
+
+    def test_search(self):
+        """ tests that the search finds mates and captures, and leaves the game as it was"""
+        game = perft.set_position(XiangqiGame(), {'rGe': 'f1', 'rCh1': 'a9', 'rCh2': 'b1', 'bGe': 'd10', 'bSo1': 'a7'})
+        position_hash = game.get_position_hash()
+        move, score, pv = Search.best_move(game, 2)
+        self.assertEqual(move, ('b1', 'b10'))     # chariot mates on the back rank
+        self.assertEqual(score, Search.MATE_SCORE - 1)
+        self.assertEqual(pv, [('b1', 'b10')])
+        self.assertEqual(game.get_position_hash(), position_hash)
+        self.assertEqual(game.make_move(*move), True)
+        self.assertEqual(game.get_game_state(), 'RED_WON')
+        self.assertEqual(Search.best_move(game), (None, 0, []))    # the game is over
+
+        game = self.setUp()
+        search = Search.Search(game)
+        move, score, pv = search.search(3)
+        self.assertEqual(len(pv), 3)
+        self.assertEqual(move, pv[0])
+        self.assertGreater(search.get_nodes(), 0)
+        board = game.get_board()
+        for from_pos, to_pos in pv:     # every move of the PV is legal in turn
+            self.assertEqual(game.make_move(board.get_alg_from_pos(from_pos), board.get_alg_from_pos(to_pos)), True)
+
+    def test_transposition_table(self):
+        """ tests storing, replacing and aging entries of the transposition table"""
+        table = TranspositionTable.TranspositionTable(1)
+        self.assertEqual(table.get_megabytes(), 1)
+        num_buckets = table.get_num_entries() // TranspositionTable.BUCKET_SIZE
+        key = 0x123456789ABCDEF0
+        self.assertEqual(table.probe(key), None)
+        table.store(key, 5, TranspositionTable.EXACT, -99950, (85, 4))
+        self.assertEqual(table.probe(key), (5, TranspositionTable.EXACT, -99950, (85, 4)))
+
+        # a shallower result for another position in the same bucket goes to the always-replace slot
+        other_key = key + num_buckets
+        table.store(other_key, 2, TranspositionTable.LOWER_BOUND, 120, None)
+        self.assertEqual(table.probe(other_key), (2, TranspositionTable.LOWER_BOUND, 120, None))
+        self.assertEqual(table.probe(key), (5, TranspositionTable.EXACT, -99950, (85, 4)))
+        third_key = key + 2 * num_buckets
+        table.store(third_key, 1, TranspositionTable.UPPER_BOUND, 0, (0, 9))
+        self.assertEqual(table.probe(other_key), None)          # always-replace slot was overwritten
+        self.assertEqual(table.probe(key)[0], 5)                 # deeper entry is kept
+
+        # once a new search starts, the old deep entry is replaced
+        table.new_search()
+        table.store(other_key, 1, TranspositionTable.EXACT, 7, None)
+        self.assertEqual(table.probe(key), None)
+        self.assertEqual(table.probe(other_key), (1, TranspositionTable.EXACT, 7, None))
+
+        # a second search of the same position with the same table searches fewer nodes
+        game = self.setUp()
+        table = TranspositionTable.TranspositionTable(1)
+        search = Search.Search(game, table)
+        first = search.search(3)
+        first_nodes = search.get_nodes()
+        self.assertEqual(search.search(3), first)
+        self.assertLess(search.get_nodes(), first_nodes)
+
+    def test_move_ordering(self):
+        """ tests that moves are picked hash move first, then captures by MVV-LVA, then killers, then by history"""
+        game = perft.set_position(XiangqiGame(), {'rGe': 'e1', 'rCh1': 'a7', 'rCh2': 'i6', 'rSo3': 'e5',
+                                                  'bGe': 'd10', 'bCh1': 'a8', 'bHo1': 'e6'})
+        board = game.get_board()
+
+        def pos_moves(*algs):
+            return [(board.get_pos_from_alg(from_alg), board.get_pos_from_alg(to_alg)) for from_alg, to_alg in algs]
+
+        moves = game.get_legal_moves('red')
+        ordering = MoveOrdering.MoveOrdering()
+        hash_move, killer, other_quiet = pos_moves(('e1', 'e2'), ('i6', 'i9'), ('a7', 'b7'))
+        ordering.add_cutoff(killer, 2, 3)
+        ordering.add_cutoff(other_quiet, 4, 5)      # a cutoff at another ply only adds history
+        picked = list(ordering.pick_moves(board, moves, hash_move, 3))
+        self.assertEqual(sorted(picked), sorted(moves))
+        self.assertEqual(picked[0], hash_move)
+        # chariot takes chariot, then the horse is taken by the soldier before the chariot
+        self.assertEqual(picked[1:4], pos_moves(('a7', 'a8'), ('e5', 'e6'), ('i6', 'e6')))
+        self.assertEqual(picked[4], killer)
+        self.assertEqual(picked[5], other_quiet)    # best history score
+        self.assertEqual(ordering.get_killers(3)[0], killer)
+
+    def test_quiescence(self):
+        """ tests that the quiescence search sees a recapture beyond the horizon, and the capture generators"""
+        placements = {'rGe': 'e1', 'rCh1': 'a1', 'rCa1': 'b3', 'rSo5': 'i4',
+                      'bGe': 'd10', 'bHo1': 'a6', 'bCh1': 'a9', 'bSo2': 'b7', 'bEl1': 'b10'}
+        for board_class in (Board, BitBoard):
+            game = perft.set_position(XiangqiGame(board_class), placements)
+            board = game.get_board()
+            # the cannon captures beyond its screen, the chariot captures the first occupant
+            cannon = board.get_piece_from_pos(board.get_pos_from_alg('b3'))
+            chariot = board.get_piece_from_pos(board.get_pos_from_alg('a1'))
+            self.assertEqual(list(cannon.generate_captures()), [(cannon.get_pos(), board.get_pos_from_alg('b10'))])
+            self.assertEqual(list(chariot.generate_captures()), [(chariot.get_pos(), board.get_pos_from_alg('a6'))])
+
+            # the horse is defended by the black chariot
+            move, score, pv = Search.Search(game, quiescence=False).search(1)
+            self.assertEqual(move, (board.get_pos_from_alg('a1'), board.get_pos_from_alg('a6')))
+            move, score, pv = Search.Search(game).search(1)
+            self.assertNotEqual(move, (board.get_pos_from_alg('a1'), board.get_pos_from_alg('a6')))
+
+    def test_evaluator(self):
+        """ tests the incremental score, the piece-square tables, and loading tables from a file"""
+        evaluator = Evaluator.Evaluator()
+        for board_class in (Board, BitBoard):
+            game = XiangqiGame(board_class)
+            board = game.get_board()
+            evaluator.attach(board)
+            self.assertEqual(board.get_score(), 0)      # the starting position is symmetric
+            for from_alg, to_alg in [('h3', 'e3'), ('h8', 'e8'), ('e3', 'e7'), ('e8', 'e4'), ('c4', 'c5')]:
+                self.assertEqual(game.make_move(from_alg, to_alg), True)
+                self.assertEqual(board.get_score(), board.compute_score())
+            score = board.get_score()
+            for move in game.get_legal_moves(game.get_turn()):
+                board.make(move)
+                self.assertEqual(board.get_score(), board.compute_score())
+                board.unmake()
+            self.assertEqual(board.get_score(), score)
+
+        # a soldier is worth more once it has crossed the river
+        soldier = evaluator.get_table('So')
+        self.assertGreater(soldier[board.get_pos_from_alg('e6')], soldier[board.get_pos_from_alg('e4')])
+        self.assertEqual(evaluator.evaluate(board, 'black'), -evaluator.evaluate(board, 'red'))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tables.json')
+            evaluator.save(path)
+            with open(path) as infile:
+                data = json.load(infile)
+            data['material']['Ch'] = 1000
+            data['tables']['So'][4][4] = 77    # e6, as rows run from rank 10 down to rank 1
+            with open(path, 'w') as outfile:
+                json.dump(data, outfile)
+            loaded = Evaluator.Evaluator.load(path)
+        self.assertEqual(loaded.get_material('Ch'), 1000)
+        self.assertEqual(loaded.get_table('So')[board.get_pos_from_alg('e6')], 77)
+        self.assertEqual(loaded.get_table('Ho'), evaluator.get_table('Ho'))
+
+    def test_selective_search(self):
+        """ tests null-move pruning, late move reductions and check extensions, switched on and off"""
+        game = perft.set_position(XiangqiGame(), {'rGe': 'f1', 'rCh1': 'a9', 'rCh2': 'b1', 'rSo1': 'a4',
+                                                  'bGe': 'd10', 'bSo1': 'a7', 'bHo1': 'h8'})
+        search = Search.Search(game)
+        self.assertEqual(search._has_null_move_material(game.get_player('red')), True)     # two chariots
+        self.assertEqual(search._has_null_move_material(game.get_player('black')), False)  # a lone horse
+        for options in ({}, {'null_move': False}, {'late_move_reductions': False}, {'check_extensions': False}):
+            move, score, pv = Search.Search(game, **options).search(3)
+            self.assertEqual(move, (game.get_board().get_pos_from_alg('b1'), game.get_board().get_pos_from_alg('b10')))
+            self.assertEqual(score, Search.MATE_SCORE - 1)
+
+        game = self.setUp()
+        selective = Search.Search(game)
+        selective.search(4)
+        full_width = Search.Search(game, null_move=False, late_move_reductions=False, check_extensions=False)
+        full_width.search(4)
+        self.assertLess(selective.get_nodes(), full_width.get_nodes())
+
+    def test_time_management(self):
+        """ tests time allocation, hard deadlines, and stopping a search from another thread"""
+        soft_limit, hard_limit = Search.allocate_time(60.05, 2, 30)
+        self.assertAlmostEqual(soft_limit, 3.5)     # an even share of the clock plus most of the increment
+        self.assertAlmostEqual(hard_limit, 14)
+        self.assertAlmostEqual(Search.allocate_time(1.05, 0, 1)[1], 1)     # never more than the clock
+
+        game = self.setUp()
+        start = time.perf_counter()
+        move, score, pv = Search.best_move(game, remaining=1.0, moves_to_go=10)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(game.make_move(*move), True)
+
+        search = Search.Search(game)
+        timer = threading.Timer(0.2, search.stop)
+        timer.start()
+        start = time.perf_counter()
+        move, score, pv = search.search(30)
+        timer.join()
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn(move, game.get_legal_moves(game.get_turn()))
+
+        # a stop() before the search starts is kept, and cleared once that search returns
+        search.stop()
+        move, score, pv = search.search(30)
+        self.assertEqual(search.get_depth(), 0)
+        self.assertIn(move, game.get_legal_moves(game.get_turn()))
+        search.search(2)
+        self.assertEqual(search.get_depth(), 2)
+
+        # the hard limit applies to the first iteration too
+        start = time.perf_counter()
+        move, score, pv = Search.Search(game).search(movetime=0.0)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn(move, game.get_legal_moves(game.get_turn()))
+
+    def test_fen(self):
+        """ tests reading and writing positions in FEN"""
+        game = XiangqiGame.from_fen(START_FEN)
+        start = XiangqiGame()
+        self.assertEqual(start.to_fen(), START_FEN)
+        self.assertEqual(game.get_position_hash(), start.get_position_hash())
+        for piece in start.get_player('red').get_pieces() | start.get_player('black').get_pieces():
+            self.assertEqual(repr(game.get_board().get_piece_from_pos(piece.get_pos())), repr(piece))
+
+        # a soldier beyond the river may step sideways, and the side to move is read and written
+        fen = '4k4/9/9/4P4/9/9/9/9/9/3K5 b - - 0 1'
+        game = XiangqiGame.from_fen(fen)
+        self.assertEqual(game.get_turn(), 'black')
+        self.assertEqual(game.to_fen(), fen)
+        self.assertEqual(game.make_move('e10', 'd10'), False)   # the generals would face each other
+        self.assertEqual(game.make_move('e10', 'f10'), True)
+        self.assertEqual(game.make_move('e7', 'd7'), True)
+        self.assertEqual(game.to_fen(), '5k3/9/9/3P5/9/9/9/9/9/3K5 b - - 0 1')
+
+        for bad_fen in ('', '4k4/9/9/9/9/9/9/9/9 w', '4k4/9/9/9/9/9/9/9/9/3K4 w', '4k4/9/9/9/9/9/9/9/9/9 w',
+                        'rrr1k4/9/9/9/9/9/9/9/9/4K4 w', '4k4/9/9/9/9/9/9/9/9/4X4 w', '4k4/9/9/9/9/9/9/9/9/3K5 x'):
+            with self.assertRaises(ValueError):
+                XiangqiGame.from_fen(bad_fen)
+
+    def test_position_bytes(self):
+        """ tests the binary encoding of positions"""
+        game = self.setUp()
+        data = game.to_bytes()
+        self.assertEqual(len(data), 47)
+        copy = XiangqiGame.from_bytes(data)
+        self.assertEqual(copy.to_fen(), START_FEN)
+        self.assertEqual(copy.get_position_hash(), game.get_position_hash())
+
+        # side to move survives, and so do soldiers that have crossed the river and soldiers that have not
+        game = XiangqiGame.from_fen('3k5/9/9/2P1p4/P8/9/2P6/6p2/9/4K4 b')
+        copy = XiangqiGame.from_bytes(game.to_bytes(), BitBoard)
+        self.assertEqual(copy.get_turn(), 'black')
+        self.assertEqual(copy.to_fen(), game.to_fen())
+        board = copy.get_board()
+        for alg, crossed in (('a6', True), ('c7', True), ('c4', False), ('g3', True), ('e7', False)):
+            self.assertEqual(board.get_piece_from_pos(board.get_pos_from_alg(alg)).get_flags(), crossed, alg)
+        for side in ('red', 'black'):
+            self.assertEqual(sorted(copy.get_legal_moves(side)), sorted(game.get_legal_moves(side)))
+        self.assertEqual(perft.perft(copy, 3), perft.perft(game, 3))
+
+        with self.assertRaises(ValueError):
+            XiangqiGame.from_bytes(data[:-1])
+        with self.assertRaises(ValueError):
+            XiangqiGame.from_bytes(bytes([0x11]) * 45 + bytes(2))     # sixteen red generals
+
+    def test_game_record(self):
+        """ tests encoding moves, writing and reading game records, and replaying them"""
+        game = self.setUp()
+        board = game.get_board()
+        self.assertEqual(GameRecord.decode_move(GameRecord.encode_move((89, 0))), (89, 0))
+        record = GameRecord.GameRecord()
+        for move in (('h3', 'e3'), ('h10', 'g8'), ('e3', 'e7'), ('i10', 'h10')):
+            self.assertEqual(game.make_move(*move), True)
+            record.add_move((board.get_pos_from_alg(move[0]), board.get_pos_from_alg(move[1])))
+        record.set_result(game.get_game_state())
+        from_fen = XiangqiGame.from_fen('3k5/1R7/9/9/9/9/9/9/9/R3K4 w')     # a1-a10 mates
+        short = GameRecord.GameRecord(from_fen.to_bytes(), [GameRecord.encode_move((0, 81))], 'RED_WON')
+
+        outfile = io.BytesIO()
+        GameRecord.write_record(outfile, record)
+        GameRecord.write_record(outfile, short)
+        self.assertEqual(len(outfile.getvalue()), 2 * GameRecord.RECORD_HEADER.size + 2 * 5)
+        records = list(GameRecord.read_records(io.BytesIO(outfile.getvalue())))
+        self.assertEqual([list(read.iter_moves()) for read in records],
+                         [list(record.iter_moves()), list(short.iter_moves())])
+        self.assertEqual(records[1].get_result(), 'RED_WON')
+        self.assertEqual(records[0].replay()[0].to_fen(), game.to_fen())
+        self.assertEqual(records[0].replay('trusted')[0].to_fen(), game.to_fen())
+        self.assertEqual(records[1].replay(board_class=BitBoard)[0].get_game_state(), 'RED_WON')
+
+        record.add_move((0, 0))             # an illegal move
+        self.assertEqual(record.replay()[1], 4)
+        with self.assertRaises(ValueError):
+            list(GameRecord.read_records(io.BytesIO(outfile.getvalue()[:-1])))
+        with self.assertRaises(ValueError):
+            list(GameRecord.read_records(io.BytesIO(b'PGN!' + outfile.getvalue()[4:])))
+
+    def test_notation(self):
+        """ tests reading and writing WXF and ICCS moves, and reading and writing PGN-style files"""
+        game = self.setUp()
+        board = game.get_board()
+        self.assertEqual(notation.iccs_to_move('h2e2'), (board.get_pos_from_alg('h3'), board.get_pos_from_alg('e3')))
+        self.assertEqual(notation.move_to_iccs(notation.iccs_to_move('H2-E2')), 'h2e2')
+        self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, 'C2.5')), 'h2e2')
+        game.make_move('h3', 'e3')
+        self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, 'h8+7')), 'h9g7')
+        self.assertEqual(notation.move_to_wxf(game, notation.iccs_to_move('h9g7')), 'H8+7')
+        self.assertEqual(notation.move_to_wxf(game, notation.iccs_to_move('a9a8')), 'R1+1')
+        for bad_move in ('C2.0', 'Q2.5', 'C2.', 'H8.7', 'R1-1'):
+            with self.assertRaises(ValueError):
+                notation.wxf_to_move(game, bad_move)
+
+        # tandem chariots are named front and rear. Tandem advisors are named by file, and told apart by which one
+        # can move
+        game = XiangqiGame.from_fen('3k5/9/9/9/9/R8/9/R2A5/9/3AK4 w')
+        self.assertEqual(notation.move_to_wxf(game, notation.iccs_to_move('a4a5')), 'R++1')
+        self.assertEqual(notation.move_to_wxf(game, notation.iccs_to_move('a2a3')), 'R-+1')
+        self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, 'R-.8')), 'a2b2')
+        self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, '+R.8')), 'a4b4')
+        for iccs, wxf in (('d0e1', 'A6+5'), ('d2e1', 'A6-5')):
+            self.assertEqual(notation.move_to_wxf(game, notation.iccs_to_move(iccs)), wxf)
+            self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, wxf)), iccs)
+
+        # with three soldiers on one file and two on another, '+' and '-' name the pair
+        game = XiangqiGame.from_fen('4k4/9/2P6/2P3P2/2P3P2/9/9/9/9/3K5 w')
+        self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, '+P+1')), 'g6g7')
+        self.assertEqual(notation.move_to_iccs(notation.wxf_to_move(game, '-P.4')), 'g5f5')
+        with self.assertRaises(ValueError):
+            notation.wxf_to_move(game, '-P+1')      # the rear soldier is blocked by the front one
+
+        text = """[Event "first"]
+[FEN "3k5/1R7/9/9/9/9/9/9/9/R3K4 w - - 0 1"]
+
+1. R9+9 {mate} 1-0
+[Event "second"]
+1. C2.5 h8+7 (1... c8.5) 2. h0g2 ; the rest is lost
+2... i9h9 *
+"""
+        games = list(notation.read_games(io.StringIO(text)))
+        self.assertEqual(games, [({'Event': 'first', 'FEN': '3k5/1R7/9/9/9/9/9/9/9/R3K4 w - - 0 1'}, ['R9+9']),
+                                 ({'Event': 'second'}, ['C2.5', 'h8+7', 'h0g2', 'i9h9'])])
+        game, moves = notation.replay_game(*games[0])
+        self.assertEqual(game.get_game_state(), 'RED_WON')
+        game, moves = notation.replay_game(*games[1])
+        outfile = io.StringIO()
+        notation.write_game(outfile, {'Event': 'copy'}, moves)
+        self.assertEqual(outfile.getvalue(), '[Event "copy"]\n\n1. C2.5 H8+7 2. H2+3 R9.8 *\n\n')
+        self.assertEqual(notation.replay_game(*next(notation.read_games(io.StringIO(outfile.getvalue()))))[1], moves)
+        with self.assertRaises(ValueError):
+            notation.replay_game({}, ['C2.5', 'h8+7', 'C2.5'])     # no red cannon is left on file 2
+
+    def test_replay(self):
+        """ tests replaying moves at each level of verification, and finding the first illegal move"""
+        moves = [('h3', 'e3'), ('h10', 'g8'), ('e3', 'e7'), ('i10', 'h10'), ('a1', 'a2')]
+        played = self.setUp()
+        for move in moves:
+            played.make_move(*move)
+        board = played.get_board()
+        positions = [(board.get_pos_from_alg(from_alg), board.get_pos_from_alg(to_alg)) for from_alg, to_alg in moves]
+        for verify in ('full', 'legal-only', 'trusted'):
+            game = self.setUp()
+            self.assertEqual(game.replay(positions, verify), None)
+            self.assertEqual(game.to_fen(), played.to_fen())
+            self.assertEqual(game.get_turn(), 'black')
+
+        # a move of a black Piece on red's turn, a move from an empty point, and a move off the board are refused,
+        # and play stops before them
+        game = self.setUp()
+        game.replay(positions[:4])
+        before_bad_move = game.get_position_hash()
+        for bad_move in ((board.get_pos_from_alg('g8'), board.get_pos_from_alg('f6')), (76, 67), (0, 90)):
+            for verify in ('full', 'legal-only'):
+                game = self.setUp()
+                self.assertEqual(game.replay(positions[:4] + [bad_move] + positions[4:], verify), 4)
+                self.assertEqual(game.get_turn(), 'red')
+                self.assertEqual(game.get_position_hash(), before_bad_move)
+
+        # the game state is updated after the last move, and no move is accepted after the end of the game
+        mate = [(0, 81), (76, 75)]      # a1-a10 mates, then any black move is refused
+        for verify in ('full', 'legal-only'):
+            game = XiangqiGame.from_fen('3k5/1R7/9/9/9/9/9/9/9/R3K4 w')
+            self.assertEqual(game.replay(mate, verify), 1)
+            self.assertEqual(game.get_game_state(), 'RED_WON')
+            self.assertEqual(game.replay(mate[1:], verify), 0)
+            self.assertEqual(game.replay([], verify), None)     # a finished game refuses no move if none is given
+        game = XiangqiGame.from_fen('3k5/1R7/9/9/9/9/9/9/9/R3K4 w')
+        self.assertEqual(game.replay(mate[:1], 'trusted'), None)
+        self.assertEqual(game.get_game_state(), 'UNFINISHED')       # trusted replay never checks
+        with self.assertRaises(ValueError):
+            game.replay(mate, 'some')
+
+    def test_lazy_smp(self):
+        """ tests sharing a transposition table through a buffer, and searching with several worker processes"""
+        buffer = bytearray(TranspositionTable.get_table_bytes(1))
+        writer = TranspositionTable.TranspositionTable(1, buffer)
+        reader = TranspositionTable.TranspositionTable(1, buffer)
+        writer.store(0x123456789ABCDEF0, 4, TranspositionTable.LOWER_BOUND, 35, (1, 20))
+        self.assertEqual(reader.probe(0x123456789ABCDEF0), (4, TranspositionTable.LOWER_BOUND, 35, (1, 20)))
+        writer.release()
+        reader.release()
+
+        game = self.setUp()
+        game.make_move('h3', 'e3')
+        move, score, pv, worker_stats = lazy_smp.parallel_search(game, 3, workers=2, megabytes=1)
+        self.assertEqual(len(worker_stats), 2)
+        self.assertGreaterEqual(worker_stats[0][0], 3)      # worker 0 always completes its depth
+        self.assertIn(move, game.get_legal_moves('black'))
+        self.assertEqual(pv[0], move)
+        alg_move = lazy_smp.best_move(game, 2, workers=1)[0]
+        self.assertEqual(game.make_move(*alg_move), True)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+# Lazy SMP: several worker processes search the same position at once, sharing one transposition table.
+# Python threads take turns holding the interpreter, so a CPU-bound search does not get faster with more threads.
+# Worker processes do, but they share no memory, so the table's words are kept in a multiprocessing.shared_memory
+# block that every worker attaches to. Each worker runs its own iterative deepening search, and what one worker stores
+# in the table cuts short or reorders the search of the others. The workers alternate between the requested depth
+# and one ply deeper, so that they do not all walk the tree in step.
+# Run from the command line with
+#   python3 lazy_smp.py [depth] [workers]
+# Searches the starting position with the given number of workers (default one per core), and prints the result and
+# the depth, nodes and node rate of every worker.
+
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+from XiangqiGame_single_module import XiangqiGame
+from Search import Search, DEFAULT_DEPTH
+from TranspositionTable import TranspositionTable, DEFAULT_MEGABYTES, get_table_bytes
+
+# the shared memory, table and position of a worker process, set once per process by _init_worker
+_worker_memory = None
+_worker_table = None
+_worker_game = None
+_worker_stop_signal = None
+
+
+def _init_worker(memory_name, megabytes, position, stop_signal):
+    """ Attaches a worker process to the shared table, and builds the position to search from its binary
+    encoding."""
+    global _worker_memory, _worker_table, _worker_game, _worker_stop_signal
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_table = TranspositionTable(megabytes, _worker_memory.buf)
+    _worker_game = XiangqiGame.from_bytes(position)
+    _worker_stop_signal = stop_signal
+
+
+def _search_worker(task):
+    """ Returns (worker_num, depth, move, score, pv, nodes, seconds) for one worker's search, where task is a
+    (worker_num, depth, movetime, remaining, increment, moves_to_go) tuple and depth is the deepest iteration the
+    worker completed. Odd numbered workers search one ply deeper than asked. Runs in a worker process."""
+    worker_num, depth, movetime, remaining, increment, moves_to_go = task
+    if depth is not None:
+        depth += worker_num % 2
+    search = Search(_worker_game, _worker_table, stop_signal=_worker_stop_signal)
+    move, score, pv = search.search(depth, movetime, None, remaining, increment, moves_to_go)
+    return worker_num, search.get_depth(), move, score, pv, search.get_nodes(), search.get_seconds()
+
+
+def parallel_search(game, depth=None, movetime=None, workers=None, megabytes=DEFAULT_MEGABYTES, remaining=None,
+                    increment=0, moves_to_go=None):
+    """ Searches game's position across a pool of worker processes, one per core unless workers is given, sharing a
+    transposition table of megabytes. Returns (move, score, pv, worker_stats), where move, score and pv are as for
+    Search.search(), taken from the worker that completed the deepest iteration, or from worker 0 for equal depths.
+    worker_stats is a list indexed by worker number of (depth, nodes, seconds) tuples.
+    Worker 0 searches to depth, or for the time given by movetime or the clock as in Search.search(). When it
+    finishes, every other worker is stopped and returns its deepest completed iteration."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if depth is None and movetime is None and remaining is None:
+        depth = DEFAULT_DEPTH
+    memory = shared_memory.SharedMemory(create=True, size=get_table_bytes(megabytes))     # created zeroed: empty
+    try:
+        stop_signal = multiprocessing.Event()
+        initargs = (memory.name, megabytes, game.to_bytes(), stop_signal)
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            pending = [pool.apply_async(_search_worker, ((worker_num, depth, movetime, remaining, increment,
+                                                           moves_to_go),))
+                       for worker_num in range(workers)]
+            results = [pending[0].get()]
+            stop_signal.set()
+            results.extend(result.get() for result in pending[1:])
+    finally:
+        memory.close()
+        memory.unlink()
+
+    best = max(results, key=lambda result: (result[1], -result[0]))
+    worker_stats = [(result[1], result[5], result[6]) for result in sorted(results)]
+    return best[2], best[3], best[4], worker_stats
+
+
+def best_move(game, depth=None, movetime=None, workers=None, megabytes=DEFAULT_MEGABYTES, remaining=None,
+              increment=0, moves_to_go=None):
+    """ Returns (move, score, pv) for the side to move in game as Search.best_move() does, searched by
+    parallel_search() with workers worker processes."""
+    if game.get_game_state() != 'UNFINISHED':
+        return None, 0, []
+    board = game.get_board()
+    move, score, pv, worker_stats = parallel_search(game, depth, movetime, workers, megabytes, remaining, increment,
+                                                    moves_to_go)
+    pv = [(board.get_alg_from_pos(from_pos), board.get_alg_from_pos(to_pos)) for from_pos, to_pos in pv]
+    if move is None:
+        return None, score, pv
+    return pv[0], score, pv
+
+
+def run_parallel_search(depth=DEFAULT_DEPTH, workers=None):
+    """ Runs parallel_search from the starting position, and prints the best move, its score and PV, and the depth,
+    nodes and nodes per second of each worker and of the whole pool."""
+    game = XiangqiGame()
+    board = game.get_board()
+    start = time.perf_counter()
+    move, score, pv, worker_stats = parallel_search(game, depth, workers=workers)
+    elapsed = time.perf_counter() - start
+    line = " ".join(board.get_alg_from_pos(from_pos) + board.get_alg_from_pos(to_pos) for from_pos, to_pos in pv)
+    print("score {} pv {}".format(score, line))
+    for worker_num, (worker_depth, nodes, seconds) in enumerate(worker_stats):
+        print("worker {:>3} depth {:>2} {:>12,} nodes {:>12,.0f} nodes/sec".format(
+            worker_num, worker_depth, nodes, nodes / seconds if seconds else 0))
+    nodes = sum(stats[1] for stats in worker_stats)
+    print("total {:,} nodes in {:.3f} seconds, {:,.0f} nodes/sec".format(nodes, elapsed, nodes / elapsed))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        search_depth = int(sys.argv[1])
+    else:
+        search_depth = DEFAULT_DEPTH
+    if len(sys.argv) > 2:
+        num_workers = int(sys.argv[2])
+    else:
+        num_workers = None
+    run_parallel_search(search_depth, num_workers)
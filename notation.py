@@ -0,0 +1,289 @@
+# Move notation: ICCS coordinates and WXF piece-relative notation, and a streaming reader and writer for game
+# collections in PGN-style files.
+# ICCS names a move by its two points: file a-i and rank 0-9 from red's side, so 'h2e2' moves h3 to e3.
+# WXF names a move by the Piece, its file, a direction and a number, from the moving side's point of view:
+#   Piece letters: K general, A advisor, E (or B) elephant, H (or N) horse, R chariot, C cannon, P soldier.
+#   Files are numbered 1-9 from the mover's right, so red's file 1 is file i, and black's file 1 is file a.
+#   Direction: '+' forward, '-' backward, '.' (or '=') along the rank.
+#   Number: for generals, chariots, cannons and soldiers moving along their file, the number of ranks moved.
+#   Otherwise the file moved to.
+# When two chariots, horses, cannons or soldiers stand on one file, the file number is replaced by '+' for the front
+# Piece and '-' for the rear one, as in 'C+.5'. The marker may also come before the letter, as in '+C.5'. Advisors
+# and elephants keep their file number, as in 'A6+5', since the direction of the move tells the two apart. When a
+# file number names two Pieces, the Board decides which one can make the move. WXF has no agreed form for a soldier
+# that '+' or '-' cannot single out, with three soldiers on a file or pairs on two files, so write_game writes such a
+# move in ICCS.
+
+import re
+
+from Board import Board, NUM_FILES, NUM_RANKS, FILES
+from XiangqiGame_single_module import XiangqiGame
+
+# WXF letters keyed by piece type, and piece types keyed by WXF letter, also accepting B and N
+WXF_LETTERS = {'Ge': 'K', 'Ad': 'A', 'El': 'E', 'Ho': 'H', 'Ch': 'R', 'Ca': 'C', 'So': 'P'}
+WXF_PIECE_TYPES = dict({letter: piece_type for piece_type, letter in WXF_LETTERS.items()}, B='El', N='Ho')
+STRAIGHT_TYPES = ('Ge', 'Ch', 'Ca', 'So')     # piece types whose WXF number counts ranks when moving on their file
+DIAGONAL_RANKS = {'Ad': 1, 'El': 2}          # ranks crossed by an advisor or elephant move
+
+ICCS_PATTERN = re.compile(r'^([a-i])([0-9])-?([a-i])([0-9])$', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]$')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+RESULT_TOKENS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def move_to_iccs(move):
+    """ Returns move, a (from_pos, to_pos) tuple, in ICCS notation, such as 'h2e2'"""
+    from_rank, from_file = divmod(move[0], NUM_FILES)
+    to_rank, to_file = divmod(move[1], NUM_FILES)
+    return FILES[from_file] + str(from_rank) + FILES[to_file] + str(to_rank)
+
+
+def iccs_to_move(text):
+    """ Returns the (from_pos, to_pos) tuple of a move in ICCS notation, such as 'h2e2' or 'H2-E2'. Raises ValueError
+    if text is not ICCS notation. The move is not checked for legality."""
+    match = ICCS_PATTERN.match(text)
+    if match is None:
+        raise ValueError("not an ICCS move: {!r}".format(text))
+    from_file, from_rank, to_file, to_rank = match.groups()
+    return (int(from_rank) * NUM_FILES + FILES.index(from_file.lower()),
+            int(to_rank) * NUM_FILES + FILES.index(to_file.lower()))
+
+
+def _wxf_file(file, side):
+    """ Returns the WXF file number, 1 to 9, of file index file for side"""
+    if side == 'red':
+        return NUM_FILES - file
+    return file + 1
+
+
+def _file_from_wxf(number, side):
+    """ Returns the file index of WXF file number for side"""
+    if side == 'red':
+        return NUM_FILES - number
+    return number - 1
+
+
+def _wxf_target(from_pos, piece_type, direction, number, side):
+    """ Returns the position a piece_type Piece of side on from_pos reaches by the WXF direction and number, or None
+    if the notation describes no point on the board."""
+    rank, file = divmod(from_pos, NUM_FILES)
+    forward = 1 if side == 'red' else -1
+    if direction in '.=':
+        if piece_type not in STRAIGHT_TYPES:
+            return None
+        return rank * NUM_FILES + _file_from_wxf(number, side)
+    if direction == '-':
+        forward = -forward
+    if piece_type in STRAIGHT_TYPES:
+        to_rank, to_file = rank + forward * number, file
+    else:
+        to_file = _file_from_wxf(number, side)
+        if piece_type == 'Ho':
+            ranks = {1: 2, 2: 1}.get(abs(to_file - file))
+            if ranks is None:
+                return None
+        else:
+            ranks = DIAGONAL_RANKS[piece_type]
+        to_rank = rank + forward * ranks
+    if not 0 <= to_rank < NUM_RANKS:
+        return None
+    return to_rank * NUM_FILES + to_file
+
+
+def _tandem(piece, pieces, side):
+    """ Returns '+' if piece is the front one of two Pieces in pieces on its file, '-' if it is the rear one, or None
+    if no other Piece in pieces shares its file. Raises ValueError if three or more do, which WXF cannot name."""
+    file = piece.get_pos() % NUM_FILES
+    others = [other for other in pieces if other is not piece and other.get_pos() % NUM_FILES == file]
+    if not others:
+        return None
+    if len(others) > 1:
+        raise ValueError("WXF cannot name one of {} Pieces on a file".format(len(others) + 1))
+    in_front = piece.get_pos() > others[0].get_pos()
+    if side == 'black':
+        in_front = not in_front
+    return '+' if in_front else '-'
+
+
+def _get_pieces(game, side, piece_type):
+    """ Returns side's Pieces of piece_type that are on the Board"""
+    return [piece for piece in game.get_player(side).get_pieces()
+            if piece.get_type() == piece_type and piece.get_pos() is not None]
+
+
+def move_to_wxf(game, move):
+    """ Returns move, a (from_pos, to_pos) tuple for the side to move in game, in WXF notation such as 'C2.5', from
+    the position before the move is made. Raises ValueError for a soldier that WXF cannot name."""
+    from_pos, to_pos = move
+    piece = game.get_board().get_piece_from_pos(from_pos)
+    side = piece.get_side()
+    piece_type = piece.get_type()
+    marker = None
+    if piece_type not in DIAGONAL_RANKS:        # tandem advisors and elephants are named by file
+        marker = _tandem(piece, _get_pieces(game, side, piece_type), side)
+    from_rank, from_file = divmod(from_pos, NUM_FILES)
+    to_rank, to_file = divmod(to_pos, NUM_FILES)
+    if marker is None:
+        marker = str(_wxf_file(from_file, side))
+    elif piece_type == 'So':
+        files = [other.get_pos() % NUM_FILES for other in _get_pieces(game, side, piece_type)]
+        if len([file for file in set(files) if files.count(file) > 1]) > 1:
+            raise ValueError("WXF cannot name a soldier when soldiers share two files")
+    if to_rank == from_rank:
+        return WXF_LETTERS[piece_type] + marker + '.' + str(_wxf_file(to_file, side))
+    if (to_rank > from_rank) == (side == 'red'):
+        direction = '+'
+    else:
+        direction = '-'
+    if piece_type in STRAIGHT_TYPES and to_file == from_file:
+        number = abs(to_rank - from_rank)
+    else:
+        number = _wxf_file(to_file, side)
+    return WXF_LETTERS[piece_type] + marker + direction + str(number)
+
+
+def wxf_to_move(game, text):
+    """ Returns the (from_pos, to_pos) tuple of a legal move for the side to move in game, given in WXF notation
+    such as 'C2.5', 'C+.5' or '+C.5'. Letters may be upper or lower case.
+    The Pieces the notation could name are found on the Board, and the move is the one that is legal among them.
+    Raises ValueError if text is not WXF notation, names no legal move, or names more than one."""
+    if len(text) != 4:
+        raise ValueError("not a WXF move: {!r}".format(text))
+    if text[0] in '+-':
+        marker, letter, direction, number = text[0], text[1], text[2], text[3]
+    else:
+        letter, marker, direction, number = text
+    piece_type = WXF_PIECE_TYPES.get(letter.upper())
+    if piece_type is None or direction not in '+-.=' or not number.isdigit() or number == '0' or \
+            not (marker in '+-' or marker.isdigit() and marker != '0'):
+        raise ValueError("not a WXF move: {!r}".format(text))
+
+    side = game.get_turn()
+    pieces = _get_pieces(game, side, piece_type)
+    if marker in '+-':          # only a file holding exactly two of the Pieces has a front and a rear one
+        files = [piece.get_pos() % NUM_FILES for piece in pieces]
+        candidates = [piece for piece in pieces
+                      if files.count(piece.get_pos() % NUM_FILES) == 2 and _tandem(piece, pieces, side) == marker]
+    else:
+        file = _file_from_wxf(int(marker), side)
+        candidates = [piece for piece in pieces if piece.get_pos() % NUM_FILES == file]
+
+    legal_moves = game.get_legal_moves(side)
+    moves = []
+    for piece in candidates:
+        to_pos = _wxf_target(piece.get_pos(), piece_type, direction, int(number), side)
+        if to_pos is not None and (piece.get_pos(), to_pos) in legal_moves:
+            moves.append((piece.get_pos(), to_pos))
+    if not moves:
+        raise ValueError("no legal move for {} matches {!r}".format(side, text))
+    if len(moves) > 1:
+        raise ValueError("{!r} is ambiguous for {}".format(text, side))
+    return moves[0]
+
+
+def parse_move(game, text):
+    """ Returns the (from_pos, to_pos) tuple of a move for the side to move in game, given in either ICCS or WXF
+    notation. Raises ValueError if text is neither, or if it is WXF and names no single legal move. ICCS moves are
+    not checked for legality."""
+    if ICCS_PATTERN.match(text):
+        return iccs_to_move(text)
+    return wxf_to_move(game, text)
+
+
+def read_games(infile):
+    """ Yields a (tags, moves) tuple for each game in infile, a text file object in PGN style, where tags is a
+    dictionary of the game's tag pairs, such as {'Event': 'Club match', 'FEN': ...}, and moves is the list of the
+    game's moves as written, in ICCS or WXF notation.
+    The file is read line by line, and only the game being read is held in memory, so files of any size can be
+    read. Move numbers, results, {comments}, ; comments and (variations) are skipped. A game ends at its result,
+    or when the tags of the next game begin."""
+    tags = {}
+    moves = []
+    comment = False             # inside a {comment}
+    variation = 0               # depth of nested (variations)
+    for line in infile:
+        line = line.strip()
+        if not comment and not variation and line.startswith('['):
+            match = TAG_PATTERN.match(line)
+            if match is not None:
+                if moves:       # the last game ended without a result
+                    yield tags, moves
+                    tags, moves = {}, []
+                tags[match.group(1)] = match.group(2)
+                continue
+        # mark comments and variations off with spaces, so that they split into tokens of their own
+        for token in re.sub(r'([{}();])', r' \1 ', line).split():
+            if comment:
+                comment = token != '}'
+            elif token == '{':
+                comment = True
+            elif token == ';':
+                break
+            elif token == '(':
+                variation += 1
+            elif token == ')':
+                variation = max(variation - 1, 0)
+            elif variation:
+                continue
+            elif token in RESULT_TOKENS:
+                yield tags, moves
+                tags, moves = {}, []
+            else:
+                token = MOVE_NUMBER_PATTERN.sub('', token)
+                if token:
+                    moves.append(token)
+    if tags or moves:
+        yield tags, moves
+
+
+def replay_game(tags, moves, board_class=Board):
+    """ Returns (game, positions) for a game read by read_games: the XiangqiGame after its moves, starting from the
+    'FEN' tag if there is one, and the list of its moves as (from_pos, to_pos) tuples. Each move is played with
+    XiangqiGame.make_move(). Raises ValueError naming the first move that cannot be read or is refused."""
+    if 'FEN' in tags:
+        game = XiangqiGame.from_fen(tags['FEN'], board_class)
+    else:
+        game = XiangqiGame(board_class)
+    board = game.get_board()
+    positions = []
+    for index, text in enumerate(moves):
+        try:
+            move = parse_move(game, text)
+        except ValueError as error:
+            raise ValueError("move {} {!r}: {}".format(index + 1, text, error))
+        if not game.make_move(board.get_alg_from_pos(move[0]), board.get_alg_from_pos(move[1])):
+            raise ValueError("move {} {!r} is not legal".format(index + 1, text))
+        positions.append(move)
+    return game, positions
+
+
+def write_game(outfile, tags, moves, result='*', game=None, wxf=True):
+    """ Writes a game to outfile, a text file object, in the style read by read_games: its tags, then its moves,
+    numbered, ten to a line, then result. tags is a dictionary of tag pairs, and moves is a list of (from_pos,
+    to_pos) tuples played from game's position, or the starting position if game is None.
+    Moves are written in WXF notation, or in ICCS notation if wxf is False, or if WXF cannot name the move. Writing
+    WXF plays the moves on game with XiangqiGame.make_move(), since WXF depends on the position. Raises ValueError if a
+    move is refused."""
+    if wxf and game is None:
+        game = XiangqiGame()
+    for name, value in tags.items():
+        outfile.write('[{} "{}"]\n'.format(name, value))
+    outfile.write('\n')
+    words = []
+    for index, move in enumerate(moves):
+        if index % 2 == 0:
+            words.append('{}.'.format(index // 2 + 1))
+        if wxf:
+            try:
+                words.append(move_to_wxf(game, move))
+            except ValueError:
+                words.append(move_to_iccs(move))
+            board = game.get_board()
+            if not game.make_move(board.get_alg_from_pos(move[0]), board.get_alg_from_pos(move[1])):
+                raise ValueError("move {} {} is not legal".format(index + 1, move_to_iccs(move)))
+        else:
+            words.append(move_to_iccs(move))
+    words.append(result)
+    for start in range(0, len(words), 15):
+        outfile.write(' '.join(words[start:start + 15]) + '\n')
+    outfile.write('\n')
@@ -0,0 +1,241 @@
+# Perft: counts the leaf nodes of the legal move tree, as a correctness check and a throughput benchmark for
+# move generation.
+# Run from the command line with
+#   python3 perft.py [max_depth]
+# Runs the perft suite up to max_depth (default 3), checking every count against its expected value, and prints
+# nodes per second. divide() gives the count under each root move, for finding where a wrong count comes from.
+#   python3 perft.py divide depth [workers]
+# Runs divide from the starting position across a pool of worker processes (default one per core), and prints the
+# count under each root move and the node rate of every worker.
+
+import multiprocessing
+import os
+import sys
+import time
+
+from Board import NUM_FILES
+from XiangqiGame_single_module import XiangqiGame
+
+# published perft counts from the starting position, indexed by depth
+INITIAL_PERFT = [1, 44, 1920, 79666, 3290240, 133312995]
+
+# tricky positions, as (name, side to move, placements, perft counts indexed by depth).
+# Placements map Piece labels to algebraic positions; Pieces that are not listed are captured.
+# Counts beyond the published starting position were cross-checked to depth 4 against a brute-force count that tries
+# every destination of every Piece with XiangqiGame.make_move on a copy of the game.
+TRICKY_POSITIONS = [
+    ('cannon screens', 'red',
+     {'rGe': 'e1', 'rAd1': 'd1', 'rCa1': 'b3', 'rCa2': 'e3', 'rCh1': 'b6', 'rSo3': 'e5',
+      'bGe': 'e10', 'bAd2': 'f10', 'bCa1': 'e8', 'bCa2': 'b8', 'bHo1': 'e6', 'bSo1': 'a7'},
+     [1, 29, 702, 21049, 529158]),
+    ('flying general', 'black',
+     {'rGe': 'd1', 'rCh1': 'f2', 'rHo1': 'd5',
+      'bGe': 'd9', 'bAd1': 'e9', 'bCh1': 'a9', 'bSo3': 'e5'},
+     [1, 20, 360, 7499, 128661]),
+    ('blocked horse legs', 'red',       # red starts in check from the horse on d4
+     {'rGe': 'e2', 'rHo1': 'e5', 'rHo2': 'c3', 'rSo2': 'c4', 'rSo4': 'g4', 'rAd2': 'f1',
+      'bGe': 'f10', 'bHo1': 'e7', 'bHo2': 'd4', 'bEl1': 'c10', 'bSo1': 'e6', 'bSo5': 'f5'},
+     [1, 5, 86, 1040, 18603]),
+    ('elephant eyes', 'black',
+     {'rGe': 'f1', 'rEl1': 'c1', 'rEl2': 'g5', 'rSo3': 'e6', 'rSo4': 'f3', 'rCh2': 'i8',
+      'bGe': 'e9', 'bEl1': 'c10', 'bEl2': 'g8', 'bAd1': 'f10', 'bHo1': 'f9', 'bCa2': 'c7'},
+     [1, 27, 550, 13794, 285939]),
+    ('river crossings', 'red',
+     {'rGe': 'e1', 'rSo1': 'a5', 'rSo2': 'c6', 'rSo3': 'e7', 'rSo4': 'g5', 'rSo5': 'i4',
+      'bGe': 'd10', 'bSo1': 'a6', 'bSo2': 'c5', 'bSo3': 'e3', 'bSo4': 'h6', 'bSo5': 'i3'},
+     [1, 10, 119, 1213, 14609]),
+]
+
+
+def set_position(game, placements):
+    """ Rearranges game's Board so that each Piece labelled in placements stands on its algebraic position, and
+    every other Piece is captured. Soldiers are marked as having crossed the river if they stand beyond it.
+    Board.place_piece and Board.clear_pos are used throughout, so the Board's hash and any bitboards stay valid."""
+    board = game.get_board()
+    pieces = game.get_player('red').get_pieces() | game.get_player('black').get_pieces()
+    for piece in pieces:                    # take every Piece off the Board
+        if piece.get_pos() is not None:
+            board.clear_pos(piece.get_pos())
+            board.clear_piece(piece)
+            piece.set_pos(None)
+    for piece in pieces:                    # place the listed Pieces
+        if str(piece) in placements:
+            pos = board.get_pos_from_alg(placements[str(piece)])
+            board.place_piece(piece, pos)
+            piece.set_pos(pos)
+            if piece.get_type() == 'So':    # a soldier beyond the river has crossed it
+                rank = pos // NUM_FILES
+                piece.set_flags(rank >= 5 if piece.get_side() == 'red' else rank <= 4)
+    return game
+
+
+def get_placements(game):
+    """ Returns a dictionary of algebraic positions keyed by the labels of game's Pieces that are on the Board, as
+    read back by set_position."""
+    board = game.get_board()
+    return {str(piece): board.get_alg_from_pos(piece.get_pos())
+            for side in ('red', 'black') for piece in game.get_player(side).get_pieces()
+            if piece.get_pos() is not None}
+
+
+def perft(game, depth, side=None):
+    """ Returns the number of leaf nodes of the legal move tree depth plies deep from game's position, with side to
+    move (the game's turn by default). Moves are made with Board.make() and reversed with Board.unmake(), and the
+    last ply is counted without being made."""
+    if side is None:
+        side = game.get_turn()
+    return _perft(game.get_board(), game.get_player(side), game.get_opponent(side), depth)
+
+
+def _perft(board, player, opponent, depth):
+    """ Returns the perft count for player to move against opponent on board. """
+    if depth == 0:
+        return 1
+    moves = list(player.generate_legal_moves(opponent))
+    if depth == 1:                  # bulk count the last ply
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.make(move)
+        nodes += _perft(board, opponent, player, depth - 1)
+        board.unmake()
+    return nodes
+
+
+def divide(game, depth, side=None):
+    """ Returns a dictionary of perft counts depth - 1 plies deep under each of side's legal moves, keyed by
+    (from_alg, to_alg) tuples. The counts sum to perft(game, depth, side)."""
+    if side is None:
+        side = game.get_turn()
+    board = game.get_board()
+    player = game.get_player(side)
+    opponent = game.get_opponent(side)
+    counts = {}
+    for move in list(player.generate_legal_moves(opponent)):
+        board.make(move)
+        counts[(board.get_alg_from_pos(move[0]), board.get_alg_from_pos(move[1]))] = \
+            _perft(board, opponent, player, depth - 1)
+        board.unmake()
+    return counts
+
+
+# the position searched by a worker process, set once per process by _init_worker
+_worker_game = None
+
+
+def _init_worker(position):
+    """ Builds the position to divide in a worker process, from its binary encoding."""
+    global _worker_game
+    _worker_game = XiangqiGame.from_bytes(position)
+
+
+def _divide_worker(task):
+    """ Returns (move, nodes, seconds, worker pid) for one root move, where task is a (side, move, depth) tuple
+    and move is a (from_pos, to_pos) tuple. Runs in a worker process."""
+    side, move, depth = task
+    board = _worker_game.get_board()
+    player = _worker_game.get_player(side)
+    opponent = _worker_game.get_opponent(side)
+    start = time.perf_counter()
+    board.make(move)
+    nodes = _perft(board, opponent, player, depth - 1)
+    board.unmake()
+    return move, nodes, time.perf_counter() - start, os.getpid()
+
+
+def parallel_divide(game, depth, side=None, workers=None):
+    """ Returns (counts, worker_stats) for divide(game, depth, side) computed across a pool of worker processes,
+    one per core unless workers is given.
+    Each worker rebuilds the position once from game.to_bytes(), then counts the subtrees of the root moves it
+    is handed, one at a time, so that a few deep subtrees do not hold up the others.
+    counts is keyed by (from_alg, to_alg) tuples as in divide. worker_stats is a dictionary of (nodes, seconds)
+    tuples keyed by worker pid, where seconds is the time the worker spent counting."""
+    if side is None:
+        side = game.get_turn()
+    board = game.get_board()
+    player = game.get_player(side)
+    moves = list(player.generate_legal_moves(game.get_opponent(side)))
+    tasks = [(side, move, depth) for move in moves]
+
+    counts = {}
+    worker_stats = {}
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(game.to_bytes(),)) as pool:
+        for move, nodes, seconds, pid in pool.imap_unordered(_divide_worker, tasks):
+            counts[(board.get_alg_from_pos(move[0]), board.get_alg_from_pos(move[1]))] = nodes
+            worker_nodes, worker_seconds = worker_stats.get(pid, (0, 0.0))
+            worker_stats[pid] = (worker_nodes + nodes, worker_seconds + seconds)
+    return counts, worker_stats
+
+
+def parallel_perft(game, depth, side=None, workers=None):
+    """ Returns perft(game, depth, side) computed across a pool of worker processes."""
+    if depth <= 1:
+        return perft(game, depth, side)
+    counts, worker_stats = parallel_divide(game, depth, side, workers)
+    return sum(counts.values())
+
+
+def run_parallel_divide(depth, workers=None):
+    """ Runs parallel_divide from the starting position, and prints the count under each root move, the total
+    against the published count, and the nodes per second of each worker and of the whole pool."""
+    start = time.perf_counter()
+    counts, worker_stats = parallel_divide(XiangqiGame(), depth, 'red', workers)
+    elapsed = time.perf_counter() - start
+    for move in sorted(counts):
+        print("{}{} {:>12,}".format(move[0], move[1], counts[move]))
+    nodes = sum(counts.values())
+    if depth < len(INITIAL_PERFT):
+        result = "ok" if nodes == INITIAL_PERFT[depth] else "FAILED, expected {:,}".format(INITIAL_PERFT[depth])
+    else:
+        result = "no published count"
+    print("total {:,} in {:.3f} seconds, {:,.0f} nodes/sec, {}".format(nodes, elapsed, nodes / elapsed, result))
+    for worker_num, pid in enumerate(sorted(worker_stats)):
+        worker_nodes, worker_seconds = worker_stats[pid]
+        print("worker {:>3} {:>14,} nodes {:>12,.0f} nodes/sec".format(
+            worker_num, worker_nodes, worker_nodes / worker_seconds if worker_seconds else 0))
+    return not result.startswith("FAILED")
+
+
+def get_suite():
+    """ Returns the perft suite as a list of (name, game, side to move, counts indexed by depth) tuples, starting
+    with the initial position."""
+    suite = [('initial position', XiangqiGame(), 'red', INITIAL_PERFT)]
+    for name, side, placements, counts in TRICKY_POSITIONS:
+        suite.append((name, set_position(XiangqiGame(), placements), side, counts))
+    return suite
+
+
+def run_suite(max_depth=3):
+    """ Runs perft on every position of the suite up to max_depth, or the deepest known count, and prints the
+    nodes, nodes per second, and whether the count matched. Returns True if every count matched."""
+    all_passed = True
+    print("{:<20} {:>5} {:>12} {:>9} {:>12}  {}".format("position", "depth", "nodes", "seconds", "nodes/sec",
+                                                        "result"))
+    for name, game, side, counts in get_suite():
+        for depth in range(1, min(max_depth, len(counts) - 1) + 1):
+            start = time.perf_counter()
+            nodes = perft(game, depth, side)
+            elapsed = time.perf_counter() - start
+            passed = nodes == counts[depth]
+            all_passed = all_passed and passed
+            print("{:<20} {:>5} {:>12,} {:>9.3f} {:>12,.0f}  {}".format(
+                name, depth, nodes, elapsed, nodes / elapsed if elapsed else 0,
+                "ok" if passed else "FAILED, expected {:,}".format(counts[depth])))
+    return all_passed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'divide':
+        if len(sys.argv) > 3:
+            workers = int(sys.argv[3])
+        else:
+            workers = None
+        passed = run_parallel_divide(int(sys.argv[2]), workers)
+    else:
+        if len(sys.argv) > 1:
+            max_depth = int(sys.argv[1])
+        else:
+            max_depth = 3
+        passed = run_suite(max_depth)
+    if not passed:
+        sys.exit(1)
@@ -12,41 +12,8 @@ from CannonPiece import CannonPiece
 
 
 if __name__ == "__main__":
-    game = XiangqiGame()
-    board = game._board
-    red_pieces = game.get_player("red")._pieces
-    black_pieces = game.get_player("black")._pieces
-
-    # initialize empty board
-    board._board_state = [  # board state represented as a 2D array
-        [None for file in board._files] for rank in board._ranks  # initialize all positions to None
-    ]
-
-    board._piece_state = {}  # dictionary of piece: pos pairs. When pieces are captured, value is set to None
-
-    for piece in black_pieces:
-        piece.set_pos(None)
-
-    for piece in red_pieces:
-        piece.set_pos(None)
-
-    for piece in black_pieces:
-        if str(piece) == "bGe":
-            piece.set_pos('d10')
-            board.place_piece(piece, 'd10')  # black general on d9
-        elif str(piece) == "bEl1":
-            piece.set_pos('c6')
-            board.place_piece(piece, 'c6')  # black advisor on d10
-
-
-    for piece in red_pieces:
-        if isinstance(piece, GeneralPiece):
-            piece.set_pos('e2')
-            board.place_piece(piece, 'e2')
-        if str(piece) == "rHo1":
-            piece.set_pos('f8')
-            board.place_piece(piece, 'f8')  # black general on d9
-
+    # black general on d10 and elephant on c6, red general on e2 and horse on f8
+    game = XiangqiGame.from_fen('3k5/9/5N3/9/2b6/9/9/9/4K4/9 w')
 
     while game.get_game_state() == 'UNFINISHED':
         game._board.display_board()